@@ -0,0 +1,159 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 11:12:36.899250
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Shared enum types are created once up front (cabinclass is used by three tables)
+user_role = postgresql.ENUM('USER', 'PREMIUM', 'ADMIN', name='userrole', create_type=False)
+cabin_class = postgresql.ENUM('ECONOMY', 'PREMIUM_ECONOMY', 'BUSINESS', 'FIRST', name='cabinclass', create_type=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        user_role.create(op.get_bind(), checkfirst=False)
+        cabin_class.create(op.get_bind(), checkfirst=False)
+    op.create_table('airports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('iata_code', sa.String(length=3), nullable=False),
+    sa.Column('icao_code', sa.String(length=4), nullable=True),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=True),
+    sa.Column('country', sa.String(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('timezone', sa.String(), nullable=True),
+    sa.Column('is_major_hub', sa.Boolean(), nullable=True),
+    sa.Column('has_lounge', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_airports_iata_code'), 'airports', ['iata_code'], unique=True)
+    op.create_index(op.f('ix_airports_id'), 'airports', ['id'], unique=False)
+    op.create_table('loyalty_programs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(), nullable=True),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('airline', sa.String(), nullable=True),
+    sa.Column('alliance', sa.String(), nullable=True),
+    sa.Column('transfer_partners', sa.JSON(), nullable=True),
+    sa.Column('transfer_ratio', sa.Float(), nullable=True),
+    sa.Column('sweet_spots', sa.JSON(), nullable=True),
+    sa.Column('website_url', sa.String(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_loyalty_programs_code'), 'loyalty_programs', ['code'], unique=True)
+    op.create_index(op.f('ix_loyalty_programs_id'), 'loyalty_programs', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('avatar_url', sa.String(), nullable=True),
+    sa.Column('role', user_role, nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('provider', sa.String(), nullable=True),
+    sa.Column('provider_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('last_login', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('bookings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('booking_reference', sa.String(), nullable=True),
+    sa.Column('origin', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('airline', sa.String(), nullable=False),
+    sa.Column('flight_number', sa.String(), nullable=True),
+    sa.Column('departure_date', sa.DateTime(), nullable=False),
+    sa.Column('arrival_date', sa.DateTime(), nullable=False),
+    sa.Column('cabin_class', cabin_class, nullable=True),
+    sa.Column('points_used', sa.Integer(), nullable=True),
+    sa.Column('cash_price', sa.Float(), nullable=True),
+    sa.Column('taxes_fees', sa.Float(), nullable=True),
+    sa.Column('loyalty_program', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('passengers', sa.JSON(), nullable=True),
+    sa.Column('booked_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bookings_booking_reference'), 'bookings', ['booking_reference'], unique=True)
+    op.create_index(op.f('ix_bookings_id'), 'bookings', ['id'], unique=False)
+    op.create_table('saved_searches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('origin', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('departure_date', sa.DateTime(), nullable=True),
+    sa.Column('return_date', sa.DateTime(), nullable=True),
+    sa.Column('cabin_class', cabin_class, nullable=True),
+    sa.Column('passengers', sa.Integer(), nullable=True),
+    sa.Column('loyalty_program', sa.String(), nullable=True),
+    sa.Column('alert_enabled', sa.Boolean(), nullable=True),
+    sa.Column('alert_threshold_points', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_saved_searches_id'), 'saved_searches', ['id'], unique=False)
+    op.create_table('search_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('origin', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('departure_date', sa.DateTime(), nullable=False),
+    sa.Column('return_date', sa.DateTime(), nullable=True),
+    sa.Column('cabin_class', cabin_class, nullable=True),
+    sa.Column('passengers', sa.Integer(), nullable=True),
+    sa.Column('loyalty_program', sa.String(), nullable=True),
+    sa.Column('results_count', sa.Integer(), nullable=True),
+    sa.Column('lowest_points', sa.Integer(), nullable=True),
+    sa.Column('searched_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_search_history_id'), 'search_history', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_search_history_id'), table_name='search_history')
+    op.drop_table('search_history')
+    op.drop_index(op.f('ix_saved_searches_id'), table_name='saved_searches')
+    op.drop_table('saved_searches')
+    op.drop_index(op.f('ix_bookings_id'), table_name='bookings')
+    op.drop_index(op.f('ix_bookings_booking_reference'), table_name='bookings')
+    op.drop_table('bookings')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_loyalty_programs_id'), table_name='loyalty_programs')
+    op.drop_index(op.f('ix_loyalty_programs_code'), table_name='loyalty_programs')
+    op.drop_table('loyalty_programs')
+    op.drop_index(op.f('ix_airports_id'), table_name='airports')
+    op.drop_index(op.f('ix_airports_iata_code'), table_name='airports')
+    op.drop_table('airports')
+    if op.get_bind().dialect.name == 'postgresql':
+        cabin_class.drop(op.get_bind(), checkfirst=False)
+        user_role.drop(op.get_bind(), checkfirst=False)
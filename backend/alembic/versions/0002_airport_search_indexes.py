@@ -0,0 +1,38 @@
+"""airport search indexes
+
+Trigram GIN indexes on airports.name/city and a functional index on
+lower(iata_code) back the ranked database autocomplete path used while the
+in-process airport index is cold.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 11:20:04.512731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_airports_iata_code_lower', 'airports', [sa.text('lower(iata_code)')], unique=False)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_airports_name_trgm', 'airports', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_airports_city_trgm', 'airports', ['city'], unique=False, postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_airports_city_trgm', table_name='airports')
+        op.drop_index('ix_airports_name_trgm', table_name='airports')
+    op.drop_index('ix_airports_iata_code_lower', table_name='airports')
@@ -0,0 +1,134 @@
+"""route search stats
+
+Per-day route/program search aggregates behind GET /flights/popular-routes,
+backfilled from existing search history. The backfill groups in the database
+first and only canonicalizes program names in Python, so it reads one row per
+(day, route, program spelling) rather than one per search.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 14:02:51.207318
+
+"""
+import re
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 5000
+
+# Frozen copy of app.services.popular_routes.program_bucket (and the
+# canonical_program aliases it relies on) as of this revision, so the backfill
+# does not change when the application code does
+MULTI_PROGRAM = '*'
+PROGRAM_ALIASES = {
+    'united': 'united',
+    'unitedmileageplus': 'united',
+    'mileageplus': 'united',
+    'ua': 'united',
+    'american': 'american',
+    'americanaadvantage': 'american',
+    'aadvantage': 'american',
+    'aa': 'american',
+    'delta': 'delta',
+    'deltaskymiles': 'delta',
+    'skymiles': 'delta',
+    'dl': 'delta',
+    'aeroplan': 'aeroplan',
+    'aircanadaaeroplan': 'aeroplan',
+    'alaska': 'alaska',
+    'alaskamileageplan': 'alaska',
+    'mileageplan': 'alaska',
+    'flyingblue': 'flyingblue',
+    'airfranceklmflyingblue': 'flyingblue',
+    'virginatlantic': 'virginatlantic',
+    'virginatlanticflyingclub': 'virginatlantic',
+    'flyingclub': 'virginatlantic',
+    'avios': 'british',
+    'britishairways': 'british',
+    'britishairwaysexecutiveclub': 'british',
+    'emirates': 'emirates',
+    'emiratesskywards': 'emirates',
+    'skywards': 'emirates',
+    'singapore': 'singapore',
+    'krisflyer': 'singapore',
+    'singaporekrisflyer': 'singapore',
+}
+
+
+def _program_bucket(loyalty_program: Optional[str]) -> str:
+    if not loyalty_program or loyalty_program == 'all' or ',' in loyalty_program:
+        return MULTI_PROGRAM
+    compact = re.sub(r'[^a-z0-9]', '', loyalty_program.lower())
+    return PROGRAM_ALIASES.get(compact, compact)
+
+
+def upgrade() -> None:
+    route_search_stats = op.create_table('route_search_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('origin', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('loyalty_program', sa.String(), nullable=False),
+    sa.Column('search_count', sa.Integer(), nullable=False),
+    sa.Column('points_sum', sa.BigInteger(), nullable=False),
+    sa.Column('points_count', sa.Integer(), nullable=False),
+    sa.Column('min_points', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('day', 'origin', 'destination', 'loyalty_program')
+    )
+
+    from datetime import date
+
+    search_history = sa.table('search_history',
+        sa.column('origin', sa.String()),
+        sa.column('destination', sa.String()),
+        sa.column('loyalty_program', sa.String()),
+        sa.column('lowest_points', sa.Integer()),
+        sa.column('searched_at', sa.DateTime()),
+    )
+    day = sa.func.date(search_history.c.searched_at)
+    origin = sa.func.upper(sa.func.trim(search_history.c.origin))
+    destination = sa.func.upper(sa.func.trim(search_history.c.destination))
+    grouped = (
+        sa.select(
+            day, origin, destination, search_history.c.loyalty_program,
+            sa.func.count(), sa.func.coalesce(sa.func.sum(search_history.c.lowest_points), 0),
+            sa.func.count(search_history.c.lowest_points), sa.func.min(search_history.c.lowest_points),
+        )
+        .where(search_history.c.searched_at.isnot(None))
+        .group_by(day, origin, destination, search_history.c.loyalty_program)
+    )
+
+    # Different spellings of one program land in the same bucket
+    buckets = {}
+    for row in op.get_bind().execute(grouped):
+        on_day, origin_code, destination_code, program, count, points_sum, points_count, min_points = row
+        on_day = on_day if isinstance(on_day, date) else date.fromisoformat(str(on_day)[:10])
+        key = (on_day, origin_code, destination_code, _program_bucket(program))
+        bucket = buckets.setdefault(key, [0, 0, 0, None])
+        bucket[0] += count
+        bucket[1] += points_sum
+        bucket[2] += points_count
+        if min_points is not None and (bucket[3] is None or min_points < bucket[3]):
+            bucket[3] = min_points
+
+    rows = [
+        {
+            'day': key[0], 'origin': key[1], 'destination': key[2], 'loyalty_program': key[3],
+            'search_count': b[0], 'points_sum': b[1], 'points_count': b[2], 'min_points': b[3],
+        }
+        for key, b in buckets.items()
+    ]
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        op.bulk_insert(route_search_stats, rows[start:start + BACKFILL_BATCH])
+
+
+def downgrade() -> None:
+    op.drop_table('route_search_stats')
@@ -0,0 +1,32 @@
+"""saved search alert state
+
+Remember the last alert sent per saved search so the alert worker does not
+re-send an unchanged price on every evaluation.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 15:36:12.884105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('saved_searches', sa.Column('last_alert_points', sa.Integer(), nullable=True))
+    op.add_column('saved_searches', sa.Column('last_alerted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('saved_searches') as batch_op:
+        batch_op.drop_column('last_alerted_at')
+        batch_op.drop_column('last_alert_points')
@@ -0,0 +1,52 @@
+"""availability snapshots
+
+Compact award price history: one row per route, cabin, program and day (or
+week, once downsampled) holding a points histogram instead of one row per
+observation.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 18:21:40.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('availability_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('origin', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('cabin_class', sa.String(), nullable=False),
+    sa.Column('loyalty_program', sa.String(), nullable=False),
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.Date(), nullable=False),
+    sa.Column('compacted', sa.Boolean(), nullable=False),
+    sa.Column('searches', sa.Integer(), nullable=False),
+    sa.Column('observations', sa.Integer(), nullable=False),
+    sa.Column('min_points', sa.Integer(), nullable=True),
+    sa.Column('max_points', sa.Integer(), nullable=True),
+    sa.Column('points_sum', sa.BigInteger(), nullable=False),
+    sa.Column('histogram', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_availability_snapshots_series', 'availability_snapshots',
+                    ['origin', 'destination', 'cabin_class', 'bucket_start'], unique=False)
+    op.create_index('ix_availability_snapshots_pending', 'availability_snapshots',
+                    ['compacted', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_availability_snapshots_pending', table_name='availability_snapshots')
+    op.drop_index('ix_availability_snapshots_series', table_name='availability_snapshots')
+    op.drop_table('availability_snapshots')
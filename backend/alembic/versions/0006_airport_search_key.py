@@ -0,0 +1,64 @@
+"""airport search key
+
+Precomputed accent-folded search text on airports, written by the CSV importer
+and on ORM writes, so the database autocomplete path matches "sao paulo"
+against "São Paulo". Existing rows are backfilled.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 19:02:11.804316
+
+"""
+import re
+import unicodedata
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+airports = sa.table(
+    'airports',
+    sa.column('id', sa.Integer), sa.column('iata_code', sa.String), sa.column('icao_code', sa.String),
+    sa.column('name', sa.String), sa.column('city', sa.String), sa.column('search_key', sa.String),
+)
+
+# Frozen copy of app.services.airport_index.search_key as of this revision, so
+# the backfill does not change when the application code does
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _fold(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _search_key(*fields: Optional[str]) -> str:
+    return " ".join(t for field in fields for t in _TOKEN_SPLIT.split(_fold(field)) if t)
+
+
+def upgrade() -> None:
+    op.add_column('airports', sa.Column('search_key', sa.String(), nullable=True))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(airports.c.id, airports.c.iata_code, airports.c.icao_code, airports.c.name, airports.c.city)).all()
+    if rows:
+        bind.execute(
+            airports.update().where(airports.c.id == sa.bindparam('airport_id')).values(search_key=sa.bindparam('key')),
+            [{'airport_id': r.id, 'key': _search_key(r.iata_code, r.icao_code, r.city, r.name)} for r in rows],
+        )
+    if bind.dialect.name == 'postgresql':
+        op.create_index('ix_airports_search_key_trgm', 'airports', ['search_key'], unique=False, postgresql_using='gin', postgresql_ops={'search_key': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_airports_search_key_trgm', table_name='airports')
+    op.drop_column('airports', 'search_key')
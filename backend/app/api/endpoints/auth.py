@@ -3,16 +3,20 @@ Authentication endpoints for OAuth
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from authlib.integrations.starlette_client import OAuth
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+import time
 
+from app.core import metrics
 from app.core.config import settings
 from app.models.models import User
 from app.schemas.auth import Token, TokenData, UserCreate, UserResponse
 from app.core.database import get_db
+from app.services.user_cache import CurrentUser, user_cache
 
 router = APIRouter()
 
@@ -31,31 +35,48 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str, credentials_exception):
     """Verify JWT token"""
+    started = time.perf_counter()
+    result = "invalid"
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
         token_data = TokenData(user_id=user_id)
+        result = "ok"
     except JWTError:
         raise credentials_exception
+    finally:
+        metrics.jwt_verify_duration.observe(time.perf_counter() - started, "local", result)
     return token_data
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get current authenticated user"""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
+    """Get current authenticated user (a cached, read-only snapshot)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    try:
+        user_id = int(token_data.user_id)
+    except ValueError:
+        raise credentials_exception
+    generation = user_cache.generation
+    if settings.USER_CACHE_ENABLED:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     if user is None:
         raise credentials_exception
-    return user
+    snapshot = CurrentUser.from_user(user)
+    if settings.USER_CACHE_ENABLED:
+        user_cache.set(snapshot, generation)
+    return snapshot
 
 @router.post("/google", response_model=Token)
-async def google_auth(id_token: str, db: Session = Depends(get_db)):
+async def google_auth(id_token: str, db: AsyncSession = Depends(get_db)):
     """
     Authenticate with Google OAuth
     """
@@ -77,7 +98,7 @@ async def google_auth(id_token: str, db: Session = Depends(get_db)):
     }
     
     # Check if user exists
-    user = db.query(User).filter(User.email == user_info["email"]).first()
+    user = (await db.execute(select(User).where(User.email == user_info["email"]))).scalar_one_or_none()
     
     if not user:
         # Create new user
@@ -91,12 +112,12 @@ async def google_auth(id_token: str, db: Session = Depends(get_db)):
             last_login=datetime.utcnow()
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     else:
         # Update last login
         user.last_login = datetime.utcnow()
-        db.commit()
+        await db.commit()
     
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
@@ -113,7 +134,7 @@ async def google_auth(id_token: str, db: Session = Depends(get_db)):
     }
 
 @router.post("/apple", response_model=Token)
-async def apple_auth(id_token: str, db: Session = Depends(get_db)):
+async def apple_auth(id_token: str, db: AsyncSession = Depends(get_db)):
     """
     Authenticate with Apple OAuth
     """
@@ -125,7 +146,7 @@ async def apple_auth(id_token: str, db: Session = Depends(get_db)):
     pass
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(current_user: User = Depends(get_current_user)):
+async def refresh_token(current_user: CurrentUser = Depends(get_current_user)):
     """
     Refresh access token
     """
@@ -136,14 +157,14 @@ async def refresh_token(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """
     Get current user info
     """
     return current_user
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: CurrentUser = Depends(get_current_user)):
     """
     Logout user (client should remove token)
     """
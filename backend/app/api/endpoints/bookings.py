@@ -2,29 +2,31 @@
 Booking management endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.core.database import get_db
-from app.models.models import User, Booking
+from app.models.models import Booking
+from app.services.user_cache import CurrentUser
 from app.api.endpoints.auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/")
 async def get_bookings(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's bookings"""
-    bookings = db.query(Booking).filter(Booking.user_id == current_user.id).all()
+    bookings = (await db.execute(select(Booking).where(Booking.user_id == current_user.id))).scalars().all()
     return bookings
 
 @router.post("/")
 async def create_booking(
     booking_data: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new booking"""
     # TODO: Implement booking creation
@@ -33,14 +35,14 @@ async def create_booking(
 @router.get("/{booking_id}")
 async def get_booking(
     booking_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get booking details"""
-    booking = db.query(Booking).filter(
+    booking = (await db.execute(select(Booking).where(
         Booking.booking_reference == booking_id,
         Booking.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
     
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
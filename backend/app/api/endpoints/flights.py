@@ -1,143 +1,338 @@
 """
 Flight search and availability endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, date
-import httpx
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+import math
+import orjson
 
+from app.core.database import AsyncSessionLocal, get_db
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.models import User, SearchHistory, Airport
+from app.core.metrics import InstrumentedORJSONResponse
+from app.models.models import SearchHistory, LoyaltyProgram
 from app.api.endpoints.auth import get_current_user
-from app.schemas.flights import FlightSearch, FlightSearchResponse, FlightResult
+from app.schemas.flights import (
+    CabinClassEnum, FlightSearch, FlightSearchResponse, FundingRequest, FundingResponse, RouteSearch, RouteSearchResponse
+)
+from app.services.airport_geo import airport_geo
+from app.services.airport_index import airport_index, search_airports_db
+from app.services.availability_history import price_history, price_percentiles
+from app.services.award_routing import segment_graph
+from app.services.flight_search import expand_dates, expand_programs, iter_many, run_many, tag_results
+from app.services.popular_routes import apply_search_rows, popular_routes
+from app.services.result_views import InvalidCursor, ResultFilter, result_views
+from app.services.search_cache import canonical_program, normalize_search
+from app.services.search_history import search_history_recorder
+from app.services.seats_aero import SeatsAeroBudgetExceeded, SeatsAeroClient, SeatsAeroError, get_seats_aero_client
+from app.services.transfer_optimizer import transfer_optimizer
+from app.services.user_cache import CurrentUser
 
 router = APIRouter()
 
+def _search_history_row(user_id: int, search_params: FlightSearch, results_count: int, lowest_points: Optional[int]) -> dict:
+    return {
+        "user_id": user_id,
+        "origin": search_params.origin,
+        "destination": search_params.destination,
+        "departure_date": datetime.combine(search_params.departure_date, datetime.min.time()),
+        "cabin_class": search_params.cabin_class,
+        "passengers": search_params.passengers,
+        "loyalty_program": search_params.loyalty_program or (
+            "all" if search_params.all_programs else ",".join(search_params.loyalty_programs or [])
+        ),
+        "results_count": results_count,
+        "lowest_points": lowest_points,
+        "searched_at": datetime.utcnow()
+    }
+
+async def _record_search(row: dict) -> None:
+    """Hand the row to the write-behind recorder, or write it inline when that is not running."""
+    if search_history_recorder.running:
+        search_history_recorder.record(row)
+        return
+    async with AsyncSessionLocal() as db:
+        db.add(SearchHistory(**row))
+        await apply_search_rows(db, [row])
+        await db.commit()
+
+def _summarize(outcomes: list) -> dict:
+    """Result count, lowest points and errors over the outcomes for one day or one program."""
+    found = [r for o in outcomes if not isinstance(o, Exception) for r in o]
+    errors = [str(o) for o in outcomes if isinstance(o, Exception)]
+    return {
+        "total_results": len(found),
+        "lowest_points": min((r["points_required"] for r in found), default=None),
+        "error": "; ".join(errors) or None
+    }
+
+def _over_budget(e: SeatsAeroBudgetExceeded) -> HTTPException:
+    """503 with Retry-After once the shared Seats.aero call budget is spent."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+def _result_filter(search_params: FlightSearch) -> ResultFilter:
+    return ResultFilter(
+        max_stops=search_params.max_stops,
+        max_duration_minutes=search_params.max_duration_minutes,
+        max_points=search_params.max_points,
+        airlines=frozenset(a.strip().lower() for a in search_params.airlines) if search_params.airlines else None
+    )
+
+def _result_sort(search_params: FlightSearch, programs: Optional[List[str]]) -> Optional[str]:
+    """Requested sort; paged and multi-program results default to points, a single program keeps upstream order."""
+    if search_params.sort is not None:
+        return search_params.sort.value
+    if programs or search_params.page_size or search_params.cursor:
+        return "points"
+    return None
+
+async def _resolve_programs(db: AsyncSession, search_params: FlightSearch) -> Optional[List[str]]:
+    """
+    Programs to search in multi-program mode (the LoyaltyProgram catalog when
+    all_programs is set), or None for a single-program search. Only explicit
+    lists are capped at SEARCH_MAX_PROGRAMS; the catalog is searched whole,
+    SEARCH_FANOUT_CONCURRENCY programs at a time.
+    """
+    if search_params.all_programs:
+        result = await db.execute(
+            select(LoyaltyProgram.code).where(LoyaltyProgram.code.isnot(None)).order_by(LoyaltyProgram.code)
+        )
+        programs = list(result.scalars())
+        if not programs:
+            raise HTTPException(status_code=400, detail="No loyalty programs are configured")
+    elif search_params.loyalty_programs:
+        programs = search_params.loyalty_programs
+        if len(programs) > settings.SEARCH_MAX_PROGRAMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.SEARCH_MAX_PROGRAMS} loyalty programs can be searched at once"
+            )
+    elif search_params.loyalty_program:
+        return None
+    else:
+        raise HTTPException(
+            status_code=422,
+            detail="One of loyalty_program, loyalty_programs or all_programs is required"
+        )
+    return programs
+
 @router.post("/search", response_model=FlightSearchResponse)
 async def search_flights(
     search_params: FlightSearch,
-    current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Optional[CurrentUser] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    seats_aero: SeatsAeroClient = Depends(get_seats_aero_client)
 ):
     """
     Search for award flights using Seats.aero API
+
+    Results were validated once when they came from Seats.aero, so the
+    response is encoded directly with orjson instead of being re-validated
+    against FlightSearchResponse (which still documents its shape).
+    
+    Filters, sort and page_size are applied server-side. Each page returns
+    next_cursor; sending it back with the same search returns the next page
+    from the cached, pre-sorted result set without calling Seats.aero again.
     """
+    programs = await _resolve_programs(db, search_params)
     try:
-        # Build API request to Seats.aero
-        headers = {
-            "Authorization": f"Bearer {settings.SEATS_AERO_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        # Equivalent searches (case, program spelling) share one cache entry
+        normalized = normalize_search(search_params)
         
-        # Map our parameters to Seats.aero format
-        api_params = {
-            "origin": search_params.origin,
-            "destination": search_params.destination,
-            "departureDate": search_params.departure_date.isoformat(),
-            "cabin": search_params.cabin_class.lower(),
-            "passengers": search_params.passengers,
-            "program": search_params.loyalty_program
-        }
+        # Flexible-date mode fans out one search per day; cached days are reused
+        searches = expand_dates(normalized, search_params.flexible_days)
         
-        # Mock response for development (replace with actual API call)
-        # async with httpx.AsyncClient() as client:
-        #     response = await client.post(
-        #         f"{settings.SEATS_AERO_BASE_URL}/search",
-        #         json=api_params,
-        #         headers=headers
-        #     )
-        #     results = response.json()
+        # Multi-program mode fans out again per program, each with its own time budget
+        timeout = None
+        if programs:
+            searches = expand_programs(searches, programs)
+            timeout = settings.SEARCH_PROGRAM_TIMEOUT
         
-        # Mock flight results for development
-        mock_results = [
-            {
-                "airline": "United Airlines",
-                "flight_number": "UA123",
-                "origin": search_params.origin,
-                "destination": search_params.destination,
-                "departure_time": "2024-03-15T08:00:00",
-                "arrival_time": "2024-03-15T12:00:00",
-                "cabin_class": search_params.cabin_class,
-                "points_required": 35000,
-                "cash_price": 450.00,
-                "availability": 4,
-                "aircraft": "Boeing 737-900",
-                "duration_minutes": 240,
-                "stops": 0
-            },
-            {
-                "airline": "American Airlines",
-                "flight_number": "AA456",
-                "origin": search_params.origin,
-                "destination": search_params.destination,
-                "departure_time": "2024-03-15T10:30:00",
-                "arrival_time": "2024-03-15T14:45:00",
-                "cabin_class": search_params.cabin_class,
-                "points_required": 32500,
-                "cash_price": 425.00,
-                "availability": 2,
-                "aircraft": "Airbus A321",
-                "duration_minutes": 255,
-                "stops": 0
-            },
-            {
-                "airline": "Delta Air Lines",
-                "flight_number": "DL789",
-                "origin": search_params.origin,
-                "destination": search_params.destination,
-                "departure_time": "2024-03-15T14:15:00",
-                "arrival_time": "2024-03-15T18:30:00",
-                "cabin_class": search_params.cabin_class,
-                "points_required": 40000,
-                "cash_price": 480.00,
-                "availability": 6,
-                "aircraft": "Boeing 757-200",
-                "duration_minutes": 255,
-                "stops": 0
-            }
-        ]
+        # Cached, coalesced upstream calls (fall back to mock results without an API key)
+        outcomes = await run_many(searches, seats_aero, timeout)
+        if all(isinstance(o, Exception) for o in outcomes):
+            raise outcomes[0]
         
-        # Save search history if user is logged in
-        if current_user:
-            search_history = SearchHistory(
-                user_id=current_user.id,
-                origin=search_params.origin,
-                destination=search_params.destination,
-                departure_date=search_params.departure_date,
-                cabin_class=search_params.cabin_class,
-                passengers=search_params.passengers,
-                loyalty_program=search_params.loyalty_program,
-                results_count=len(mock_results),
-                lowest_points=min([r["points_required"] for r in mock_results]) if mock_results else None
-            )
-            db.add(search_history)
-            db.commit()
+        by_date = defaultdict(list)
+        by_program = defaultdict(list)
+        for search, outcome in zip(searches, outcomes):
+            by_date[search.departure_date].append(outcome)
+            by_program[search.program].append(outcome)
         
-        return {
-            "results": mock_results,
-            "total_results": len(mock_results),
-            "search_params": search_params.dict()
-        }
+        # Merged, filtered and sorted once; later pages of the same search reuse the view
+        sort = _result_sort(search_params, programs)
+        view = result_views.get(searches, outcomes, _result_filter(search_params), sort)
+        results, next_cursor = result_views.page(view, sort, search_params.cursor, search_params.page_size)
+        if search_params.balances:
+            # Copies: the view's dicts are shared with other requests
+            results = transfer_optimizer.annotate([dict(r) for r in results], search_params.balances)
+        
+        # Save search history if user is logged in (once per search, not per page)
+        if current_user and not search_params.cursor:
+            await _record_search(_search_history_row(
+                current_user.id,
+                search_params,
+                view.total,
+                view.lowest_points
+            ))
+        
+        return InstrumentedORJSONResponse({
+            "results": results,
+            "total_results": len(view.results),
+            "next_cursor": next_cursor,
+            "search_params": search_params.model_dump(mode="json"),
+            "dates": [
+                {"departure_date": date.fromisoformat(day), **_summarize(day_outcomes)}
+                for day, day_outcomes in by_date.items()
+            ] if search_params.flexible_days else None,
+            "programs": [
+                {"loyalty_program": program, **_summarize(program_outcomes)}
+                for program, program_outcomes in by_program.items()
+            ] if programs else None
+        })
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SeatsAeroBudgetExceeded as e:
+        raise _over_budget(e)
+    except SeatsAeroError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/search/stream")
+async def search_flights_stream(
+    search_params: FlightSearch,
+    request: Request,
+    current_user: Optional[CurrentUser] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    seats_aero: SeatsAeroClient = Depends(get_seats_aero_client)
+):
+    """
+    Streaming variant of /search. Emits one `results` frame per source (day
+    and program) as soon as it returns, then a final `summary` frame. NDJSON
+    by default, Server-Sent Events when the client sends `Accept: text/event-stream`.
+    Filters apply to each frame; sort and paging options are ignored.
+    """
+    programs = await _resolve_programs(db, search_params)
+    searches = expand_dates(normalize_search(search_params), search_params.flexible_days)
+    timeout = None
+    if programs:
+        searches = expand_programs(searches, programs)
+        timeout = settings.SEARCH_PROGRAM_TIMEOUT
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    filters = _result_filter(search_params)
+
+    def frame(kind: str, payload: dict) -> bytes:
+        data = orjson.dumps({"type": kind, **payload})
+        return b"event: %s\ndata: %s\n\n" % (kind.encode(), data) if sse else data + b"\n"
+
+    async def frames():
+        # Only running totals are kept; result batches are never buffered
+        total_results = 0
+        lowest_points = None
+        async for search, outcome in iter_many(searches, seats_aero, timeout):
+            source = {"departure_date": search.departure_date, "loyalty_program": search.program}
+            if isinstance(outcome, Exception):
+                yield frame("error", {**source, "error": str(outcome)})
+                continue
+            batch = tag_results(outcome, search.program)
+            if filters:
+                batch = [r for r in batch if filters.matches(r)]
+            if search_params.balances:
+                transfer_optimizer.annotate(batch, search_params.balances)
+            total_results += len(batch)
+            batch_lowest = min((r["points_required"] for r in batch), default=None)
+            if batch_lowest is not None and (lowest_points is None or batch_lowest < lowest_points):
+                lowest_points = batch_lowest
+            yield frame("results", {**source, "results": batch})
+
+        yield frame("summary", {
+            "total_results": total_results,
+            "lowest_points": lowest_points,
+            "search_params": search_params.model_dump(mode="json")
+        })
+
+        if current_user:
+            await _record_search(_search_history_row(current_user.id, search_params, total_results, lowest_points))
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/funding", response_model=FundingResponse)
+async def plan_funding(
+    funding_params: FundingRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user)
+):
+    """
+    Cheapest way to fund each given result from transferable balances, using
+    the transfer partners in the LoyaltyProgram catalog. The same plan /search
+    adds to every result when the request carries balances.
+    """
+    results = [r.model_dump(exclude={"funding"}) for r in funding_params.results]
+    for r in results:
+        if r["loyalty_program"]:
+            r["loyalty_program"] = canonical_program(r["loyalty_program"])
+    transfer_optimizer.annotate(results, funding_params.balances)
+    return InstrumentedORJSONResponse({"results": results})
+
+@router.post("/routes", response_model=RouteSearchResponse)
+async def search_routes(
+    route_params: RouteSearch,
+    current_user: Optional[CurrentUser] = Depends(get_current_user)
+):
+    """
+    Ranked itineraries with connections through major hubs, cheapest in points
+    first. Built only from award segments already in the search cache (no
+    Seats.aero calls), so legs nobody has searched recently are not offered.
+    """
+    origin = route_params.origin.strip().upper()
+    destination = route_params.destination.strip().upper()
+    if origin == destination:
+        raise HTTPException(status_code=400, detail="Origin and destination must differ")
+    
+    itineraries = segment_graph.routes(
+        origin,
+        destination,
+        route_params.departure_date,
+        route_params.cabin_class.value,
+        airport_index.hubs(),
+        passengers=route_params.passengers,
+        programs=[canonical_program(p) for p in route_params.loyalty_programs or ()],
+        max_stops=route_params.max_stops,
+        min_connection=(timedelta(minutes=route_params.min_connection_minutes)
+                        if route_params.min_connection_minutes is not None else None),
+        max_connection=(timedelta(hours=route_params.max_connection_hours)
+                        if route_params.max_connection_hours is not None else None),
+        limit=route_params.limit
+    )
+    return InstrumentedORJSONResponse({
+        "itineraries": itineraries,
+        "total_results": len(itineraries),
+        "search_params": route_params.model_dump(mode="json")
+    })
+
 @router.get("/airports", response_model=List[dict])
 async def search_airports(
     query: str = Query(..., min_length=2),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Search for airports by name, city, or IATA code
     """
-    # Search in database
-    airports = db.query(Airport).filter(
-        (Airport.iata_code.ilike(f"%{query}%")) |
-        (Airport.name.ilike(f"%{query}%")) |
-        (Airport.city.ilike(f"%{query}%"))
-    ).limit(10).all()
+    if airport_index.ready:
+        # Prefix lookup in the in-process index, no DB round trip
+        airports = airport_index.search(query, limit=10)
+    else:
+        # Index is cold (startup failed or still loading): ranked trigram search in database
+        airports = await search_airports_db(db, query, limit=10)
     
     # If no results, return mock data for development
     if not airports:
@@ -163,21 +358,110 @@ async def search_airports(
         ]
         return [a for a in mock_airports if query.lower() in a["iata_code"].lower() or query.lower() in a["city"].lower()]
     
-    return [
-        {
-            "iata_code": a.iata_code,
-            "name": a.name,
-            "city": a.city,
-            "country": a.country
-        }
-        for a in airports
-    ]
+    return airports
+
+@router.get("/airports/nearby", response_model=List[dict])
+async def nearby_airports(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=5000),
+    k: Optional[int] = Query(None, ge=1, le=500),
+    major_hub: Optional[bool] = None,
+    has_lounge: Optional[bool] = None,
+):
+    """
+    Find airports near a coordinate, closest first. Use `radius_km` for all
+    airports within a distance, `k` for the k nearest, or both.
+    """
+    if radius_km is None and k is None:
+        k = 10
+    if airport_geo.snapshot is None:
+        # Loaded at startup and retried by the background refresh
+        raise HTTPException(status_code=503, detail="Airport locations are not loaded yet")
+    return airport_geo.nearby(lat, lon, radius_km=radius_km, k=k, major_hub=major_hub, has_lounge=has_lounge)
+
+def _history_range(days: int) -> tuple:
+    until = datetime.utcnow().date()
+    return until - timedelta(days=days - 1), until
+
+@router.get("/price-history")
+async def get_price_history(
+    origin: str = Query(..., min_length=3, max_length=3),
+    destination: str = Query(..., min_length=3, max_length=3),
+    cabin_class: CabinClassEnum = Query(...),
+    loyalty_program: Optional[str] = Query(None, description="All programs when omitted"),
+    days: int = Query(90, ge=1, le=730),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    How award prices on a route have moved: one entry per day, or per week
+    past the daily retention, with the range and median of observed prices.
+    Weeks only partly inside the range are left out.
+    """
+    since, until = _history_range(days)
+    program = canonical_program(loyalty_program) if loyalty_program else None
+    history = await price_history(db, origin, destination, cabin_class.value, program, since, until)
+    return {
+        "origin": origin.upper(),
+        "destination": destination.upper(),
+        "cabin_class": cabin_class.value,
+        "loyalty_program": program,
+        "history": history
+    }
+
+@router.get("/price-percentiles")
+async def get_price_percentiles(
+    origin: str = Query(..., min_length=3, max_length=3),
+    destination: str = Query(..., min_length=3, max_length=3),
+    cabin_class: CabinClassEnum = Query(...),
+    loyalty_program: Optional[str] = Query(None, description="All programs when omitted"),
+    days: int = Query(90, ge=1, le=730),
+    percentiles: str = Query("10,25,50,75,90", description="Comma-separated, 0-100"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Distribution of award prices observed on a route over the last ``days``.
+    Where that reaches past the daily retention, only whole weeks inside the
+    range are counted.
+    """
+    try:
+        wanted = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        wanted = []
+    if not wanted or len(wanted) > 20 or not all(0 <= p <= 100 for p in wanted):
+        raise HTTPException(status_code=400, detail="percentiles must be up to 20 comma-separated numbers from 0 to 100")
+    since, until = _history_range(days)
+    program = canonical_program(loyalty_program) if loyalty_program else None
+    summary = await price_percentiles(db, origin, destination, cabin_class.value, program, since, until, wanted)
+    return {
+        "origin": origin.upper(),
+        "destination": destination.upper(),
+        "cabin_class": cabin_class.value,
+        "loyalty_program": program,
+        "since": since,
+        **summary
+    }
 
 @router.get("/popular-routes")
-async def get_popular_routes():
+async def get_popular_routes(
+    days: int = Query(30, description="Rolling window in days"),
+    limit: int = Query(10, ge=1, le=50)
+):
     """
-    Get popular award flight routes
+    Get popular award flight routes, most searched first
     """
+    routes = popular_routes.top(days, limit)
+    if routes is None:
+        if popular_routes.windows:
+            raise HTTPException(
+                status_code=400,
+                detail=f"days must be one of {sorted(popular_routes.windows)}"
+            )
+        routes = []
+    if routes:
+        return routes
+    
+    # Until searches have been recorded
     return [
         {
             "origin": "JFK",
@@ -203,23 +487,21 @@ async def get_popular_routes():
             "avg_points": 45000,
             "best_program": "Delta SkyMiles"
         }
-    ]
+    ][:limit]
 
 @router.get("/availability/{flight_id}")
 async def check_availability(
     flight_id: str,
     date: date,
-    passengers: int = 1
+    passengers: int = 1,
+    seats_aero: SeatsAeroClient = Depends(get_seats_aero_client)
 ):
     """
     Check real-time availability for a specific flight
     """
-    # TODO: Implement real-time availability check with Seats.aero
-    return {
-        "flight_id": flight_id,
-        "date": date,
-        "available_seats": 4,
-        "cabin_class": "business",
-        "points_required": 75000,
-        "taxes_fees": 125.50
-    }
+    try:
+        return await seats_aero.availability(flight_id, date, passengers)
+    except SeatsAeroBudgetExceeded as e:
+        raise _over_budget(e)
+    except SeatsAeroError as e:
+        raise HTTPException(status_code=502, detail=str(e))
@@ -2,16 +2,16 @@
 User management endpoints
 """
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.models.models import User
+from app.services.user_cache import CurrentUser
 from app.api.endpoints.auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/profile")
-async def get_profile(current_user: User = Depends(get_current_user)):
+async def get_profile(current_user: CurrentUser = Depends(get_current_user)):
     """Get user profile"""
     return {
         "id": current_user.id,
@@ -24,8 +24,8 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 @router.put("/profile")
 async def update_profile(
     profile_data: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile"""
     # TODO: Implement profile update
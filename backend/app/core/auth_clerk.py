@@ -1,17 +1,32 @@
 """
 Clerk JWT verification utilities for FastAPI
+
+Signing keys come from an in-process JWKS cache that is prefetched at startup
+and refreshed in the background; a token signed with an unknown ``kid``
+forces a refresh, at most once per CLERK_JWKS_MIN_REFRESH_SECONDS. Verified
+claims are cached per token (keyed by its SHA-256, never past its ``exp``), so
+a repeat token costs one dictionary lookup instead of an RS256 verification.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
+import httpx
 from fastapi import HTTPException, Request, status
+from jwt import PyJWKSet, get_unverified_header
 from jwt import decode as jwt_decode
-from jwt import PyJWKClient
 
+from app.core import metrics
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 @lru_cache(maxsize=1)
 def _jwks_url() -> str:
@@ -25,19 +40,148 @@ def _jwks_url() -> str:
     raise RuntimeError("Clerk JWKS URL is not configured. Set CLERK_JWKS_URL or CLERK_DOMAIN or CLERK_ISSUER")
 
 
-@lru_cache(maxsize=1)
-def _jwk_client() -> PyJWKClient:
-    return PyJWKClient(_jwks_url())
+def clerk_configured() -> bool:
+    return bool(settings.CLERK_JWKS_URL or settings.CLERK_DOMAIN or settings.CLERK_ISSUER)
+
+
+class JWKSCache:
+    """Signing keys by ``kid``, fetched asynchronously and swapped in whole."""
+
+    def __init__(self, url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._url = url
+        self._transport = transport
+        self.keys: Dict[str, Any] = {}
+        self.fetched_at = 0.0
+        self._last_forced = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.counters = {"refreshes": 0, "forced_refreshes": 0, "forced_throttled": 0, "errors": 0}
+
+    async def refresh(self) -> None:
+        async with httpx.AsyncClient(transport=self._transport, timeout=5.0) as client:
+            response = await client.get(self._url or _jwks_url())
+            response.raise_for_status()
+        jwk_set = PyJWKSet.from_dict(response.json())
+        self.keys = {k.key_id: k.key for k in jwk_set.keys if k.key_id}
+        self.fetched_at = time.monotonic()
+        self.counters["refreshes"] += 1
+
+    async def key_for(self, kid: Optional[str]) -> Any:
+        """Signing key for ``kid``, forcing one rate-limited refresh when it is unknown."""
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            key = self.keys.get(kid)
+            if key is not None:
+                return key
+            if time.monotonic() - self._last_forced < settings.CLERK_JWKS_MIN_REFRESH_SECONDS:
+                self.counters["forced_throttled"] += 1
+                return None
+            self._last_forced = time.monotonic()
+            self.counters["forced_refreshes"] += 1
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.warning("JWKS refresh failed: %s", e)
+            return self.keys.get(kid)
+
+    def start_refresh(self, interval: float) -> None:
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    logger.warning("JWKS refresh failed: %s", e)
+
+        if self._refresh_task is None and interval > 0:
+            self._refresh_task = asyncio.create_task(refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+class ClaimsCache:
+    """LRU of verified claims keyed by token hash, each entry expiring at the token's ``exp``."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.counters["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return claims
+
+    def peek(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Unexpired claims for ``key`` without counting a lookup or touching LRU order."""
+        entry = self._entries.get(key)
+        if entry is None or time.time() >= entry[0]:
+            return None
+        return entry[1]
+
+    def set(self, key: bytes, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_size <= 0:
+            return
+        self._entries[key] = (float(exp), claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "size": len(self._entries)}
+
+
+jwks_cache = JWKSCache()
+claims_cache = ClaimsCache(settings.CLERK_CLAIMS_CACHE_SIZE)
 
 
-def verify_clerk_jwt(token: str) -> Dict[str, Any]:
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+async def verify_clerk_jwt(token: str) -> Dict[str, Any]:
     """
     Verify a Clerk JWT token using JWKS (PyJWT). Returns decoded claims on success.
     """
     if not token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
+        raise _unauthorized("Missing token")
+    started = time.perf_counter()
+    cache_key = ClaimsCache.key(token)
+    claims = claims_cache.get(cache_key)
+    if claims is not None:
+        metrics.jwt_verify_duration.observe(time.perf_counter() - started, "clerk", "cached")
+        return claims
+    result = "invalid"
     try:
-        signing_key = _jwk_client().get_signing_key_from_jwt(token).key
+        signing_key = await jwks_cache.key_for(get_unverified_header(token).get("kid"))
+        if signing_key is None:
+            raise _unauthorized("Invalid token: unknown signing key")
         claims = jwt_decode(
             token,
             signing_key,
@@ -45,19 +189,29 @@ def verify_clerk_jwt(token: str) -> Dict[str, Any]:
             audience=settings.CLERK_AUDIENCE if settings.CLERK_AUDIENCE else None,
             issuer=settings.CLERK_ISSUER if settings.CLERK_ISSUER else None,
         )
-        return claims
+        result = "ok"
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {e}")
+        raise _unauthorized(f"Invalid token: {e}")
+    finally:
+        metrics.jwt_verify_duration.observe(time.perf_counter() - started, "clerk", result)
+    claims_cache.set(cache_key, claims)
+    return claims
 
 
-def clerk_require_user(request: Request) -> Dict[str, Any]:
+async def clerk_require_user(request: Request) -> Dict[str, Any]:
     """
     FastAPI dependency that extracts and verifies a Clerk JWT from the Authorization header.
     Attaches claims and returns them. Raises 401 on failure.
     """
     auth_header: Optional[str] = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header missing or malformed")
+        raise _unauthorized("Authorization header missing or malformed")
     token = auth_header.split(" ", 1)[1]
-    claims = verify_clerk_jwt(token)
+    claims = await verify_clerk_jwt(token)
     return claims
+
+
+def stats() -> Dict[str, Any]:
+    return {"claims_cache": claims_cache.stats(), "jwks": {**jwks_cache.counters, "keys": len(jwks_cache.keys)}}
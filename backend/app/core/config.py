@@ -49,7 +49,21 @@ class Settings(BaseSettings):
     
     # External APIs
     SEATS_AERO_API_KEY: str = Field(default="", env="SEATS_AERO_API_KEY")
-    SEATS_AERO_BASE_URL: str = "https://api.seats.aero/v1"
+    SEATS_AERO_BASE_URL: str = Field(default="https://api.seats.aero/v1", env="SEATS_AERO_BASE_URL")
+
+    # Seats.aero connection pool (one shared client per worker)
+    SEATS_AERO_HTTP2: bool = Field(default=True, env="SEATS_AERO_HTTP2")
+    SEATS_AERO_MAX_CONNECTIONS: int = Field(default=100, env="SEATS_AERO_MAX_CONNECTIONS")
+    SEATS_AERO_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20, env="SEATS_AERO_MAX_KEEPALIVE_CONNECTIONS")
+    SEATS_AERO_KEEPALIVE_EXPIRY: float = Field(default=30.0, env="SEATS_AERO_KEEPALIVE_EXPIRY")
+    SEATS_AERO_CONNECT_TIMEOUT: float = Field(default=3.0, env="SEATS_AERO_CONNECT_TIMEOUT")
+    SEATS_AERO_POOL_TIMEOUT: float = Field(default=2.0, env="SEATS_AERO_POOL_TIMEOUT")
+    # Total time budget (seconds) for a single upstream call
+    SEATS_AERO_TIMEOUT: float = Field(default=10.0, env="SEATS_AERO_TIMEOUT")
+    # Upstream call budget shared by all workers and nodes through Redis: calls per minute and
+    # burst (0 = per-minute amount); 0 disables. Calls over budget fail with SeatsAeroBudgetExceeded
+    SEATS_AERO_BUDGET_PER_MINUTE: int = Field(default=0, env="SEATS_AERO_BUDGET_PER_MINUTE")
+    SEATS_AERO_BUDGET_BURST: int = Field(default=0, env="SEATS_AERO_BUDGET_BURST")
     
     # Email
     RESEND_API_KEY: str = Field(default="", env="RESEND_API_KEY")
@@ -57,9 +71,89 @@ class Settings(BaseSettings):
     
     # Redis (for caching)
     REDIS_URL: str = Field(default="redis://localhost:6379", env="REDIS_URL")
+    REDIS_SOCKET_TIMEOUT: float = Field(default=0.25, env="REDIS_SOCKET_TIMEOUT")
+    REDIS_MAX_CONNECTIONS: int = Field(default=50, env="REDIS_MAX_CONNECTIONS")
+    # Seconds to skip Redis after a connection error
+    REDIS_RETRY_AFTER: float = Field(default=30.0, env="REDIS_RETRY_AFTER")
+
+    # Award search result cache (fresh TTL per cabin, then served stale while refreshing)
+    SEARCH_CACHE_ENABLED: bool = Field(default=True, env="SEARCH_CACHE_ENABLED")
+    SEARCH_CACHE_TTL_ECONOMY: int = Field(default=600, env="SEARCH_CACHE_TTL_ECONOMY")
+    SEARCH_CACHE_TTL_PREMIUM_ECONOMY: int = Field(default=600, env="SEARCH_CACHE_TTL_PREMIUM_ECONOMY")
+    SEARCH_CACHE_TTL_BUSINESS: int = Field(default=300, env="SEARCH_CACHE_TTL_BUSINESS")
+    SEARCH_CACHE_TTL_FIRST: int = Field(default=300, env="SEARCH_CACHE_TTL_FIRST")
+    SEARCH_CACHE_STALE_SECONDS: int = Field(default=3600, env="SEARCH_CACHE_STALE_SECONDS")
+    SEARCH_CACHE_LRU_SIZE: int = Field(default=2048, env="SEARCH_CACHE_LRU_SIZE")
+    # Merged, filtered and sorted result sets kept for paging
+    SEARCH_VIEW_CACHE_SIZE: int = Field(default=256, env="SEARCH_VIEW_CACHE_SIZE")
+
+    # Coalesce identical concurrent searches across workers with a short Redis lock
+    SEARCH_COALESCE_REDIS_LOCK: bool = Field(default=False, env="SEARCH_COALESCE_REDIS_LOCK")
+    SEARCH_COALESCE_LOCK_MS: int = Field(default=5000, env="SEARCH_COALESCE_LOCK_MS")
+    SEARCH_COALESCE_POLL_MS: int = Field(default=50, env="SEARCH_COALESCE_POLL_MS")
+
+    # Maximum concurrent upstream calls when one request fans out (flexible dates, multiple programs)
+    SEARCH_FANOUT_CONCURRENCY: int = Field(default=8, env="SEARCH_FANOUT_CONCURRENCY")
+    
+    # Multi-program search: per-program time budget (seconds) and maximum programs in an explicit
+    # loyalty_programs list (all_programs always covers the whole catalog)
+    SEARCH_PROGRAM_TIMEOUT: float = Field(default=8.0, env="SEARCH_PROGRAM_TIMEOUT")
+    SEARCH_MAX_PROGRAMS: int = Field(default=16, env="SEARCH_MAX_PROGRAMS")
+
+    # Hub routing over cached segments: default connection window and the most
+    # searches whose results are kept in the segment graph
+    ROUTING_MIN_CONNECTION_MINUTES: int = Field(default=60, env="ROUTING_MIN_CONNECTION_MINUTES")
+    ROUTING_MAX_CONNECTION_HOURS: int = Field(default=24, env="ROUTING_MAX_CONNECTION_HOURS")
+    ROUTING_MAX_SEARCHES: int = Field(default=20000, env="ROUTING_MAX_SEARCHES")
+    
+    # Write-behind search history: batch size, max seconds a row waits, queue bound,
+    # and the fraction of rows kept once the queue is more than 75% full
+    SEARCH_HISTORY_BATCH_SIZE: int = Field(default=500, env="SEARCH_HISTORY_BATCH_SIZE")
+    SEARCH_HISTORY_FLUSH_SECONDS: float = Field(default=1.0, env="SEARCH_HISTORY_FLUSH_SECONDS")
+    SEARCH_HISTORY_QUEUE_SIZE: int = Field(default=10000, env="SEARCH_HISTORY_QUEUE_SIZE")
+    SEARCH_HISTORY_OVERLOAD_SAMPLE: float = Field(default=0.1, env="SEARCH_HISTORY_OVERLOAD_SAMPLE")
     
-    # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 60
+    # Popular routes snapshot: refresh interval (seconds), rolling windows (days), routes kept per window,
+    # and seconds between deletions of expired daily buckets (Celery worker)
+    POPULAR_ROUTES_REFRESH_SECONDS: int = Field(default=300, env="POPULAR_ROUTES_REFRESH_SECONDS")
+    POPULAR_ROUTES_WINDOWS: List[int] = Field(default=[7, 30], env="POPULAR_ROUTES_WINDOWS")
+    POPULAR_ROUTES_TOP_N: int = Field(default=50, env="POPULAR_ROUTES_TOP_N")
+    POPULAR_ROUTES_PRUNE_SECONDS: int = Field(default=3600, env="POPULAR_ROUTES_PRUNE_SECONDS")
+    
+    # Saved-search alerts (Celery worker; the broker defaults to REDIS_URL)
+    CELERY_BROKER_URL: str = Field(default="", env="CELERY_BROKER_URL")
+    ALERT_EVALUATION_SECONDS: int = Field(default=900, env="ALERT_EVALUATION_SECONDS")
+    # Distinct searches evaluated per chunk, concurrent upstream calls, notifications per queued task
+    ALERT_BATCH_SIZE: int = Field(default=1000, env="ALERT_BATCH_SIZE")
+    ALERT_CONCURRENCY: int = Field(default=16, env="ALERT_CONCURRENCY")
+    ALERT_NOTIFY_BATCH: int = Field(default=100, env="ALERT_NOTIFY_BATCH")
+    # Hours before an alert at an unchanged price is sent again
+    ALERT_RENOTIFY_HOURS: int = Field(default=24, env="ALERT_RENOTIFY_HOURS")
+    
+    # Airport autocomplete index (seconds between full reloads; 0 disables)
+    AIRPORT_INDEX_REFRESH_SECONDS: int = Field(default=3600, env="AIRPORT_INDEX_REFRESH_SECONDS")
+
+    # Award price history: seconds between per-worker flushes (0 disables recording), days kept
+    # at daily resolution before downsampling to weeks, days kept at all, and compaction interval
+    AVAILABILITY_FLUSH_SECONDS: int = Field(default=60, env="AVAILABILITY_FLUSH_SECONDS")
+    AVAILABILITY_DAILY_RETENTION_DAYS: int = Field(default=90, env="AVAILABILITY_DAILY_RETENTION_DAYS")
+    AVAILABILITY_RETENTION_DAYS: int = Field(default=730, env="AVAILABILITY_RETENTION_DAYS")
+    AVAILABILITY_COMPACT_SECONDS: int = Field(default=3600, env="AVAILABILITY_COMPACT_SECONDS")
+
+    # Transfer-partner matrix built from the LoyaltyProgram catalog (seconds between reloads; 0 disables)
+    TRANSFER_MATRIX_REFRESH_SECONDS: int = Field(default=3600, env="TRANSFER_MATRIX_REFRESH_SECONDS")
+
+    # Authenticated-user snapshot cache (set USER_CACHE_ENABLED=false for a lookup per request)
+    USER_CACHE_ENABLED: bool = Field(default=True, env="USER_CACHE_ENABLED")
+    USER_CACHE_TTL_SECONDS: float = Field(default=60.0, env="USER_CACHE_TTL_SECONDS")
+    USER_CACHE_SIZE: int = Field(default=10000, env="USER_CACHE_SIZE")
+
+    # Rate limiting per user (authenticated) or client IP, shared through Redis (per worker without it)
+    RATE_LIMIT_ENABLED: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    RATE_LIMIT_PER_MINUTE: int = Field(default=60, env="RATE_LIMIT_PER_MINUTE")
+
+    # Prometheus metrics on /metrics (per worker process)
+    METRICS_ENABLED: bool = Field(default=True, env="METRICS_ENABLED")
 
     # Clerk Auth (JWT verification)
     CLERK_ISSUER: str = Field(default="", env="CLERK_ISSUER")
@@ -67,6 +161,11 @@ class Settings(BaseSettings):
     # Either provide domain (we derive issuer and JWKS), or provide JWKS directly
     CLERK_DOMAIN: Optional[str] = Field(default=None, env="CLERK_DOMAIN")
     CLERK_JWKS_URL: Optional[str] = Field(default=None, env="CLERK_JWKS_URL")
+    # Background JWKS refresh interval, minimum seconds between refreshes forced by an
+    # unknown kid, and verified-claims cache size (entries expire with the token)
+    CLERK_JWKS_REFRESH_SECONDS: int = Field(default=3600, env="CLERK_JWKS_REFRESH_SECONDS")
+    CLERK_JWKS_MIN_REFRESH_SECONDS: float = Field(default=30.0, env="CLERK_JWKS_MIN_REFRESH_SECONDS")
+    CLERK_CLAIMS_CACHE_SIZE: int = Field(default=10000, env="CLERK_CLAIMS_CACHE_SIZE")
 
     class Config:
         env_file = ".env"
@@ -1,39 +1,108 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.core import metrics
 from app.core.config import settings
 
+# Async drivers used for each configured backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Rewrite a sync DATABASE_URL (e.g. postgresql://) to its async driver."""
+    parsed = make_url(url)
+    backend = parsed.drivername.split("+", 1)[0]
+    if backend in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default async queue pool, recording how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.observe(time.perf_counter() - started)
+
+
+def create_engine_for(url: str, **kwargs):
+    """Create an async engine, applying pool sizing only where the pool supports it."""
+    url = async_database_url(url)
+    if not url.startswith("sqlite") and "poolclass" not in kwargs:
+        kwargs["poolclass"] = TimedQueuePool
+        kwargs.setdefault("pool_pre_ping", True)
+        kwargs.setdefault("pool_size", 10)
+        kwargs.setdefault("max_overflow", 20)
+    return create_async_engine(url, **kwargs)
+
+
+# Statement types reported by db_query_duration_seconds; anything else is "other"
+_STATEMENT_TYPES = {"select": "select", "insert": "insert", "update": "update", "delete": "delete", "with": "select"}
+
+
+def instrument_engine(async_engine) -> None:
+    """Time every statement the engine executes and expose its pool's checked-out count."""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            verb = "".join(statement[:16].split(None, 1)[:1]).lower()
+            metrics.db_query_duration.observe(time.perf_counter() - started, _STATEMENT_TYPES.get(verb, "other"))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _discard_timer(exception_context):
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop("query_started", None)
+
+    pool = sync_engine.pool
+    if hasattr(pool, "checkedout"):
+        metrics.db_pool_checked_out.set_function(pool.checkedout)
+
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+engine = create_engine_for(settings.DATABASE_URL)
+instrument_engine(engine)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-# Base class for models
-Base = declarative_base()
+# Base class for models (AsyncAttrs allows `await obj.awaitable_attrs.<relationship>`)
+Base = declarative_base(cls=AsyncAttrs)
 
-def get_db():
+async def get_db():
     """
     Dependency to get database session
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def init_db():
+async def init_db():
     """
-    Initialize database tables
+    Initialize database tables (development only; use `alembic upgrade head` elsewhere)
     """
     from app.models import models  # Import models to register them
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
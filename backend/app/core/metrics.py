@@ -0,0 +1,201 @@
+"""
+In-process metrics in the Prometheus text format
+
+A deliberately small registry: counters, gauges and fixed-bucket histograms
+keyed by label-value tuples, rendered on ``GET /metrics``. Recording is a dict
+lookup, a bisect and a few additions, so timers can sit on every request
+without a measurable cost. Values are per worker process; Prometheus sums
+them across the scrape targets.
+
+Request latency is recorded by MetricsMiddleware; the per-phase timers below
+are fed by the Seats.aero client, the database engine events, JWT verification
+and the instrumented response classes.
+"""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; covers sub-millisecond cache hits up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_format_value(v)}" for labels, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one read from ``function`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(float(self._function()))}"]
+        return [f"{self.name}{self._labels(labels)} {_format_value(v)}" for labels, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; each series is per-bucket counts (last is +Inf) and a running sum."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "".join(metric.render() for metric in _registry)
+
+
+# Requests (recorded by app.core.middleware.MetricsMiddleware)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status, including the response body",
+    ("method", "route", "status"),
+)
+
+# Phases of a request
+seats_aero_request_duration = Histogram(
+    "seats_aero_request_duration_seconds",
+    "Seats.aero API call latency by operation and outcome",
+    ("operation", "outcome"),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ("statement",),
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection (including opening a new one)",
+)
+db_pool_checked_out = Gauge("db_pool_connections_checked_out", "Database connections currently checked out")
+jwt_verify_duration = Histogram(
+    "jwt_verify_duration_seconds",
+    "JWT verification time by scheme and result",
+    ("scheme", "result"),
+)
+response_render_duration = Histogram(
+    "response_render_duration_seconds",
+    "JSON response body serialization time",
+)
+
+
+class InstrumentedJSONResponse(JSONResponse):
+    """The default JSONResponse, timing how long each body takes to serialize."""
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        response_render_duration.observe(time.perf_counter() - started)
+        return body
+
+
+class InstrumentedORJSONResponse(ORJSONResponse):
+    """orjson-encoded response for endpoints that return already-validated data, timed the same way."""
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        response_render_duration.observe(time.perf_counter() - started)
+        return body
@@ -0,0 +1,142 @@
+"""
+Pure ASGI middleware
+
+Each layer works on the raw ASGI messages instead of subclassing
+BaseHTTPMiddleware, so responses (including StreamingResponse) pass straight
+through without an extra task and memory stream per request. Headers are added
+by rewriting the ``http.response.start`` message.
+"""
+from __future__ import annotations
+
+import json
+import math
+import time
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, api_rate_limiter, client_key
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class SecurityHeadersMiddleware:
+    """Add security headers to every HTTP response that does not already set them."""
+
+    # Keep docs usable during development by not enforcing CSP there
+    CSP_EXEMPT_PREFIXES = ("/docs", "/redoc")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        headers: Headers = [
+            (b"x-frame-options", b"DENY"),
+            (b"x-content-type-options", b"nosniff"),
+            (b"referrer-policy", b"no-referrer"),
+            (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+        ]
+        if settings.ENVIRONMENT == "production":
+            # Enable HSTS only in production behind HTTPS
+            headers.append((b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload"))
+        self.headers = headers
+        self.csp = (b"content-security-policy", b"default-src 'self'")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        extra = self.headers
+        if not scope["path"].startswith(self.CSP_EXEMPT_PREFIXES):
+            extra = [self.csp, *extra]
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                present = {name.lower() for name, _ in headers}
+                headers.extend(h for h in extra if h[0] not in present)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class RateLimitMiddleware:
+    """
+    Per-client token bucket: RATE_LIMIT_PER_MINUTE requests per minute with
+    bursts up to the same amount, answered with 429 and Retry-After once spent.
+    Clients are users when the request carries a valid token, else IP
+    addresses; buckets are shared across workers through Redis (see
+    app.core.rate_limit), at one round trip per request.
+    """
+
+    EXEMPT_PATHS = frozenset({"/", "/health", "/metrics"})
+
+    def __init__(self, app: ASGIApp, per_minute: int = 0):
+        self.app = app
+        self.limiter = RateLimiter("api", per_minute) if per_minute else api_rate_limiter
+        self.capacity = self.limiter.capacity
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        auth = next((value for name, value in scope["headers"] if name == b"authorization"), b"")
+        retry_after = await self.limiter.take(client_key(auth, scope.get("client")))
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"error": f"Rate limit exceeded: {int(self.capacity)} per 1 minute"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class MetricsMiddleware:
+    """
+    Track in-flight requests and record each request's latency, labelled by
+    method, route template (not the raw path, to bound cardinality) and status.
+    Requests answered before routing (429s, CORS preflights, 404s) are labelled
+    ``route="unrouted"``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests_in_flight.dec()
+            # The router adds the matched route to the (shared) scope
+            route = scope.get("route")
+            metrics.http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unrouted"),
+                str(status),
+            )
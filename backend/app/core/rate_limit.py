@@ -0,0 +1,159 @@
+"""
+Distributed token-bucket rate limiting
+
+Buckets live in Redis as small hashes (tokens, last refill time) and are
+checked and spent by one Lua script, so every worker and node shares them. A
+check costs one EVALSHA round trip; only the first call after a Redis restart
+needs a second one to reload the script. The script reads the clock from Redis,
+so skew between nodes does not matter. Each bucket expires once it would be full
+again.
+
+When Redis is disabled or backing off (see app.core.redis), each limiter uses a
+per-process bucket instead. Limits are then enforced per worker, as they were
+before Redis.
+
+Two limiters are defined here:
+* ``api_rate_limiter``: RATE_LIMIT_PER_MINUTE requests per client, where the
+  client is the user for authenticated requests and the IP address otherwise
+* ``seats_aero_budget``: one global bucket of SEATS_AERO_BUDGET_PER_MINUTE
+  upstream calls, shared by the API workers and the Celery worker
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.auth_clerk import ClaimsCache, claims_cache
+from app.core.config import settings
+from app.core.redis import get_redis, mark_redis_failure
+
+# KEYS[1] bucket; ARGV capacity, refill tokens per second, cost.
+# Returns {allowed (0/1), milliseconds until cost tokens are available, tokens left}
+_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, wait = 0, 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  wait = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, wait, math.floor(tokens)}
+"""
+_TOKEN_BUCKET_SHA = hashlib.sha1(_TOKEN_BUCKET.encode()).hexdigest()
+
+
+class LocalBuckets:
+    """Per-process token buckets, used while Redis is unavailable."""
+
+    # Prune full buckets once this many keys are tracked
+    MAX_TRACKED = 50000
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, cost: float = 1.0) -> float:
+        """Spend ``cost`` tokens for ``key``; returns 0 when allowed, else seconds until they are free."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self.buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+        self.buckets[key] = (tokens - cost, now)
+        if len(self.buckets) > self.MAX_TRACKED:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        full_after = self.capacity / self.rate
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < full_after}
+
+
+class RateLimiter:
+    """
+    Buckets of ``burst`` tokens (default ``per_minute``), refilled at
+    ``per_minute`` tokens per minute. ``per_minute=0`` disables the limiter.
+    """
+
+    def __init__(self, name: str, per_minute: int, burst: int = 0):
+        self.name = name
+        self.capacity = float(burst or per_minute)
+        self.rate = per_minute / 60.0
+        self.local = LocalBuckets(self.capacity, self.rate) if per_minute > 0 else None
+        self.counters = {"allowed": 0, "limited": 0, "local": 0, "script_loads": 0}
+
+    async def _take_redis(self, redis, key: str, cost: float) -> float:
+        args = (1, f"ratelimit:{self.name}:{key}", self.capacity, self.rate, cost)
+        try:
+            allowed, wait_ms, _ = await redis.evalsha(_TOKEN_BUCKET_SHA, *args)
+        except NoScriptError:
+            # EVAL caches the script, so later calls are one EVALSHA again
+            self.counters["script_loads"] += 1
+            allowed, wait_ms, _ = await redis.eval(_TOKEN_BUCKET, *args)
+        return 0.0 if allowed else int(wait_ms) / 1000
+
+    async def take(self, key: str, cost: float = 1.0) -> float:
+        """Spend ``cost`` tokens from ``key``'s bucket; 0 when allowed, else seconds to wait."""
+        if self.local is None:
+            return 0.0
+        redis = get_redis()
+        wait = None
+        if redis is not None:
+            try:
+                wait = await self._take_redis(redis, key, cost)
+            except RedisError as e:
+                mark_redis_failure(e)
+        if wait is None:
+            self.counters["local"] += 1
+            wait = self.local.take(key, cost)
+        self.counters["limited" if wait else "allowed"] += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "capacity": int(self.capacity), "local_buckets": len(self.local.buckets) if self.local else 0}
+
+
+def client_key(auth: bytes, client: Optional[Tuple[str, int]]) -> str:
+    """
+    Rate limit key for a request's Authorization header and client address:
+    ``user:<id>`` for a valid API token, ``clerk:<sub>`` for a Clerk token this
+    worker has already verified, else ``ip:<address>``.
+    """
+    if auth[:7].lower() == b"bearer ":
+        token = auth[7:].decode("latin-1").strip()
+        try:
+            # HS256 verification is a few microseconds; Clerk (RS256) tokens are
+            # only recognised from the claims cache, never verified here
+            subject = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+            if subject is not None:
+                return f"user:{subject}"
+        except JWTError:
+            claims = claims_cache.peek(ClaimsCache.key(token))
+            if claims is not None and claims.get("sub"):
+                return f"clerk:{claims['sub']}"
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+api_rate_limiter = RateLimiter("api", settings.RATE_LIMIT_PER_MINUTE)
+seats_aero_budget = RateLimiter("seats_aero", settings.SEATS_AERO_BUDGET_PER_MINUTE, settings.SEATS_AERO_BUDGET_BURST)
+
+
+def stats() -> Dict[str, Any]:
+    return {"api": api_rate_limiter.stats(), "seats_aero_budget": seats_aero_budget.stats()}
@@ -0,0 +1,50 @@
+"""
+Shared Redis connection for caching and cross-worker coordination
+
+Redis is an accelerator, not a hard dependency: when it is unreachable callers
+get ``None`` for a short back-off window and fall back to in-process behaviour.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[Redis] = None
+_down_until: float = 0.0
+
+
+def get_redis() -> Optional[Redis]:
+    """Return the shared client, or None if Redis is disabled or backing off."""
+    global _redis
+    if not settings.REDIS_URL or time.monotonic() < _down_until:
+        return None
+    if _redis is None:
+        _redis = Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+    return _redis
+
+
+def mark_redis_failure(exc: Exception) -> None:
+    """Skip Redis for REDIS_RETRY_AFTER seconds after a connection error."""
+    global _down_until
+    if time.monotonic() >= _down_until:
+        logger.warning("Redis unavailable, falling back to in-process state: %s", exc)
+    _down_until = time.monotonic() + settings.REDIS_RETRY_AFTER
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
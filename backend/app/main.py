@@ -1,39 +1,87 @@
 """
 AeroPoints Premium Award Travel Platform - Backend API
 """
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from fastapi.responses import JSONResponse, Response
 
 from app.api.api import api_router
+from app.core import auth_clerk
+from app.core.auth_clerk import clerk_configured, jwks_cache
+from app.core import metrics, rate_limit
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import InstrumentedJSONResponse
+from app.core.middleware import MetricsMiddleware, RateLimitMiddleware, SecurityHeadersMiddleware
+from app.core.redis import close_redis
+from app.services.airport_geo import airport_geo
+from app.services.airport_index import airport_index
+from app.services.availability_history import availability_recorder
+from app.services.award_routing import segment_graph
+from app.services import flight_search
+from app.services.popular_routes import popular_routes
+from app.services.result_views import result_views
+from app.services.search_cache import search_cache
+from app.services.search_history import search_history_recorder
+from app.services.seats_aero import seats_aero_client
+from app.services.transfer_optimizer import transfer_optimizer
+from app.services.user_cache import user_cache
 
-# Security headers middleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response: Response = await call_next(request)
-        path = request.url.path or ""
-        # Keep docs usable during development by not enforcing CSP there
-        if not (path.startswith("/docs") or path.startswith("/redoc")):
-            response.headers.setdefault("Content-Security-Policy", "default-src 'self'")
-        response.headers.setdefault("X-Frame-Options", "DENY")
-        response.headers.setdefault("X-Content-Type-Options", "nosniff")
-        response.headers.setdefault("Referrer-Policy", "no-referrer")
-        response.headers.setdefault("Permissions-Policy", "geolocation=(), microphone=(), camera=()")
-        if settings.ENVIRONMENT == "production":
-            # Enable HSTS only in production behind HTTPS
-            response.headers.setdefault("Strict-Transport-Security", "max-age=63072000; includeSubDomains; preload")
-        return response
+logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream resources at startup and release them at shutdown."""
+    await seats_aero_client.start()
+    if clerk_configured():
+        try:
+            await jwks_cache.refresh()
+        except Exception as e:
+            # Retried by the background refresh and on the first unknown kid
+            logger.warning("Clerk JWKS not prefetched at startup: %s", e)
+        jwks_cache.start_refresh(settings.CLERK_JWKS_REFRESH_SECONDS)
+    try:
+        async with AsyncSessionLocal() as db:
+            await airport_index.load(db)
+    except Exception as e:
+        # Autocomplete falls back to database queries until a refresh succeeds
+        logger.warning("Airport index not loaded at startup: %s", e)
+    airport_index.start_refresh(AsyncSessionLocal, settings.AIRPORT_INDEX_REFRESH_SECONDS)
+    try:
+        async with AsyncSessionLocal() as db:
+            await airport_geo.load(db)
+    except Exception as e:
+        # /airports/nearby answers 503 until a refresh succeeds
+        logger.warning("Airport geo index not loaded at startup: %s", e)
+    airport_geo.start_refresh(AsyncSessionLocal, settings.AIRPORT_INDEX_REFRESH_SECONDS)
+    try:
+        async with AsyncSessionLocal() as db:
+            await transfer_optimizer.load(db)
+    except Exception as e:
+        # Funding plans find no transfer partners until a refresh succeeds
+        logger.warning("Transfer matrix not loaded at startup: %s", e)
+    transfer_optimizer.start_refresh(AsyncSessionLocal, settings.TRANSFER_MATRIX_REFRESH_SECONDS)
+    search_history_recorder.start(AsyncSessionLocal)
+    availability_recorder.start(AsyncSessionLocal, settings.AVAILABILITY_FLUSH_SECONDS)
+    popular_routes.start_refresh(AsyncSessionLocal, settings.POPULAR_ROUTES_REFRESH_SECONDS)
+    user_cache.start_listener()
+    try:
+        yield
+    finally:
+        await jwks_cache.stop()
+        await user_cache.stop()
+        await popular_routes.stop()
+        await transfer_optimizer.stop()
+        await search_history_recorder.stop()
+        await availability_recorder.stop()
+        await airport_index.stop()
+        await airport_geo.stop()
+        await search_cache.close()
+        await seats_aero_client.close()
+        await close_redis()
 
 # Create FastAPI app
 app = FastAPI(
@@ -43,11 +91,14 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=InstrumentedJSONResponse,
+    lifespan=lifespan,
 )
 
-# Add rate limit handler
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Middleware runs outermost-last-added: metrics -> CORS -> security headers -> rate limit -> routes,
+# so 429 responses still carry CORS and security headers and every response is measured
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 # Add security headers
 app.add_middleware(SecurityHeadersMiddleware)
@@ -61,6 +112,9 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Production configuration hardening
 if settings.ENVIRONMENT == "production":
     if settings.SECRET_KEY == "your-secret-key-change-in-production":
@@ -82,9 +136,23 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "aeropoints-api",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "search_cache": search_cache.stats(),
+        "search_coalescing": flight_search.stats(),
+        "search_history": search_history_recorder.stats(),
+        "clerk_auth": auth_clerk.stats(),
+        "user_cache": user_cache.stats(),
+        "award_routing": segment_graph.stats(),
+        "search_views": result_views.stats(),
+        "availability_history": availability_recorder.stats(),
+        "rate_limits": rate_limit.stats()
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
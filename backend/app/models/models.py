@@ -1,13 +1,12 @@
 """
 Database models for AeroPoints
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, JSON, Enum
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, ForeignKey, Float, JSON, Enum, Index, LargeBinary, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 
-Base = declarative_base()
+from app.core.database import Base
 
 class UserRole(str, enum.Enum):
     USER = "user"
@@ -70,6 +69,52 @@ class SearchHistory(Base):
     # Relationships
     user = relationship("User", back_populates="searches")
 
+class RouteSearchStat(Base):
+    """Per-day search totals for one route and program, maintained incrementally from SearchHistory"""
+    __tablename__ = "route_search_stats"
+    
+    # Day first so rolling-window scans use the primary key
+    day = Column(Date, primary_key=True)
+    origin = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    loyalty_program = Column(String, primary_key=True)  # canonical code, "*" for multi-program searches
+    
+    search_count = Column(Integer, nullable=False, default=0)
+    points_sum = Column(BigInteger, nullable=False, default=0)
+    points_count = Column(Integer, nullable=False, default=0)  # searches that found a lowest_points
+    min_points = Column(Integer)
+
+class AvailabilitySnapshot(Base):
+    """
+    Award prices observed for one route, cabin and program over one day or week,
+    summarized as counts, extremes and a log-scale points histogram
+    """
+    __tablename__ = "availability_snapshots"
+    
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False)
+    destination = Column(String, nullable=False)
+    cabin_class = Column(String, nullable=False)
+    loyalty_program = Column(String, nullable=False)  # canonical code
+    resolution = Column(String, nullable=False)  # "day" or "week"
+    bucket_start = Column(Date, nullable=False)
+    # False for partial rows written by a worker flush, until compaction merges them
+    compacted = Column(Boolean, nullable=False, default=False)
+    
+    searches = Column(Integer, nullable=False)
+    observations = Column(Integer, nullable=False)
+    min_points = Column(Integer)  # NULL when no search found availability
+    max_points = Column(Integer)
+    points_sum = Column(BigInteger, nullable=False)
+    histogram = Column(LargeBinary, nullable=False)  # little-endian uint32 counts per bin
+
+Index(
+    "ix_availability_snapshots_series",
+    AvailabilitySnapshot.origin, AvailabilitySnapshot.destination, AvailabilitySnapshot.cabin_class,
+    AvailabilitySnapshot.bucket_start,
+)
+Index("ix_availability_snapshots_pending", AvailabilitySnapshot.compacted, AvailabilitySnapshot.bucket_start)
+
 class Booking(Base):
     __tablename__ = "bookings"
     
@@ -124,6 +169,9 @@ class SavedSearch(Base):
     # Alert settings
     alert_enabled = Column(Boolean, default=False)
     alert_threshold_points = Column(Integer)
+    # Last alert sent, so an unchanged price is not re-sent every evaluation
+    last_alert_points = Column(Integer)
+    last_alerted_at = Column(DateTime)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -148,6 +196,22 @@ class Airport(Base):
     # Additional info
     is_major_hub = Column(Boolean, default=False)
     has_lounge = Column(Boolean, default=False)
+    # Accent-folded, lowercased IATA, ICAO, city and name tokens ("sao paulo ...")
+    search_key = Column(String)
+
+# Search indexes for the database autocomplete path (pg_trgm GIN on Postgres)
+Index("ix_airports_iata_code_lower", func.lower(Airport.iata_code))
+# pg_trgm indexes exist on PostgreSQL only, as in the migrations
+Index(
+    "ix_airports_name_trgm", Airport.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_airports_city_trgm", Airport.city, postgresql_using="gin", postgresql_ops={"city": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_airports_search_key_trgm", Airport.search_key,
+    postgresql_using="gin", postgresql_ops={"search_key": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
 
 class LoyaltyProgram(Base):
     __tablename__ = "loyalty_programs"
@@ -1,8 +1,9 @@
 """
 Flight search schemas
 """
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from typing_extensions import Annotated, TypedDict
 from datetime import date, datetime
 from enum import Enum
 
@@ -12,13 +13,52 @@ class CabinClassEnum(str, Enum):
     business = "business"
     first = "first"
 
+class SearchSort(str, Enum):
+    points = "points"
+    duration = "duration"
+    departure = "departure"
+    cash = "cash"
+
+# Points and balances fit in 32 bits: transfer_optimizer packs (row << 32) | points
+Points = Annotated[int, Field(ge=0, lt=2**32)]
+
 class FlightSearch(BaseModel):
     origin: str
     destination: str
     departure_date: date
     cabin_class: CabinClassEnum
     passengers: int = 1
-    loyalty_program: str
+    loyalty_program: Optional[str] = None
+    # Multi-program mode: search several programs (or every catalog program) at once
+    loyalty_programs: Optional[List[str]] = None
+    all_programs: bool = False
+    # Flexible-date mode: also search this many days either side of departure_date
+    flexible_days: int = Field(default=0, ge=0, le=7)
+    # Transferable balances (e.g. {"chase": 120000, "amex": 80000}): adds a funding plan to each result
+    balances: Optional[Dict[str, Points]] = None
+    # Server-side filters
+    max_stops: Optional[int] = Field(default=None, ge=0)
+    max_duration_minutes: Optional[int] = Field(default=None, ge=1)
+    max_points: Optional[int] = Field(default=None, ge=0)
+    airlines: Optional[List[str]] = None
+    # Sort order (default: upstream order for one program, points across several)
+    sort: Optional[SearchSort] = None
+    # Paging: set page_size, then pass back next_cursor for the following page
+    page_size: Optional[int] = Field(default=None, ge=1, le=500)
+    cursor: Optional[str] = None
+
+class TransferStep(BaseModel):
+    source: str
+    points: int
+    miles: int
+
+class FundingPlan(BaseModel):
+    # Transferable points spent, best transfer ratios first
+    points: int
+    covered: bool
+    # Miles the balances cannot cover
+    shortfall: int
+    transfers: List[TransferStep]
 
 class FlightResult(BaseModel):
     airline: str
@@ -28,14 +68,89 @@ class FlightResult(BaseModel):
     departure_time: str
     arrival_time: str
     cabin_class: str
-    points_required: int
+    points_required: Points
     cash_price: float
     availability: int
     aircraft: str
     duration_minutes: int
     stops: int
+    loyalty_program: Optional[str] = None
+    funding: Optional[FundingPlan] = None
+
+class FlightRecord(TypedDict):
+    """
+    One upstream result as a plain dict with exactly the FlightResult fields
+    (loyalty_program and funding are added per response). Seats.aero records are validated
+    into this shape once, before caching, so responses can be encoded as is.
+    """
+    airline: str
+    flight_number: str
+    origin: str
+    destination: str
+    departure_time: str
+    arrival_time: str
+    cabin_class: str
+    points_required: Points
+    cash_price: float
+    availability: int
+    aircraft: str
+    duration_minutes: int
+    stops: int
+
+class DateAvailability(BaseModel):
+    departure_date: date
+    total_results: int
+    lowest_points: Optional[int] = None
+    error: Optional[str] = None
+
+class ProgramAvailability(BaseModel):
+    loyalty_program: str
+    total_results: int
+    lowest_points: Optional[int] = None
+    error: Optional[str] = None
 
 class FlightSearchResponse(BaseModel):
     results: List[FlightResult]
+    # Results matching the filters, across all pages
     total_results: int
+    next_cursor: Optional[str] = None
     search_params: dict
+    # Per-day summary, only in flexible-date mode
+    dates: Optional[List[DateAvailability]] = None
+    # Per-program summary, only in multi-program mode
+    programs: Optional[List[ProgramAvailability]] = None
+
+class RouteSearch(BaseModel):
+    origin: str
+    destination: str
+    departure_date: date
+    cabin_class: CabinClassEnum
+    passengers: int = 1
+    # Only use segments from these programs (default: any cached program)
+    loyalty_programs: Optional[List[str]] = None
+    max_stops: int = Field(default=1, ge=0, le=3)
+    # Connection window; defaults come from ROUTING_MIN_CONNECTION_MINUTES / ROUTING_MAX_CONNECTION_HOURS
+    min_connection_minutes: Optional[int] = Field(default=None, ge=0, le=24 * 60)
+    max_connection_hours: Optional[int] = Field(default=None, ge=1, le=72)
+    limit: int = Field(default=10, ge=1, le=50)
+
+class Itinerary(BaseModel):
+    points_required: int
+    cash_price: float
+    duration_minutes: int
+    stops: int
+    via: List[str]
+    layover_minutes: List[int]
+    segments: List[FlightResult]
+
+class RouteSearchResponse(BaseModel):
+    itineraries: List[Itinerary]
+    total_results: int
+    search_params: dict
+
+class FundingRequest(BaseModel):
+    balances: Dict[str, Points]
+    results: List[FlightResult] = Field(max_length=10000)
+
+class FundingResponse(BaseModel):
+    results: List[FlightResult]
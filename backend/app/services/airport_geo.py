@@ -0,0 +1,307 @@
+"""
+Nearest-airport queries over Airport latitude/longitude
+
+Airports are projected onto the unit sphere and indexed with a static KD-tree
+whose leaves are contiguous slices of the reordered point arrays. Straight-line
+(chord) distance on the unit sphere is monotonic in great-circle distance, so
+the tree prunes by chord distance and only the surviving candidates get an
+exact, vectorized haversine distance.
+
+The index is loaded in the app lifespan and rebuilt by a background task
+every AIRPORT_INDEX_REFRESH_SECONDS, and as soon as Airport rows change in this
+worker. Each rebuild is swapped in whole, so requests only ever read the
+current snapshot and never wait for a build.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Airport
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 32
+# Seconds between load attempts while no snapshot has loaded
+RETRY_SECONDS = 30.0
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point (degrees) to arrays of points (radians)."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    a = np.sin((lats - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vector(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Radians -> (N, 3) points on the unit sphere."""
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_for_km(km: float) -> float:
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class KDTree:
+    """Static 3-D KD-tree; ``order`` maps tree positions back to input rows."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        n = len(points)
+        self.order = np.arange(n)
+        starts, ends, lefts, rights, lows, highs = [], [], [], [], [], []
+
+        def new_node(start: int, end: int) -> int:
+            block = points[self.order[start:end]]
+            starts.append(start)
+            ends.append(end)
+            lefts.append(-1)
+            rights.append(-1)
+            lows.append(block.min(axis=0) if end > start else np.zeros(3))
+            highs.append(block.max(axis=0) if end > start else np.zeros(3))
+            return len(starts) - 1
+
+        stack = [new_node(0, n)]
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= leaf_size:
+                continue
+            axis = int(np.argmax(highs[node] - lows[node]))
+            segment = self.order[start:end]
+            mid = (end - start) // 2
+            part = np.argpartition(points[segment, axis], mid)
+            self.order[start:end] = segment[part]
+            lefts[node] = new_node(start, start + mid)
+            rights[node] = new_node(start + mid, end)
+            stack.extend((lefts[node], rights[node]))
+
+        self.points = points[self.order]
+        self.start = np.array(starts)
+        self.end = np.array(ends)
+        self.left = np.array(lefts)
+        self.right = np.array(rights)
+        self.low = np.array(lows).reshape(-1, 3)
+        self.high = np.array(highs).reshape(-1, 3)
+
+        # Plain-Python copies for traversal: per-node math on 3-vectors is
+        # faster without numpy call overhead
+        self._boxes = list(zip(self.low.tolist(), self.high.tolist()))
+        self._children = list(zip(self.left.tolist(), self.right.tolist()))
+        self._slices = list(zip(self.start.tolist(), self.end.tolist()))
+
+    def _box_distance(self, node: int, p: Sequence[float]) -> float:
+        low, high = self._boxes[node]
+        total = 0.0
+        for lo, hi, x in zip(low, high, p):
+            gap = lo - x if x < lo else (x - hi if x > hi else 0.0)
+            total += gap * gap
+        return math.sqrt(total)
+
+    def within(self, p: np.ndarray, chord: float) -> np.ndarray:
+        """Tree positions of all points within ``chord`` of ``p``."""
+        q = p.tolist()
+        slices = []
+        stack = [0] if self._slices and self._slices[0][1] > 0 else []
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, q) > chord:
+                continue
+            left, right = self._children[node]
+            if left < 0:
+                slices.append(np.arange(*self._slices[node]))
+            else:
+                stack.extend((left, right))
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(slices)
+        d = self.points[candidates] - p
+        return candidates[np.einsum("ij,ij->i", d, d) <= chord * chord]
+
+    def nearest(self, p: np.ndarray, k: int, mask: Optional[np.ndarray] = None, chord: float = 2.0) -> np.ndarray:
+        """
+        Tree positions of the ``k`` nearest points to ``p`` (closest first),
+        restricted to ``mask`` (boolean, tree order) and to ``chord``.
+        """
+        q = p.tolist()
+        best: List[tuple] = []  # max-heap of (-dist2, position)
+        frontier = [(0.0, 0)] if self._slices and self._slices[0][1] > 0 else []
+        limit2 = chord * chord
+        while frontier:
+            box, node = heapq.heappop(frontier)
+            bound2 = -best[0][0] if len(best) == k else limit2
+            if box * box > bound2:
+                break
+            left, right = self._children[node]
+            if left >= 0:
+                heapq.heappush(frontier, (self._box_distance(left, q), left))
+                heapq.heappush(frontier, (self._box_distance(right, q), right))
+                continue
+            positions = np.arange(*self._slices[node])
+            if mask is not None:
+                positions = positions[mask[positions]]
+            d = self.points[positions] - p
+            for dist2, pos in zip(np.einsum("ij,ij->i", d, d).tolist(), positions.tolist()):
+                if dist2 > limit2:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-dist2, pos))
+                elif dist2 < -best[0][0]:
+                    heapq.heapreplace(best, (-dist2, pos))
+        return np.array([pos for _, pos in sorted(best, reverse=True)], dtype=np.int64)
+
+
+class GeoSnapshot:
+    """KD-tree plus per-airport arrays, all in tree order."""
+
+    def __init__(self, rows: Sequence[Any]):
+        rows = [r for r in rows if r.latitude is not None and r.longitude is not None]
+        lat = np.radians(np.array([r.latitude for r in rows], dtype=np.float64))
+        lon = np.radians(np.array([r.longitude for r in rows], dtype=np.float64))
+        self.tree = KDTree(unit_vector(lat, lon) if rows else np.empty((0, 3)))
+        order = self.tree.order
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.is_major_hub = np.array([bool(r.is_major_hub) for r in rows], dtype=bool)[order]
+        self.has_lounge = np.array([bool(r.has_lounge) for r in rows], dtype=bool)[order]
+        self.payload = [
+            {
+                "iata_code": rows[i].iata_code,
+                "name": rows[i].name,
+                "city": rows[i].city,
+                "country": rows[i].country,
+                "latitude": rows[i].latitude,
+                "longitude": rows[i].longitude,
+                "is_major_hub": bool(rows[i].is_major_hub),
+                "has_lounge": bool(rows[i].has_lounge),
+            }
+            for i in order
+        ]
+
+
+class AirportGeoIndex:
+    """Radius and k-nearest airport search, rebuilt from the Airport table."""
+
+    def __init__(self):
+        self.snapshot: Optional[GeoSnapshot] = None
+        self.loaded_at = 0.0
+        self._changed: Optional[asyncio.Event] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def build(self, rows: Sequence[Any]) -> None:
+        # Swapped in with one assignment so concurrent queries see old or new, never a mix
+        self.snapshot = GeoSnapshot(rows)
+        self.loaded_at = time.monotonic()
+
+    async def load(self, db) -> None:
+        result = await db.execute(select(
+            Airport.iata_code, Airport.name, Airport.city, Airport.country,
+            Airport.latitude, Airport.longitude, Airport.is_major_hub, Airport.has_lounge,
+        ))
+        # The tree build is CPU-bound; keep it off the event loop
+        await asyncio.to_thread(self.build, result.all())
+
+    def mark_changed(self) -> None:
+        """Airport rows changed: rebuild now rather than at the next interval."""
+        if self._changed is not None:
+            self._changed.set()
+
+    def start_refresh(self, session_factory, interval: float) -> None:
+        """Rebuild every ``interval`` seconds (0: only after changes) and after Airport commits."""
+        async def refresh_loop():
+            while True:
+                timeout = RETRY_SECONDS if self.snapshot is None else (interval if interval > 0 else None)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                # Cleared before reading so changes committed meanwhile trigger another build
+                self._changed.clear()
+                try:
+                    async with session_factory() as db:
+                        await self.load(db)
+                except Exception as e:
+                    logger.warning("Airport geo index refresh failed: %s", e)
+
+        if self._refresh_task is None:
+            self._changed = asyncio.Event()
+            self._refresh_task = asyncio.create_task(refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+            self._changed = None
+
+    def nearby(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: Optional[float] = None,
+        k: Optional[int] = None,
+        major_hub: Optional[bool] = None,
+        has_lounge: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Airports near (lat, lon), closest first. ``radius_km`` bounds the search,
+        ``k`` caps the count; with only a radius all matches are returned.
+        """
+        snap = self.snapshot
+        if snap is None or not snap.payload:
+            return []
+        p = unit_vector(np.radians([lat]), np.radians([lon]))[0]
+        chord = chord_for_km(radius_km) if radius_km is not None else 2.0
+
+        mask = None
+        if major_hub is not None:
+            mask = snap.is_major_hub == major_hub
+        if has_lounge is not None:
+            lounge = snap.has_lounge == has_lounge
+            mask = lounge if mask is None else mask & lounge
+
+        if k is not None:
+            positions = snap.tree.nearest(p, k, mask=mask, chord=chord)
+        else:
+            positions = snap.tree.within(p, chord)
+            if mask is not None:
+                positions = positions[mask[positions]]
+
+        distances = haversine_km(lat, lon, snap.lat[positions], snap.lon[positions])
+        if radius_km is not None:
+            keep = distances <= radius_km
+            positions, distances = positions[keep], distances[keep]
+        ranked = np.argsort(distances, kind="stable")
+        return [
+            {**snap.payload[positions[i]], "distance_km": round(float(distances[i]), 1)}
+            for i in ranked
+        ]
+
+
+airport_geo = AirportGeoIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_airport_changes(session, flush_context):
+    if any(isinstance(obj, Airport) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["airport_geo_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_geo_dirty(session):
+    if session.info.pop("airport_geo_dirty", False):
+        airport_geo.mark_changed()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_geo_flag(session):
+    session.info.pop("airport_geo_dirty", None)
@@ -0,0 +1,277 @@
+"""
+Streaming bulk import of airports from an OurAirports-style CSV
+
+    python -m app.services.airport_import airports.csv --countries countries.csv
+
+The file goes through a generator pipeline and is never held in memory:
+read (CSV rows) -> normalize (codes, names, coordinates, country, hub flag,
+search key) -> dedupe (best row per IATA code) -> stage. Rows are staged in a
+temporary table, with COPY on PostgreSQL and batched INSERTs elsewhere, and
+then merged into airports with a single INSERT ... SELECT ... ON CONFLICT
+(iata_code) DO UPDATE. Everything runs in one transaction, so readers see
+either the old data set or the new one. With --prune, airports missing from
+the file are deleted in the same transaction.
+
+Deduplication keeps only the rank of the best row seen per IATA code, so its
+memory is bounded by the code space rather than the file. When a better row
+turns up for a code that was already staged, it is staged again, and the
+merge keeps the last row staged per code.
+
+Only airports with an IATA code are imported; closed airports, heliports and
+balloon ports are skipped. Large airports with scheduled service become major
+hubs. has_lounge and timezone are not in the source and are left unchanged on
+existing rows. Running workers see the new rows at their next airport index
+reload (AIRPORT_INDEX_REFRESH_SECONDS).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import itertools
+import logging
+import re
+import time
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table, delete, false, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.core.database import create_engine_for
+from app.models.models import Airport
+from app.services.airport_index import search_key
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT when COPY is not available
+BATCH = 5000
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+_IATA = re.compile(r"[A-Z]{3}")
+_ICAO = re.compile(r"[A-Z]{4}")
+_SPACES = re.compile(r"\s+")
+
+# OurAirports airport types, best first; missing types rank lowest
+TYPE_RANK = {"large_airport": 3, "medium_airport": 2, "small_airport": 1, "seaplane_base": 0}
+SKIPPED_TYPES = frozenset({"closed", "heliport", "balloonport"})
+
+# Source columns tried in order for each field (OurAirports names first)
+COLUMNS = {
+    "iata_code": ("iata_code", "iata"),
+    "icao_code": ("icao_code", "gps_code", "ident", "icao"),
+    "name": ("name",),
+    "city": ("municipality", "city"),
+    "country": ("iso_country", "country"),
+    "latitude": ("latitude_deg", "latitude", "lat"),
+    "longitude": ("longitude_deg", "longitude", "lon"),
+    "type": ("type",),
+    "scheduled_service": ("scheduled_service",),
+}
+
+
+class ImportRow(NamedTuple):
+    iata_code: str
+    icao_code: Optional[str]
+    name: str
+    city: Optional[str]
+    country: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    is_major_hub: bool
+    search_key: str
+    rank: int
+
+
+staging_metadata = MetaData()
+staging = Table(
+    "airport_import", staging_metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=False),
+    Column("iata_code", String(3), nullable=False),
+    Column("icao_code", String(4)),
+    Column("name", String, nullable=False),
+    Column("city", String),
+    Column("country", String),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Column("is_major_hub", Boolean, nullable=False),
+    Column("search_key", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+STAGED_COLUMNS = [c.name for c in staging.columns]
+MERGED_COLUMNS = STAGED_COLUMNS[1:]
+
+
+def open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_rows(stream: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """CSV rows as dicts keyed by our field names, one at a time."""
+    reader = csv.reader(stream)
+    header = [h.strip().lower() for h in next(reader, [])]
+    positions = {
+        field: next((header.index(c) for c in candidates if c in header), None)
+        for field, candidates in COLUMNS.items()
+    }
+    if positions["iata_code"] is None or positions["name"] is None:
+        raise ValueError("CSV needs iata_code and name columns")
+    width = len(header)
+    for record in reader:
+        if len(record) < width:
+            record += [""] * (width - len(record))
+        yield {field: record[i] if i is not None else "" for field, i in positions.items()}
+
+
+def _code(value: str, pattern: re.Pattern) -> Optional[str]:
+    value = value.strip().upper()
+    return value if pattern.fullmatch(value) else None
+
+
+def _coordinate(value: str, limit: float) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if -limit <= number <= limit else None
+
+
+def _text(value: str) -> Optional[str]:
+    return _SPACES.sub(" ", value).strip() or None
+
+
+def normalize(rows: Iterable[Dict[str, str]], countries: Dict[str, str], stats: Dict[str, int]) -> Iterator[ImportRow]:
+    """Validated, cleaned rows; counts the ones skipped in stats."""
+    for row in rows:
+        stats["read"] += 1
+        kind = row["type"].strip().lower()
+        iata, name = _code(row["iata_code"], _IATA), _text(row["name"])
+        if iata is None or name is None or kind in SKIPPED_TYPES:
+            stats["skipped"] += 1
+            continue
+        scheduled = row["scheduled_service"].strip().lower() in ("yes", "true", "1")
+        icao = _code(row["icao_code"], _ICAO)
+        city = _text(row["city"])
+        country = _text(row["country"])
+        if country is not None:
+            country = countries.get(country.upper(), country)
+        yield ImportRow(
+            iata_code=iata,
+            icao_code=icao,
+            name=name,
+            city=city,
+            country=country,
+            latitude=_coordinate(row["latitude"], 90.0),
+            longitude=_coordinate(row["longitude"], 180.0),
+            is_major_hub=kind == "large_airport" and scheduled,
+            search_key=search_key(iata, icao, city, name),
+            # Scheduled service first, then airport size
+            rank=scheduled * 10 + TYPE_RANK.get(kind, 0),
+        )
+
+
+def dedupe(rows: Iterable[ImportRow], stats: Dict[str, int]) -> Iterator[ImportRow]:
+    """Rows that beat every earlier row with the same IATA code."""
+    best: Dict[str, int] = {}
+    for row in rows:
+        previous = best.get(row.iata_code)
+        if previous is not None:
+            stats["duplicates"] += 1
+            if row.rank <= previous:
+                continue
+        best[row.iata_code] = row.rank
+        yield row
+
+
+def load_countries(path: Optional[str]) -> Dict[str, str]:
+    """ISO country code -> name from an OurAirports countries.csv."""
+    if not path:
+        return {}
+    with open_text(path) as f:
+        return {
+            row["code"].strip().upper(): row["name"].strip()
+            for row in csv.DictReader(f) if row.get("code") and row.get("name")
+        }
+
+
+async def _stage(conn, records: Iterator[tuple]) -> None:
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        # asyncpg streams the generator to COPY in chunks
+        await raw.driver_connection.copy_records_to_table(staging.name, records=records, columns=STAGED_COLUMNS)
+        return
+    while True:
+        batch = [dict(zip(STAGED_COLUMNS, r)) for r in itertools.islice(records, BATCH)]
+        if not batch:
+            return
+        await conn.execute(insert(staging), batch)
+
+
+async def import_airports(conn, rows: Iterable[ImportRow], prune: bool = False) -> Dict[str, int]:
+    """Stage and merge rows into airports on conn, inside the caller's transaction."""
+    dialect_insert = _DIALECT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        raise RuntimeError(f"Airport import is not supported on {conn.dialect.name}")
+    stats: Dict[str, int] = {}
+    # A failed earlier import on a reused SQLite connection can leave the table behind
+    await conn.run_sync(staging.drop, checkfirst=True)
+    await conn.run_sync(staging.create)
+    staged = itertools.count(1)
+    await _stage(conn, ((seq, *row[:-1]) for row, seq in zip(rows, staged)))
+    stats["staged"] = next(staged) - 1
+
+    # The last row staged per code is the best one (see dedupe)
+    latest = select(func.max(staging.c.seq)).group_by(staging.c.iata_code)
+    source = select(
+        *(staging.c[name] for name in MERGED_COLUMNS), false().label("has_lounge"),
+    ).where(staging.c.seq.in_(latest))
+    stmt = dialect_insert(Airport).from_select([*MERGED_COLUMNS, "has_lounge"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Airport.iata_code],
+        set_={name: stmt.excluded[name] for name in MERGED_COLUMNS if name != "iata_code"},
+    )
+    stats["upserted"] = (await conn.execute(stmt)).rowcount
+
+    if prune:
+        stale = delete(Airport).where(Airport.iata_code.not_in(select(staging.c.iata_code)))
+        stats["pruned"] = (await conn.execute(stale)).rowcount
+    await conn.run_sync(staging.drop)
+    return stats
+
+
+async def import_file(database_url: str, path: str, countries_path: Optional[str] = None,
+                      prune: bool = False) -> Dict[str, int]:
+    countries = load_countries(countries_path)
+    stats = {"read": 0, "skipped": 0, "duplicates": 0}
+    engine = create_engine_for(database_url)
+    try:
+        with open_text(path) as f:
+            async with engine.begin() as conn:
+                rows = dedupe(normalize(read_rows(f), countries, stats), stats)
+                stats.update(await import_airports(conn, rows, prune=prune))
+    finally:
+        await engine.dispose()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import airports from an OurAirports-style CSV (optionally gzipped)")
+    parser.add_argument("path", help="airports.csv or airports.csv.gz")
+    parser.add_argument("--countries", help="OurAirports countries.csv, to store country names instead of ISO codes")
+    parser.add_argument("--prune", action="store_true", help="delete airports that are not in the file")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    started = time.perf_counter()
+    stats = asyncio.run(import_file(args.database_url, args.path, args.countries, args.prune))
+    logger.info("Imported airports in %.2f s: %s", time.perf_counter() - started, stats)
+
+
+if __name__ == "__main__":
+    main()
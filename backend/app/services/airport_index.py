@@ -0,0 +1,390 @@
+"""
+In-memory airport autocomplete index
+
+All airports are loaded once from the Airport table into a sorted array of
+(token, airport id) pairs over accent-folded, lowercased IATA, ICAO, city and
+name tokens. A keystroke becomes a bisect over that array instead of a
+leading-wildcard ILIKE scan. One- and two-letter prefixes match a large share
+of all airports, so for those the airports are also kept pre-ranked per
+prefix and a query reads only the first ``limit`` of them plus any exact
+token matches. Committed ORM changes to Airport rows are applied
+incrementally; a periodic reload picks up out-of-band writes.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Airport
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+# Maximum number of memoized query results
+MEMO_SIZE = 4096
+# Prefixes up to this length keep their airports pre-ranked
+SHORT_PREFIX = 2
+
+
+def fold(text: Optional[str]) -> str:
+    """Accent-fold and lowercase, e.g. 'São Paulo' -> 'sao paulo'."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN_SPLIT.split(fold(text)) if t]
+
+
+def search_key(iata: Optional[str], icao: Optional[str], city: Optional[str], name: Optional[str]) -> str:
+    """Airport.search_key: folded tokens of all searchable fields, space-separated."""
+    return " ".join(t for field in (iata, icao, city, name) for t in tokenize(field))
+
+
+@dataclass(frozen=True)
+class AirportEntry:
+    id: int
+    iata: str
+    icao: str
+    city: str
+    is_major_hub: bool
+    tokens: Tuple[str, ...]
+    payload: Dict[str, Any]
+
+    @classmethod
+    def from_row(cls, row: Any) -> "AirportEntry":
+        iata = fold(row.iata_code)
+        icao = fold(row.icao_code)
+        tokens = {iata, icao, *tokenize(row.city), *tokenize(row.name)}
+        city = fold(row.city)
+        if city:
+            # Whole city so "new york" style prefixes match as one key
+            tokens.add(city)
+        tokens.discard("")
+        return cls(
+            id=row.id,
+            iata=iata,
+            icao=icao,
+            city=city,
+            is_major_hub=bool(row.is_major_hub),
+            tokens=tuple(sorted(tokens)),
+            payload={
+                "iata_code": row.iata_code,
+                "name": row.name,
+                "city": row.city,
+                "country": row.country,
+            },
+        )
+
+    @property
+    def prefix_rank(self) -> Tuple[bool, str, str, int]:
+        """Ranking among airports that only prefix-match a query: hubs, then city, IATA and id."""
+        return (not self.is_major_hub, self.city, self.iata, self.id)
+
+    def short_prefixes(self) -> FrozenSet[str]:
+        return frozenset(t[:n] for t in self.tokens for n in range(1, SHORT_PREFIX + 1) if len(t) >= n)
+
+
+class AirportIndex:
+    """Sorted-array prefix index with hub-aware ranking."""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._entries: Dict[int, AirportEntry] = {}
+        # Short prefix -> prefix_rank of every airport with a token starting with it, sorted
+        self._ranked: Dict[str, List[Tuple[bool, str, str, int]]] = {}
+        # Hot autocomplete prefixes repeat across users; cleared on any change
+        self._memo: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._hubs: Optional[FrozenSet[str]] = None
+        self.ready = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- building ------------------------------------------------------------
+
+    @staticmethod
+    def _build(rows: Iterable[Any]) -> Tuple[List[Tuple[str, int]], Dict[int, AirportEntry], Dict[str, List[Tuple]]]:
+        entries = {row.id: AirportEntry.from_row(row) for row in rows}
+        keys = sorted((token, e.id) for e in entries.values() for token in e.tokens)
+        ranked: Dict[str, List[Tuple]] = {}
+        for e in entries.values():
+            for prefix in e.short_prefixes():
+                ranked.setdefault(prefix, []).append(e.prefix_rank)
+        for ranks in ranked.values():
+            ranks.sort()
+        return keys, entries, ranked
+
+    def _swap(self, keys: List[Tuple[str, int]], entries: Dict[int, AirportEntry],
+              ranked: Dict[str, List[Tuple]]) -> None:
+        self._keys, self._entries, self._ranked = keys, entries, ranked
+        self._memo.clear()
+        self._hubs = None
+        self.ready = True
+
+    def build(self, rows: Iterable[Any]) -> None:
+        self._swap(*self._build(rows))
+
+    async def load(self, db) -> None:
+        """Full (re)load from the Airport table."""
+        result = await db.execute(select(
+            Airport.id, Airport.iata_code, Airport.icao_code, Airport.name,
+            Airport.city, Airport.country, Airport.is_major_hub,
+        ))
+        # Build off the event loop, then swap in atomically on it
+        built = await asyncio.to_thread(self._build, result.all())
+        self._swap(*built)
+        logger.info("Airport index loaded with %d airports", len(self._entries))
+
+    def upsert(self, row: Any) -> None:
+        self.upsert_entry(AirportEntry.from_row(row))
+
+    def upsert_entry(self, entry: AirportEntry) -> None:
+        self.remove(entry.id)
+        self._entries[entry.id] = entry
+        for token in entry.tokens:
+            insort(self._keys, (token, entry.id))
+        for prefix in entry.short_prefixes():
+            insort(self._ranked.setdefault(prefix, []), entry.prefix_rank)
+        self._memo.clear()
+        self._hubs = None
+
+    def remove(self, airport_id: int) -> None:
+        entry = self._entries.pop(airport_id, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            i = bisect_left(self._keys, (token, airport_id))
+            if i < len(self._keys) and self._keys[i] == (token, airport_id):
+                del self._keys[i]
+        rank = entry.prefix_rank
+        for prefix in entry.short_prefixes():
+            ranks = self._ranked[prefix]
+            i = bisect_left(ranks, rank)
+            if i < len(ranks) and ranks[i] == rank:
+                del ranks[i]
+        self._memo.clear()
+        self._hubs = None
+
+    # -- querying ------------------------------------------------------------
+
+    def _prefix_ids(self, prefix: str) -> Iterable[int]:
+        i = bisect_left(self._keys, (prefix,))
+        keys = self._keys
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            yield keys[i][1]
+            i += 1
+
+    def _short_candidates(self, q: str, driver: str, matches, rank, limit: int) -> List[Tuple[Tuple, int]]:
+        """
+        Candidates for a short driver term without visiting its whole range.
+        Airports holding ``q`` as a whole token can rank anywhere, so they are
+        all taken; every other match ranks by prefix_rank alone, so only the
+        first ``limit`` of those in the pre-ranked list can make the top.
+        """
+        candidates = []
+        exact = set()
+        i = bisect_left(self._keys, (q,))
+        while i < len(self._keys) and self._keys[i][0] == q:
+            airport_id = self._keys[i][1]
+            entry = self._entries[airport_id]
+            if airport_id not in exact and any(t.startswith(driver) for t in entry.tokens) and matches(entry):
+                exact.add(airport_id)
+                candidates.append((rank(entry), airport_id))
+            i += 1
+        taken = 0
+        for prefix_rank in self._ranked.get(driver, ()):
+            if taken >= limit:
+                break
+            airport_id = prefix_rank[-1]
+            entry = self._entries[airport_id]
+            if airport_id in exact or not matches(entry):
+                continue
+            candidates.append((rank(entry), airport_id))
+            taken += 1
+        return candidates
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Top ``limit`` airports for a prefix query. Exact IATA matches rank first,
+        then major hubs, then exact token matches, then alphabetical by city.
+        """
+        q = fold(query).strip()
+        memo_key = (q, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        terms = tokenize(q)
+        if not terms:
+            return []
+
+        # Drive the scan by the longest term (narrowest range); other terms must
+        # prefix-match some token of the same airport
+        driver = max(terms, key=len)
+        others = [t for t in terms if t is not driver]
+
+        def matches(entry: AirportEntry) -> bool:
+            return not others or all(any(tok.startswith(t) for tok in entry.tokens) for t in others)
+
+        def rank(entry: AirportEntry) -> Tuple:
+            return (
+                entry.iata != q,
+                not entry.is_major_hub,
+                q not in entry.tokens and entry.icao != q,
+                entry.city,
+                entry.iata,
+            )
+
+        if len(driver) <= SHORT_PREFIX:
+            candidates = self._short_candidates(q, driver, matches, rank, limit)
+        else:
+            seen = set()
+            candidates = []
+            for airport_id in self._prefix_ids(driver):
+                if airport_id in seen:
+                    continue
+                seen.add(airport_id)
+                entry = self._entries[airport_id]
+                if matches(entry):
+                    candidates.append((rank(entry), airport_id))
+
+        results = [self._entries[i].payload for _, i in heapq.nsmallest(limit, candidates)]
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[memo_key] = results
+        return results
+
+    def hubs(self) -> FrozenSet[str]:
+        """Uppercase IATA codes of major hubs."""
+        if self._hubs is None:
+            self._hubs = frozenset(
+                e.payload["iata_code"].upper() for e in self._entries.values()
+                if e.is_major_hub and e.payload["iata_code"]
+            )
+        return self._hubs
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start_refresh(self, session_factory, interval: float) -> None:
+        """Periodically reload so writes from other workers or bulk loads are seen."""
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    async with session_factory() as db:
+                        await self.load(db)
+                except Exception as e:
+                    logger.warning("Airport index refresh failed: %s", e)
+
+        if self._refresh_task is None and interval > 0:
+            self._refresh_task = asyncio.create_task(refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+airport_index = AirportIndex()
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
+
+def airport_search_statement(query: str, dialect: str, limit: int = 10):
+    """
+    Database autocomplete query. On Postgres the ILIKE, search-key LIKE and
+    similarity (``%``) predicates are served by the pg_trgm GIN indexes and the
+    exact-IATA check by ix_airports_iata_code_lower; results are ranked exact
+    IATA, hub, similarity.
+    """
+    q = query.strip()
+    pattern = _like_pattern(q)
+    exact_iata = func.lower(Airport.iata_code) == q.lower()
+    predicates = [
+        exact_iata,
+        Airport.name.ilike(pattern, escape="!"),
+        Airport.city.ilike(pattern, escape="!"),
+    ]
+    folded = " ".join(tokenize(q))
+    if folded:
+        # Accent-insensitive match ("sao paulo") against the precomputed key
+        predicates.append(Airport.search_key.like(_like_pattern(folded), escape="!"))
+    order_by = [exact_iata.desc(), Airport.is_major_hub.desc()]
+    if dialect == "postgresql":
+        # Trigram similarity also tolerates typos ("heathrw")
+        predicates += [Airport.name.op("%")(q), Airport.city.op("%")(q)]
+        score = func.greatest(func.similarity(Airport.name, q), func.similarity(Airport.city, q))
+        order_by.append(score.desc())
+    order_by.append(Airport.iata_code)
+    return select(Airport).where(or_(*predicates)).order_by(*order_by).limit(limit)
+
+
+async def search_airports_db(db, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Ranked database search, used while the in-process index is cold."""
+    statement = airport_search_statement(query, db.bind.dialect.name, limit)
+    rows = (await db.execute(statement)).scalars().all()
+    return [
+        {
+            "iata_code": a.iata_code,
+            "name": a.name,
+            "city": a.city,
+            "country": a.country
+        }
+        for a in rows
+    ]
+
+
+# Apply committed Airport changes to the index incrementally. Changes are
+# collected at flush time and applied only once the transaction commits.
+
+@event.listens_for(Session, "before_flush")
+def _set_airport_search_keys(session, flush_context, instances):
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Airport):
+            obj.search_key = search_key(obj.iata_code, obj.icao_code, obj.city, obj.name)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_airport_changes(session, flush_context):
+    changes = session.info.setdefault("airport_index_changes", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Airport):
+            # Snapshot now; attributes may be expired once the commit completes
+            changes[obj.id] = AirportEntry.from_row(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Airport):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_airport_changes(session):
+    changes = session.info.pop("airport_index_changes", None)
+    if not changes or not airport_index.ready:
+        return
+    for airport_id, entry in changes.items():
+        if entry is None:
+            airport_index.remove(airport_id)
+        else:
+            airport_index.upsert_entry(entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_airport_changes(session):
+    session.info.pop("airport_index_changes", None)
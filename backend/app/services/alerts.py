@@ -0,0 +1,199 @@
+"""
+Saved-search price alerts
+
+Enabled saved searches are grouped by their normalized search (route, date,
+cabin, passengers, program), so each distinct query is fetched once per
+evaluation however many users watch it. Each group keeps its watches sorted by
+threshold, so the cheapest fare found triggers every watch at or above it with
+one bisect. Searches are served from the cache only while fresh; expired
+entries are fetched again rather than served stale. Notifications are handed to ``enqueue`` in batches and the
+alerted saved searches are updated with one bulk UPDATE per chunk.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.models.models import SavedSearch, User
+from app.schemas.flights import FlightSearch
+from app.services.flight_search import run_many
+from app.services.search_cache import NormalizedSearch, normalize_search
+from app.services.seats_aero import SeatsAeroClient
+
+logger = logging.getLogger(__name__)
+
+Notification = Dict[str, Any]
+
+
+class Watch(NamedTuple):
+    saved_search_id: int
+    user_id: int
+    email: str
+    name: Optional[str]
+    threshold: int
+    last_alert_points: Optional[int]
+    last_alerted_at: Optional[datetime]
+
+
+class WatchGroup:
+    """All watches on one normalized search, sorted by threshold."""
+
+    __slots__ = ("watches", "thresholds")
+
+    def __init__(self):
+        self.watches: List[Watch] = []
+        self.thresholds: List[int] = []
+
+    def seal(self) -> None:
+        self.watches.sort(key=lambda w: w.threshold)
+        self.thresholds = [w.threshold for w in self.watches]
+
+    def triggered(self, points: int) -> List[Watch]:
+        """Watches whose threshold is at or above ``points``."""
+        return self.watches[bisect.bisect_left(self.thresholds, points):]
+
+
+def _should_notify(watch: Watch, points: int, now: datetime) -> bool:
+    if watch.last_alert_points is None or watch.last_alerted_at is None:
+        return True
+    if points < watch.last_alert_points:
+        return True
+    return now - watch.last_alerted_at >= timedelta(hours=settings.ALERT_RENOTIFY_HOURS)
+
+
+async def load_watch_groups(db) -> Tuple[Dict[NormalizedSearch, WatchGroup], int]:
+    """
+    Enabled saved searches of active users, grouped by normalized search.
+    Also returns how many were skipped (no date, program or cabin, or already departed).
+    """
+    stmt = (
+        select(
+            SavedSearch.id, SavedSearch.user_id, User.email, SavedSearch.name,
+            SavedSearch.origin, SavedSearch.destination, SavedSearch.departure_date,
+            SavedSearch.cabin_class, SavedSearch.passengers, SavedSearch.loyalty_program,
+            SavedSearch.alert_threshold_points, SavedSearch.last_alert_points, SavedSearch.last_alerted_at,
+        )
+        .join(User, User.id == SavedSearch.user_id)
+        .where(
+            SavedSearch.alert_enabled.is_(True),
+            SavedSearch.alert_threshold_points.isnot(None),
+            User.is_active.is_(True),
+        )
+        .execution_options(yield_per=5000)
+    )
+    today = date.today()
+    groups: Dict[NormalizedSearch, WatchGroup] = {}
+    skipped = 0
+    async for row in await db.stream(stmt):
+        if row.departure_date is None or row.cabin_class is None or not row.loyalty_program \
+                or row.departure_date.date() < today:
+            skipped += 1
+            continue
+        search = normalize_search(FlightSearch(
+            origin=row.origin,
+            destination=row.destination,
+            departure_date=row.departure_date.date(),
+            cabin_class=row.cabin_class.value,
+            passengers=row.passengers or 1,
+            loyalty_program=row.loyalty_program,
+        ))
+        groups.setdefault(search, WatchGroup()).watches.append(Watch(
+            row.id, row.user_id, row.email, row.name,
+            row.alert_threshold_points, row.last_alert_points, row.last_alerted_at,
+        ))
+    for group in groups.values():
+        group.seal()
+    return groups, skipped
+
+
+def match_group(
+    search: NormalizedSearch,
+    group: WatchGroup,
+    results: List[Dict[str, Any]],
+    now: datetime,
+) -> List[Notification]:
+    """Notifications for every watch in ``group`` that the cheapest result satisfies."""
+    if not results:
+        return []
+    cheapest = min(results, key=lambda r: r["points_required"])
+    points = cheapest["points_required"]
+    return [
+        {
+            "saved_search_id": watch.saved_search_id,
+            "user_id": watch.user_id,
+            "email": watch.email,
+            "name": watch.name,
+            "origin": search.origin,
+            "destination": search.destination,
+            "departure_date": search.departure_date,
+            "cabin_class": search.cabin,
+            "loyalty_program": search.program,
+            "threshold_points": watch.threshold,
+            "points_required": points,
+            "flight": cheapest,
+        }
+        for watch in group.triggered(points)
+        if _should_notify(watch, points, now)
+    ]
+
+
+async def evaluate_alerts(
+    session_factory,
+    client: SeatsAeroClient,
+    enqueue: Callable[[List[Notification]], Any],
+) -> Dict[str, Any]:
+    """
+    Evaluate every enabled saved search once. Distinct searches run in chunks
+    of ALERT_BATCH_SIZE with ALERT_CONCURRENCY upstream calls in flight; a
+    failed search only skips its own group. Returns run statistics.
+    """
+    started = time.perf_counter()
+    async with session_factory() as db:
+        groups, skipped = await load_watch_groups(db)
+
+    stats = {
+        "saved_searches": sum(len(g.watches) for g in groups.values()),
+        "distinct_searches": len(groups),
+        "skipped": skipped,
+        "failed_searches": 0,
+        "notifications": 0,
+    }
+    now = datetime.utcnow()
+    searches = list(groups)
+    for start in range(0, len(searches), settings.ALERT_BATCH_SIZE):
+        chunk = searches[start:start + settings.ALERT_BATCH_SIZE]
+        # Fresh prices only: a stale entry would be served as is and refreshed after this run
+        outcomes = await run_many(chunk, client, concurrency=settings.ALERT_CONCURRENCY, allow_stale=False)
+
+        notifications: List[Notification] = []
+        for search, outcome in zip(chunk, outcomes):
+            if isinstance(outcome, Exception):
+                stats["failed_searches"] += 1
+                logger.debug("Alert search %s failed: %s", search.key, outcome)
+                continue
+            notifications.extend(match_group(search, groups[search], outcome, now))
+        if not notifications:
+            continue
+
+        for i in range(0, len(notifications), settings.ALERT_NOTIFY_BATCH):
+            enqueue(notifications[i:i + settings.ALERT_NOTIFY_BATCH])
+        async with session_factory() as db:
+            await db.execute(update(SavedSearch), [
+                {"id": n["saved_search_id"], "last_alert_points": n["points_required"], "last_alerted_at": now}
+                for n in notifications
+            ])
+            await db.commit()
+        stats["notifications"] += len(notifications)
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["saved_searches_per_second"] = round(stats["saved_searches"] / elapsed, 1) if elapsed else 0.0
+    if stats["failed_searches"]:
+        logger.warning("%d of %d alert searches failed", stats["failed_searches"], len(groups))
+    return stats
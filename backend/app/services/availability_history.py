@@ -0,0 +1,328 @@
+"""
+Compact award price history behind the trend and percentile endpoints
+
+Every result set fetched from Seats.aero is an observation of the prices on
+one route, cabin and program. Rather than a row per observation, each worker
+folds them in memory into per-day summaries (searches, results, min, max, sum
+and a log-scale points histogram) and writes those every
+AVAILABILITY_FLUSH_SECONDS as partial availability_snapshots rows.
+
+A periodic compaction (Celery beat) merges the partial rows of finished days,
+downsamples days older than AVAILABILITY_DAILY_RETENTION_DAYS into weekly
+rows and drops rows past AVAILABILITY_RETENTION_DAYS, so one series holds at
+most a few hundred rows whatever the search volume. Histograms add, so any
+range is answered by merging those rows in NumPy. Percentiles are accurate to
+half a bin (about 6%) and clamped to the exact min and max.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, delete, insert, or_, select, tuple_
+
+from app.core.config import settings
+from app.models.models import AvailabilitySnapshot
+from app.services.search_cache import NormalizedSearch
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced points bins from HISTOGRAM_LOW to HISTOGRAM_HIGH; prices outside
+# land in the end bins (the stored min and max stay exact)
+HISTOGRAM_BINS = 64
+HISTOGRAM_LOW = 1_000
+HISTOGRAM_HIGH = 2_000_000
+_LOG_LOW = math.log(HISTOGRAM_LOW)
+_BIN_WIDTH = (math.log(HISTOGRAM_HIGH) - _LOG_LOW) / HISTOGRAM_BINS
+# Largest statement the compaction issues, under SQLite's bound-parameter limit
+DELETE_BATCH = 5000
+
+Series = Tuple[str, str, str, str]  # (origin, destination, cabin, program)
+
+
+def histogram_bins(points: np.ndarray) -> np.ndarray:
+    bins = ((np.log(np.maximum(points, HISTOGRAM_LOW)) - _LOG_LOW) / _BIN_WIDTH).astype(np.intp)
+    return np.minimum(bins, HISTOGRAM_BINS - 1)
+
+
+def points_histogram(points: np.ndarray) -> np.ndarray:
+    return np.bincount(histogram_bins(points), minlength=HISTOGRAM_BINS).astype(np.uint32)
+
+
+def histogram_percentiles(histogram: np.ndarray, percentiles: Sequence[float],
+                          low: int, high: int) -> List[int]:
+    """Points at each percentile: the geometric middle of the bin holding that rank."""
+    cumulative = np.cumsum(histogram, dtype=np.int64)
+    ranks = np.maximum(np.ceil(np.asarray(percentiles, dtype=float) / 100 * cumulative[-1]), 1)
+    bins = np.searchsorted(cumulative, ranks)
+    values = np.exp(_LOG_LOW + (bins + 0.5) * _BIN_WIDTH)
+    return np.rint(np.clip(values, low, high)).astype(np.int64).tolist()
+
+
+class Summary:
+    """Mergeable summary of the prices seen for one series over one bucket."""
+
+    __slots__ = ("searches", "observations", "min_points", "max_points", "points_sum", "histogram")
+
+    def __init__(self):
+        self.searches = 0
+        self.observations = 0
+        self.min_points: Optional[int] = None
+        self.max_points: Optional[int] = None
+        self.points_sum = 0
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.uint32)
+
+    def _extend(self, observations: int, low: Optional[int], high: Optional[int], total: int) -> None:
+        self.observations += observations
+        self.points_sum += total
+        if low is not None:
+            self.min_points = low if self.min_points is None else min(self.min_points, low)
+            self.max_points = high if self.max_points is None else max(self.max_points, high)
+
+    def add_points(self, points: np.ndarray, searches: int = 1) -> None:
+        self.searches += searches
+        if len(points):
+            self._extend(len(points), int(points.min()), int(points.max()), int(points.sum()))
+            self.histogram += points_histogram(points)
+
+    def merge(self, other: "Summary") -> None:
+        self.searches += other.searches
+        self._extend(other.observations, other.min_points, other.max_points, other.points_sum)
+        self.histogram += other.histogram
+
+    def add_row(self, row: Any) -> None:
+        """Add an availability_snapshots row (ORM object or result row)."""
+        self.searches += row.searches
+        self._extend(row.observations, row.min_points, row.max_points, row.points_sum)
+        self.histogram += np.frombuffer(row.histogram, dtype="<u4")
+
+    def values(self) -> Dict[str, Any]:
+        """Column values for an availability_snapshots row."""
+        return {
+            "searches": self.searches,
+            "observations": self.observations,
+            "min_points": self.min_points,
+            "max_points": self.max_points,
+            "points_sum": self.points_sum,
+            "histogram": self.histogram.astype("<u4").tobytes(),
+        }
+
+    def describe(self, percentiles: Sequence[float] = (50,)) -> Dict[str, Any]:
+        summary = {
+            "searches": self.searches,
+            "observations": self.observations,
+            "min_points": self.min_points,
+            "max_points": self.max_points,
+            "avg_points": round(self.points_sum / self.observations) if self.observations else None,
+        }
+        if percentiles:
+            values = (
+                histogram_percentiles(self.histogram, percentiles, self.min_points, self.max_points)
+                if self.observations else [None] * len(percentiles)
+            )
+            summary["percentiles"] = {f"p{q:g}": v for q, v in zip(percentiles, values)}
+        return summary
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+class AvailabilityRecorder:
+    """Per-worker in-memory day summaries, flushed periodically as partial rows."""
+
+    def __init__(self):
+        self._buffer: Dict[Tuple[Series, date], Summary] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._session_factory = None
+        self.counters = {"searches": 0, "observations": 0, "flushed_rows": 0, "failed_rows": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, session_factory, interval: float) -> None:
+        if self._task is None and interval > 0:
+            self._session_factory = session_factory
+            self._task = asyncio.create_task(self._run(interval))
+
+    def observe(self, search: NormalizedSearch, results: Sequence[Dict[str, Any]]) -> None:
+        """Fold one upstream result set into today's summary for its series (no-op when not running)."""
+        if self._task is None:
+            return
+        key = ((search.origin, search.destination, search.cabin, search.program), datetime.utcnow().date())
+        summary = self._buffer.get(key)
+        if summary is None:
+            summary = self._buffer[key] = Summary()
+        summary.add_points(np.fromiter((r["points_required"] for r in results), dtype=np.int64, count=len(results)))
+        self.counters["searches"] += 1
+        self.counters["observations"] += len(results)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            # Shielded so a shutdown cancel never interrupts a flush mid-write
+            self._flushing = asyncio.ensure_future(self.flush())
+            await asyncio.shield(self._flushing)
+
+    async def flush(self) -> None:
+        """Write the buffered summaries as partial rows; failures are logged and counted, not raised."""
+        buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return
+        rows = [
+            {
+                "origin": origin, "destination": destination, "cabin_class": cabin, "loyalty_program": program,
+                "resolution": "day", "bucket_start": day, "compacted": False, **summary.values(),
+            }
+            for ((origin, destination, cabin, program), day), summary in buffer.items()
+        ]
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(AvailabilitySnapshot), rows)
+                await db.commit()
+        except Exception as e:
+            self.counters["failed_rows"] += len(rows)
+            logger.warning("Dropped %d availability snapshot rows: %s", len(rows), e)
+            return
+        self.counters["flushed_rows"] += len(rows)
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "buffered": len(self._buffer)}
+
+
+def _range_filter(origin: str, destination: str, cabin: str, program: Optional[str], since: date, until: date):
+    snapshot = AvailabilitySnapshot
+    conditions = [
+        snapshot.origin == origin.upper(),
+        snapshot.destination == destination.upper(),
+        snapshot.cabin_class == cabin,
+        # Only buckets wholly inside the range: a week row that straddles
+        # either end would count observations from outside it
+        snapshot.bucket_start >= since,
+        or_(
+            and_(snapshot.resolution == "day", snapshot.bucket_start <= until),
+            and_(snapshot.resolution == "week", snapshot.bucket_start <= until - timedelta(days=6)),
+        ),
+    ]
+    if program:
+        conditions.append(snapshot.loyalty_program == program)
+    return and_(*conditions)
+
+
+async def _summaries(db, origin: str, destination: str, cabin: str, program: Optional[str],
+                     since: date, until: date) -> Dict[Tuple[str, date], Summary]:
+    rows = await db.execute(
+        select(*AvailabilitySnapshot.__table__.c).where(_range_filter(origin, destination, cabin, program, since, until))
+    )
+    buckets: Dict[Tuple[str, date], Summary] = defaultdict(Summary)
+    for row in rows:
+        buckets[(row.resolution, row.bucket_start)].add_row(row)
+    return buckets
+
+
+async def price_history(db, origin: str, destination: str, cabin: str, program: Optional[str],
+                        since: date, until: date) -> List[Dict[str, Any]]:
+    """
+    One entry per day (or week, past the daily retention) in the range, oldest
+    first. Weeks that straddle either end of the range are left out, so where
+    the range reaches into weekly history it starts at the first whole week.
+    """
+    buckets = await _summaries(db, origin, destination, cabin, program, since, until)
+    return [
+        {"period_start": start, "resolution": resolution, **buckets[(resolution, start)].describe()}
+        for resolution, start in sorted(buckets, key=lambda key: key[1])
+    ]
+
+
+async def price_percentiles(db, origin: str, destination: str, cabin: str, program: Optional[str],
+                            since: date, until: date, percentiles: Sequence[float]) -> Dict[str, Any]:
+    """
+    Distribution of every price observed in the range, rounded inwards to whole
+    weeks where it reaches into weekly history (see price_history).
+    """
+    total = Summary()
+    for summary in (await _summaries(db, origin, destination, cabin, program, since, until)).values():
+        total.merge(summary)
+    return total.describe(percentiles)
+
+
+async def compact(db, today: Optional[date] = None, series_batch: int = 200) -> Dict[str, int]:
+    """
+    Merge partial rows of finished days, downsample days past the daily
+    retention into weeks and drop rows past the overall retention.
+    """
+    today = today or datetime.utcnow().date()
+    daily_cutoff = today - timedelta(days=settings.AVAILABILITY_DAILY_RETENTION_DAYS)
+    snapshot = AvailabilitySnapshot
+    series_columns = (snapshot.origin, snapshot.destination, snapshot.cabin_class, snapshot.loyalty_program)
+    stats = {"expired": 0, "merged": 0, "written": 0}
+
+    expired = await db.execute(
+        delete(snapshot).where(snapshot.bucket_start < today - timedelta(days=settings.AVAILABILITY_RETENTION_DAYS))
+    )
+    stats["expired"] = expired.rowcount or 0
+    await db.commit()
+
+    pending = (await db.execute(
+        select(*series_columns).distinct().where(
+            snapshot.bucket_start < today,
+            or_(snapshot.compacted.is_(False), and_(snapshot.resolution == "day", snapshot.bucket_start < daily_cutoff)),
+        )
+    )).all()
+    for start in range(0, len(pending), series_batch):
+        batch = [tuple(series) for series in pending[start:start + series_batch]]
+        rows = await db.execute(
+            select(*snapshot.__table__.c).where(tuple_(*series_columns).in_(batch), snapshot.bucket_start < today)
+        )
+
+        groups: Dict[Tuple[Series, str, date], List[Any]] = defaultdict(list)
+        for row in rows:
+            series = (row.origin, row.destination, row.cabin_class, row.loyalty_program)
+            if row.resolution == "week" or row.bucket_start < daily_cutoff:
+                groups[(series, "week", week_start(row.bucket_start))].append(row)
+            else:
+                groups[(series, "day", row.bucket_start)].append(row)
+
+        replaced, written = [], []
+        for (series, resolution, bucket_start), members in groups.items():
+            if len(members) == 1 and members[0].compacted and members[0].resolution == resolution:
+                continue
+            summary = Summary()
+            for row in members:
+                summary.add_row(row)
+            replaced.extend(row.id for row in members)
+            origin, destination, cabin, program = series
+            written.append({
+                "origin": origin, "destination": destination, "cabin_class": cabin, "loyalty_program": program,
+                "resolution": resolution, "bucket_start": bucket_start, "compacted": True, **summary.values(),
+            })
+        for offset in range(0, len(replaced), DELETE_BATCH):
+            await db.execute(delete(snapshot).where(snapshot.id.in_(replaced[offset:offset + DELETE_BATCH])))
+        if written:
+            await db.execute(insert(snapshot), written)
+        # One transaction per batch of series, so readers never see a bucket twice or not at all
+        await db.commit()
+        stats["merged"] += len(replaced)
+        stats["written"] += len(written)
+    return stats
+
+
+availability_recorder = AvailabilityRecorder()
@@ -0,0 +1,263 @@
+"""
+Multi-segment award routing through major hubs
+
+Every award search result set that passes through the search cache is also
+indexed here as flight segments: per (cabin, airport), the segments leaving
+it grouped by destination, sorted by departure time, with the cheapest
+points price on each edge. A route query never calls Seats.aero; it runs a
+best-first search over what is cached, with intermediate airports limited to
+major hubs, a minimum and maximum connection time and a stop limit.
+
+The search is A*: partial itineraries are ordered by points so far plus the
+cheapest way to reach the destination within the remaining legs (computed
+per query on the per-edge minimum prices), and a partial itinerary that
+cannot beat the ranked itineraries already found is never queued. Segments
+leave the graph when the search cache would stop serving them (per-cabin TTL
+plus the stale window), and at most ROUTING_MAX_SEARCHES searches are kept.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.services.search_cache import NormalizedSearch, cabin_ttl
+
+# Partial itineraries expanded per query before giving up on finding more;
+# a guard for pathological graphs, far above what the bound lets through
+MAX_EXPANSIONS = 20000
+
+Node = Tuple[str, str]  # (cabin, IATA code)
+
+
+class Segment(NamedTuple):
+    departs: datetime
+    arrives: datetime
+    destination: str
+    points: int
+    availability: int
+    program: str
+    record: Dict[str, Any]  # the FlightRecord, tagged with loyalty_program
+
+
+class Edge(NamedTuple):
+    departures: List[datetime]
+    segments: List[Segment]
+    min_points: int
+
+
+class SegmentGraph:
+    """Cached award segments as a time-dependent graph between airports."""
+
+    def __init__(self, max_searches: int):
+        self.max_searches = max_searches
+        # search key -> (expires_at, results object, nodes it added segments to)
+        self._searches: "OrderedDict[str, Tuple[float, Any, Tuple[Node, ...]]]" = OrderedDict()
+        self._segments: Dict[Node, Dict[str, List[Segment]]] = {}
+        # Built lazily per node: (earliest expiry of its segments, destination -> Edge)
+        self._adjacency: Dict[Node, Tuple[float, Dict[str, Edge]]] = {}
+        self.segment_count = 0
+        self.counters = {"queries": 0, "expansions": 0, "adjacency_builds": 0}
+
+    # -- indexing ------------------------------------------------------------
+
+    def add(self, search: NormalizedSearch, results: Iterable[Dict[str, Any]]) -> None:
+        """Index one search's results, replacing what that search contributed before."""
+        entry = self._searches.get(search.key)
+        if entry is not None and entry[1] is results:
+            # Same cached list served again
+            self._searches.move_to_end(search.key)
+            return
+        self._remove(search.key)
+
+        by_origin: Dict[str, List[Segment]] = defaultdict(list)
+        for r in results:
+            try:
+                departs = datetime.fromisoformat(r["departure_time"])
+                arrives = datetime.fromisoformat(r["arrival_time"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            by_origin[r["origin"].upper()].append(Segment(
+                departs, arrives, r["destination"].upper(), r["points_required"], r["availability"],
+                search.program, {**r, "loyalty_program": search.program},
+            ))
+
+        nodes = tuple((search.cabin, origin) for origin in by_origin)
+        for node, segments in zip(nodes, by_origin.values()):
+            self._segments.setdefault(node, {})[search.key] = segments
+            self._adjacency.pop(node, None)
+            self.segment_count += len(segments)
+        expires_at = time.monotonic() + cabin_ttl(search.cabin) + settings.SEARCH_CACHE_STALE_SECONDS
+        self._searches[search.key] = (expires_at, results, nodes)
+        while len(self._searches) > self.max_searches:
+            self._remove(next(iter(self._searches)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._searches.pop(key, None)
+        if entry is None:
+            return
+        for node in entry[2]:
+            by_search = self._segments.get(node)
+            if by_search is None:
+                continue
+            self.segment_count -= len(by_search.pop(key, ()))
+            if not by_search:
+                del self._segments[node]
+            self._adjacency.pop(node, None)
+
+    def _edges(self, node: Node, now: float) -> Dict[str, Edge]:
+        built = self._adjacency.get(node)
+        if built is not None and built[0] > now:
+            return built[1]
+        by_search = self._segments.get(node, {})
+        for key in [k for k in by_search if self._searches[k][0] <= now]:
+            self._remove(key)
+        by_search = self._segments.get(node, {})
+
+        # The same flight seen by several searches (e.g. party sizes): keep the cheapest
+        cheapest: Dict[Tuple[str, str, datetime, str], Segment] = {}
+        for segments in by_search.values():
+            for s in segments:
+                ident = (s.destination, s.record["flight_number"], s.departs, s.program)
+                seen = cheapest.get(ident)
+                if seen is None or s.points < seen.points:
+                    cheapest[ident] = s
+        grouped: Dict[str, List[Segment]] = defaultdict(list)
+        for s in cheapest.values():
+            grouped[s.destination].append(s)
+        edges = {}
+        for destination, segments in grouped.items():
+            segments.sort(key=lambda s: s.departs)
+            edges[destination] = Edge([s.departs for s in segments], segments, min(s.points for s in segments))
+
+        expires_at = min((self._searches[k][0] for k in by_search), default=float("inf"))
+        self._adjacency[node] = (expires_at, edges)
+        self.counters["adjacency_builds"] += 1
+        return edges
+
+    # -- querying ------------------------------------------------------------
+
+    def _lower_bounds(self, cabin: str, nodes: FrozenSet[str], destination: str,
+                      max_legs: int, now: float) -> List[Dict[str, int]]:
+        """bounds[r][airport]: cheapest points to the destination in at most r legs (per-edge minimums)."""
+        bounds = [{destination: 0}]
+        for _ in range(1, max_legs):
+            previous = bounds[-1]
+            current = dict(previous)
+            for airport in nodes:
+                edges = self._edges((cabin, airport), now)
+                best = current.get(airport)
+                for target, rest in previous.items():
+                    edge = edges.get(target)
+                    if edge is not None and (best is None or edge.min_points + rest < best):
+                        best = edge.min_points + rest
+                if best is not None:
+                    current[airport] = best
+            bounds.append(current)
+        return bounds
+
+    def routes(
+        self,
+        origin: str,
+        destination: str,
+        day: date,
+        cabin: str,
+        hubs: FrozenSet[str],
+        passengers: int = 1,
+        programs: Optional[Iterable[str]] = None,
+        max_stops: int = 1,
+        min_connection: Optional[timedelta] = None,
+        max_connection: Optional[timedelta] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Up to ``limit`` itineraries leaving on ``day``, cheapest in points first."""
+        now = time.monotonic()
+        self.counters["queries"] += 1
+        origin, destination = origin.upper(), destination.upper()
+        min_connection = min_connection if min_connection is not None else timedelta(minutes=settings.ROUTING_MIN_CONNECTION_MINUTES)
+        max_connection = max_connection if max_connection is not None else timedelta(hours=settings.ROUTING_MAX_CONNECTION_HOURS)
+        allowed = frozenset(programs) if programs else None
+        max_legs = max_stops + 1
+
+        def usable(s: Segment) -> bool:
+            return s.availability >= passengers and (allowed is None or s.program in allowed)
+
+        nodes = (hubs | {origin}) - {destination}
+        bounds = self._lower_bounds(cabin, nodes, destination, max_legs, now)
+
+        queue: List[Tuple[int, int, int, Tuple[Segment, ...]]] = []
+        found_costs: List[int] = []  # max-heap (negated) of the best complete itineraries queued
+        sequence = itertools.count()
+
+        def enqueue(cost: int, estimate: int, path: Tuple[Segment, ...]) -> None:
+            if len(found_costs) == limit and estimate > -found_costs[0]:
+                return
+            if path[-1].destination == destination:
+                if len(found_costs) < limit:
+                    heapq.heappush(found_costs, -cost)
+                elif cost < -found_costs[0]:
+                    heapq.heapreplace(found_costs, -cost)
+            heapq.heappush(queue, (estimate, cost, next(sequence), path))
+
+        first_legs = self._edges((cabin, origin), now)
+        day_start = datetime.combine(day, datetime.min.time())
+        for target, rest in bounds[max_legs - 1].items():
+            edge = first_legs.get(target)
+            if edge is None:
+                continue
+            start = bisect_left(edge.departures, day_start)
+            end = bisect_left(edge.departures, day_start + timedelta(days=1))
+            for s in edge.segments[start:end]:
+                if usable(s):
+                    enqueue(s.points, s.points + rest, (s,))
+
+        itineraries: List[Tuple[Segment, ...]] = []
+        expansions = 0
+        while queue and len(itineraries) < limit and expansions < MAX_EXPANSIONS:
+            _, cost, _, path = heapq.heappop(queue)
+            last = path[-1]
+            if last.destination == destination:
+                itineraries.append(path)
+                continue
+            expansions += 1
+
+            visited = {origin, *(s.destination for s in path)}
+            edges = self._edges((cabin, last.destination), now)
+            earliest, latest = last.arrives + min_connection, last.arrives + max_connection
+            for target, rest in bounds[max_legs - len(path) - 1].items():
+                edge = edges.get(target)
+                if edge is None or target in visited:
+                    continue
+                for i in range(bisect_left(edge.departures, earliest), bisect_right(edge.departures, latest)):
+                    s = edge.segments[i]
+                    if usable(s):
+                        enqueue(cost + s.points, cost + s.points + rest, path + (s,))
+
+        self.counters["expansions"] += expansions
+        return sorted((itinerary(path) for path in itineraries),
+                      key=lambda i: (i["points_required"], i["duration_minutes"]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "searches": len(self._searches), "airports": len(self._segments),
+                "segments": self.segment_count}
+
+
+def itinerary(path: Tuple[Segment, ...]) -> Dict[str, Any]:
+    layovers = [int((b.departs - a.arrives).total_seconds() // 60) for a, b in zip(path, path[1:])]
+    return {
+        "points_required": sum(s.points for s in path),
+        "cash_price": round(sum(s.record["cash_price"] for s in path), 2),
+        "duration_minutes": sum(s.record["duration_minutes"] for s in path) + sum(layovers),
+        "stops": len(path) - 1,
+        "via": [s.destination for s in path[:-1]],
+        "layover_minutes": layovers,
+        "segments": [s.record for s in path],
+    }
+
+
+segment_graph = SegmentGraph(settings.ROUTING_MAX_SEARCHES)
@@ -0,0 +1,210 @@
+"""
+Award search execution
+
+Every search goes cache -> single-flight -> Seats.aero, so concurrent callers
+with an equivalent normalized search share one upstream call. Upstream
+records are validated into FlightRecord dicts once, before they are cached, so
+cached results can be sent to clients without another validation pass.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis, mark_redis_failure
+from app.schemas.flights import FlightRecord
+from app.services.availability_history import availability_recorder
+from app.services.award_routing import segment_graph
+from app.services.search_cache import NormalizedSearch, canonical_program, search_cache
+from app.services.seats_aero import SeatsAeroClient, SeatsAeroError
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+search_flight = SingleFlight("search")
+
+lock_counters = {"acquired": 0, "waited": 0, "served_by_peer": 0}
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+_flight_records = TypeAdapter(List[FlightRecord])
+
+
+def compact_results(raw: Any) -> List[FlightRecord]:
+    """Validate upstream records into FlightRecord dicts (types coerced, unknown fields dropped)."""
+    try:
+        return _flight_records.validate_python(raw)
+    except ValidationError as e:
+        raise SeatsAeroError(f"Seats.aero returned {e.error_count()} invalid result fields") from None
+
+
+def tag_results(records: Sequence[FlightRecord], program: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Response dicts for one program's records, with every FlightResult key:
+    funding stays null unless transfer_optimizer.annotate fills it in.
+    """
+    return [{**r, "loyalty_program": program, "funding": None} for r in records]
+
+
+async def _fetch(search: NormalizedSearch, client: SeatsAeroClient) -> List[FlightRecord]:
+    results = compact_results(await client.search(search.api_params()))
+    # Only real upstream fetches count as price observations, never cache hits
+    availability_recorder.observe(search, results)
+    return results
+
+
+async def _fetch_with_lock(search: NormalizedSearch, client: SeatsAeroClient) -> List[Dict[str, Any]]:
+    """
+    Fetch from upstream, first taking a short cross-worker lock. If another
+    worker holds it, poll the shared cache for its result until the lock
+    would have expired, then fall back to fetching ourselves. Without the
+    search cache there is no shared result to wait for, so no lock either.
+    """
+    redis = get_redis() if settings.SEARCH_COALESCE_REDIS_LOCK and settings.SEARCH_CACHE_ENABLED else None
+    if redis is None:
+        return await _fetch(search, client)
+
+    lock_key = f"{search.key}:lock"
+    token = secrets.token_hex(8)
+    try:
+        acquired = await redis.set(lock_key, token, nx=True, px=settings.SEARCH_COALESCE_LOCK_MS)
+    except RedisError as e:
+        mark_redis_failure(e)
+        return await _fetch(search, client)
+
+    if acquired:
+        lock_counters["acquired"] += 1
+        try:
+            results = await _fetch(search, client)
+            # Publish before releasing so waiting peers find the result
+            # (get_or_fetch sees it is stored and does not write it again)
+            await search_cache.set(search, results)
+            return results
+        finally:
+            try:
+                await redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except RedisError as e:
+                mark_redis_failure(e)
+
+    lock_counters["waited"] += 1
+    deadline = asyncio.get_running_loop().time() + settings.SEARCH_COALESCE_LOCK_MS / 1000
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(settings.SEARCH_COALESCE_POLL_MS / 1000)
+        cached = await search_cache.get(search)
+        if cached is not None and cached[1]:
+            lock_counters["served_by_peer"] += 1
+            return cached[0]
+    return await _fetch(search, client)
+
+
+async def _within_budget(search: NormalizedSearch, client: SeatsAeroClient, timeout: Optional[float]) -> List[Dict[str, Any]]:
+    call = search_flight.do(search.key, lambda: _fetch_with_lock(search, client))
+    if timeout is None:
+        return await call
+    try:
+        # Only this caller gives up; the shared upstream call keeps running for others
+        return await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        raise SeatsAeroError(f"{search.program} search timed out after {timeout:g}s") from None
+
+
+async def run_search(
+    search: NormalizedSearch,
+    client: SeatsAeroClient,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    timeout: Optional[float] = None,
+    allow_stale: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Cached, coalesced award search for one normalized query. ``semaphore``
+    bounds concurrent upstream calls; cache hits never wait on it. ``timeout``
+    bounds the upstream call itself, not time spent queued on the semaphore.
+    ``allow_stale=False`` fetches instead of serving an expired cache entry.
+    Results are also indexed into the hub routing graph.
+    """
+    async def upstream() -> List[Dict[str, Any]]:
+        if semaphore is None:
+            return await _within_budget(search, client, timeout)
+        async with semaphore:
+            return await _within_budget(search, client, timeout)
+
+    results = await search_cache.get_or_fetch(search, upstream, allow_stale)
+    segment_graph.add(search, results)
+    return results
+
+
+def expand_dates(search: NormalizedSearch, flexible_days: int) -> List[NormalizedSearch]:
+    """One search per day in departure_date ± flexible_days, skipping past days."""
+    center = date.fromisoformat(search.departure_date)
+    today = date.today()
+    days = [center + timedelta(days=offset) for offset in range(-flexible_days, flexible_days + 1)]
+    return [search._replace(departure_date=d.isoformat()) for d in days if d >= today or d == center]
+
+
+def expand_programs(searches: Sequence[NormalizedSearch], programs: Sequence[str]) -> List[NormalizedSearch]:
+    """One search per (search, program), with programs canonicalized and de-duplicated."""
+    canonical = list(dict.fromkeys(canonical_program(p) for p in programs))
+    return [s._replace(program=p) for s in searches for p in canonical]
+
+
+async def run_many(
+    searches: Sequence[NormalizedSearch],
+    client: SeatsAeroClient,
+    timeout: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    allow_stale: bool = True,
+) -> List[Union[List[Dict[str, Any]], Exception]]:
+    """
+    Run several searches concurrently with at most ``concurrency`` (default
+    SEARCH_FANOUT_CONCURRENCY) upstream calls in flight, each bounded by
+    ``timeout``. Returns results or the exception, per search.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.SEARCH_FANOUT_CONCURRENCY)
+    return await asyncio.gather(
+        *(run_search(s, client, semaphore, timeout, allow_stale) for s in searches),
+        return_exceptions=True,
+    )
+
+
+async def iter_many(
+    searches: Sequence[NormalizedSearch],
+    client: SeatsAeroClient,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[NormalizedSearch, Union[List[Dict[str, Any]], Exception]]]:
+    """
+    Like run_many, but yield (search, results-or-exception) as each search
+    completes. Closing the iterator early cancels searches still running.
+    """
+    semaphore = asyncio.Semaphore(settings.SEARCH_FANOUT_CONCURRENCY)
+
+    async def one(search: NormalizedSearch):
+        try:
+            return search, await run_search(search, client, semaphore, timeout)
+        except Exception as e:
+            return search, e
+
+    tasks = [asyncio.create_task(one(s)) for s in searches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def stats() -> Dict[str, Any]:
+    return {**search_flight.stats(), "redis_lock": dict(lock_counters)}
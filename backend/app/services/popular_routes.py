@@ -0,0 +1,203 @@
+"""
+Popular routes from incrementally maintained search aggregates
+
+Each SearchHistory batch is folded into route_search_stats, one row per
+(day, route, program), with an upsert that adds counts and keeps the minimum.
+A periodic refresh sums the daily buckets over each rolling window into an
+in-memory snapshot, so GET /flights/popular-routes never touches the
+database and its cost does not grow with search history. Buckets older than
+the widest window are deleted by the Celery worker (prune_stats), not by the
+API workers, whose refresh only reads.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.models.models import Airport, LoyaltyProgram, RouteSearchStat
+from app.services.search_cache import canonical_program
+
+logger = logging.getLogger(__name__)
+
+# Program bucket for searches across several programs at once
+MULTI_PROGRAM = "*"
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+StatKey = Tuple[date, str, str, str]
+
+
+def program_bucket(loyalty_program: Optional[str]) -> str:
+    if not loyalty_program or loyalty_program == "all" or "," in loyalty_program:
+        return MULTI_PROGRAM
+    return canonical_program(loyalty_program)
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]]) -> Dict[StatKey, Dict[str, Any]]:
+    """Fold SearchHistory rows (column -> value) into per-bucket deltas."""
+    deltas: Dict[StatKey, Dict[str, Any]] = {}
+    for row in rows:
+        key = (
+            row["searched_at"].date(),
+            row["origin"].strip().upper(),
+            row["destination"].strip().upper(),
+            program_bucket(row.get("loyalty_program")),
+        )
+        delta = deltas.setdefault(key, {"search_count": 0, "points_sum": 0, "points_count": 0, "min_points": None})
+        delta["search_count"] += 1
+        points = row.get("lowest_points")
+        if points is not None:
+            delta["points_sum"] += points
+            delta["points_count"] += 1
+            if delta["min_points"] is None or points < delta["min_points"]:
+                delta["min_points"] = points
+    return deltas
+
+
+async def apply_search_rows(db, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Add SearchHistory rows to route_search_stats in the caller's transaction.
+    Rows are pre-aggregated so the upsert touches each bucket once.
+    """
+    deltas = aggregate_rows(rows)
+    if not deltas:
+        return
+    values = [
+        {"day": day, "origin": origin, "destination": destination, "loyalty_program": program, **delta}
+        for (day, origin, destination, program), delta in deltas.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    dialect_insert = _DIALECT_INSERTS.get(dialect)
+    if dialect_insert is None:
+        raise RuntimeError(f"route_search_stats upsert is not supported on {dialect}")
+    stmt = dialect_insert(RouteSearchStat).values(values)
+    new, table = stmt.excluded, RouteSearchStat.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.day, table.origin, table.destination, table.loyalty_program],
+        set_={
+            "search_count": table.search_count + new.search_count,
+            "points_sum": table.points_sum + new.points_sum,
+            "points_count": table.points_count + new.points_count,
+            # NULL-safe minimum: a NULL comparison falls through to COALESCE
+            "min_points": case(
+                (new.min_points < table.min_points, new.min_points),
+                else_=func.coalesce(table.min_points, new.min_points),
+            ),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def prune_stats(db, today: Optional[date] = None) -> int:
+    """Delete buckets older than the widest window, which can no longer contribute; returns rows deleted."""
+    today = today or date.today()
+    cutoff = today - timedelta(days=max(settings.POPULAR_ROUTES_WINDOWS))
+    deleted = await db.execute(delete(RouteSearchStat).where(RouteSearchStat.day < cutoff))
+    await db.commit()
+    return deleted.rowcount or 0
+
+
+class PopularRoutes:
+    """Top routes per rolling window, rebuilt periodically from route_search_stats."""
+
+    def __init__(self):
+        self.windows: Dict[int, List[Dict[str, Any]]] = {}
+        self.loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def load(self, db) -> None:
+        windows = settings.POPULAR_ROUTES_WINDOWS
+        today = date.today()
+        program_names = {
+            canonical_program(code): name
+            for code, name in (await db.execute(select(LoyaltyProgram.code, LoyaltyProgram.name))).all()
+            if code
+        }
+        snapshot = {}
+        for days in windows:
+            snapshot[days] = await self._window(db, today - timedelta(days=days - 1), program_names)
+        # One assignment so readers see a complete snapshot
+        self.windows = snapshot
+        self.loaded_at = time.monotonic()
+
+    async def _window(self, db, since: date, program_names: Dict[str, str]) -> List[Dict[str, Any]]:
+        stat = RouteSearchStat
+        searches = func.sum(stat.search_count).label("searches")
+        top = (await db.execute(
+            select(
+                stat.origin, stat.destination, searches,
+                func.sum(stat.points_sum), func.sum(stat.points_count), func.min(stat.min_points),
+            )
+            .where(stat.day >= since)
+            .group_by(stat.origin, stat.destination)
+            .order_by(searches.desc(), stat.origin, stat.destination)
+            .limit(settings.POPULAR_ROUTES_TOP_N)
+        )).all()
+        if not top:
+            return []
+        routes = {(r[0], r[1]) for r in top}
+        codes = {code for route in routes for code in route}
+
+        # Cheapest program per route by average lowest points
+        best: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        per_program = await db.execute(
+            select(stat.origin, stat.destination, stat.loyalty_program, func.sum(stat.points_sum), func.sum(stat.points_count))
+            .where(stat.day >= since, stat.loyalty_program != MULTI_PROGRAM, stat.origin.in_(codes), stat.destination.in_(codes))
+            .group_by(stat.origin, stat.destination, stat.loyalty_program)
+        )
+        for origin, destination, program, points_sum, points_count in per_program:
+            if (origin, destination) not in routes or not points_count:
+                continue
+            avg = points_sum / points_count
+            if (origin, destination) not in best or avg < best[(origin, destination)][0]:
+                best[(origin, destination)] = (avg, program)
+
+        cities = dict((await db.execute(select(Airport.iata_code, Airport.city).where(Airport.iata_code.in_(codes)))).all())
+        return [
+            {
+                "origin": origin,
+                "destination": destination,
+                "origin_city": cities.get(origin),
+                "destination_city": cities.get(destination),
+                "searches": int(count),
+                "avg_points": round(points_sum / points_count) if points_count else None,
+                "min_points": min_points,
+                "best_program": program_names.get(best[(origin, destination)][1], best[(origin, destination)][1])
+                if (origin, destination) in best else None,
+            }
+            for origin, destination, count, points_sum, points_count, min_points in top
+        ]
+
+    def top(self, days: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Most searched routes in the ``days`` window, or None for an unknown window."""
+        routes = self.windows.get(days)
+        return None if routes is None else routes[:limit]
+
+    def start_refresh(self, session_factory, interval: float) -> None:
+        async def refresh_loop():
+            while True:
+                try:
+                    async with session_factory() as db:
+                        await self.load(db)
+                except Exception as e:
+                    logger.warning("Popular routes refresh failed: %s", e)
+                await asyncio.sleep(interval)
+
+        if self._refresh_task is None and interval > 0:
+            self._refresh_task = asyncio.create_task(refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+popular_routes = PopularRoutes()
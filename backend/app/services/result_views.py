@@ -0,0 +1,169 @@
+"""
+Filtered, sorted and paged views of merged search results
+
+A search fans out into one cached result list per (day, program). A view is
+those lists merged, tagged with their program, filtered (stops, duration,
+airlines, points ceiling) and sorted once, together with each result's sort
+key. Views are kept in a small in-process LRU keyed on the searches, filters
+and sort, and are reused for as long as the underlying cached lists are the
+same objects, so pages 2..N are a bisect and a slice.
+
+Pages use keyset cursors: an opaque token holding the sort key of the last
+result returned. The next page starts right after that key. Sort keys end with
+the flight's identity (departure, program, flight number, cabin, route) and,
+for exact duplicates only, an occurrence number, so every key is unique and
+depends on the flight rather than on upstream order. When the cache refreshes
+and the view is rebuilt, results already paged past stay behind the cursor
+and later ones stay ahead of it. Only results that are new, gone or repriced
+across the boundary can be missed or seen twice.
+"""
+from __future__ import annotations
+
+import base64
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.services.flight_search import tag_results
+from app.services.search_cache import NormalizedSearch
+
+
+def _tiebreak(r: Dict[str, Any]) -> Tuple:
+    # The flight's identity, independent of upstream or cache order
+    return (r["departure_time"], r["loyalty_program"], r["flight_number"], r["cabin_class"],
+            r["origin"], r["destination"])
+
+
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    "points": lambda r: (r["points_required"], r["duration_minutes"], *_tiebreak(r)),
+    "duration": lambda r: (r["duration_minutes"], r["points_required"], *_tiebreak(r)),
+    "departure": lambda r: (*_tiebreak(r), r["points_required"]),
+    "cash": lambda r: (r["cash_price"], r["points_required"], *_tiebreak(r)),
+}
+
+
+class ResultFilter(NamedTuple):
+    max_stops: Optional[int] = None
+    max_duration_minutes: Optional[int] = None
+    max_points: Optional[int] = None
+    # Lowercase airline names or two-letter codes
+    airlines: Optional[FrozenSet[str]] = None
+
+    def __bool__(self) -> bool:
+        return any(v is not None for v in self)
+
+    def matches(self, r: Dict[str, Any]) -> bool:
+        return (
+            (self.max_stops is None or r["stops"] <= self.max_stops)
+            and (self.max_duration_minutes is None or r["duration_minutes"] <= self.max_duration_minutes)
+            and (self.max_points is None or r["points_required"] <= self.max_points)
+            and (self.airlines is None
+                 or r["airline"].lower() in self.airlines or r["flight_number"][:2].lower() in self.airlines)
+        )
+
+
+class View(NamedTuple):
+    sources: Tuple[Any, ...]        # the outcome objects the view was built from
+    results: List[Dict[str, Any]]   # filtered, sorted
+    keys: List[Tuple]               # unique sort key per result, empty when unsorted
+    total: int                      # merged results before filtering
+    lowest_points: Optional[int]    # before filtering
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, key: Tuple) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([sort, *key])).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    """Sort key from a cursor; InvalidCursor if it is malformed or from another sort."""
+    try:
+        decoded = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor") from None
+    if not isinstance(decoded, list) or len(decoded) < 2 or decoded[0] != sort:
+        raise InvalidCursor("Cursor does not belong to this sort order")
+    return tuple(decoded[1:])
+
+
+class ResultViews:
+    """LRU of views over cached search outcomes."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lru: "OrderedDict[Tuple, View]" = OrderedDict()
+        self.counters = {"hits": 0, "builds": 0}
+
+    def get(
+        self,
+        searches: Sequence[NormalizedSearch],
+        outcomes: Sequence[Any],
+        filters: ResultFilter,
+        sort: Optional[str],
+    ) -> View:
+        key = (tuple(s.key for s in searches), filters, sort)
+        view = self._lru.get(key)
+        if view is not None and len(view.sources) == len(outcomes) and all(
+            a is b for a, b in zip(view.sources, outcomes)
+        ):
+            self._lru.move_to_end(key)
+            self.counters["hits"] += 1
+            return view
+
+        merged = [
+            r
+            for search, outcome in zip(searches, outcomes)
+            if not isinstance(outcome, Exception)
+            for r in tag_results(outcome, search.program)
+        ]
+        lowest = min((r["points_required"] for r in merged), default=None)
+        results = [r for r in merged if filters.matches(r)] if filters else merged
+        keys: List[Tuple] = []
+        if sort is not None:
+            sort_key = SORT_KEYS[sort]
+            seen: Counter = Counter()
+            keyed = []
+            for r in results:
+                key = sort_key(r)
+                seen[key] += 1
+                # Numbers exact duplicates so keys stay unique
+                keyed.append(((*key, seen[key]), r))
+            keyed.sort(key=lambda pair: pair[0])
+            keys = [k for k, _ in keyed]
+            results = [r for _, r in keyed]
+        view = View(tuple(outcomes), results, keys, len(merged), lowest)
+
+        self.counters["builds"] += 1
+        self._lru[key] = view
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+        return view
+
+    @staticmethod
+    def page(view: View, sort: Optional[str], cursor: Optional[str],
+             page_size: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of a view and the cursor for the next one (None on the last page)."""
+        start = 0
+        if cursor:
+            try:
+                start = bisect_right(view.keys, decode_cursor(cursor, sort))
+            except TypeError:
+                raise InvalidCursor("Cursor does not belong to this sort order") from None
+        if page_size is None:
+            return view.results[start:], None
+        end = start + page_size
+        next_cursor = encode_cursor(sort, view.keys[end - 1]) if end < len(view.results) else None
+        return view.results[start:end], next_cursor
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "views": len(self._lru)}
+
+
+result_views = ResultViews(settings.SEARCH_VIEW_CACHE_SIZE)
@@ -0,0 +1,314 @@
+"""
+Award search result cache
+
+Two tiers keyed on a normalized FlightSearch: an in-process LRU for hot keys in
+front of Redis shared by all workers. Entries are fresh for a per-cabin TTL and
+then served stale for SEARCH_CACHE_STALE_SECONDS while a single background
+refresh repopulates them.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis, mark_redis_failure
+from app.schemas.flights import FlightSearch
+
+logger = logging.getLogger(__name__)
+
+# v2: entries hold validated FlightRecord dicts
+CACHE_KEY_PREFIX = "search:v2"
+
+# Loyalty program spellings seen from clients mapped to one canonical name
+PROGRAM_ALIASES = {
+    "united": "united",
+    "unitedmileageplus": "united",
+    "mileageplus": "united",
+    "ua": "united",
+    "american": "american",
+    "americanaadvantage": "american",
+    "aadvantage": "american",
+    "aa": "american",
+    "delta": "delta",
+    "deltaskymiles": "delta",
+    "skymiles": "delta",
+    "dl": "delta",
+    "aeroplan": "aeroplan",
+    "aircanadaaeroplan": "aeroplan",
+    "alaska": "alaska",
+    "alaskamileageplan": "alaska",
+    "mileageplan": "alaska",
+    "flyingblue": "flyingblue",
+    "airfranceklmflyingblue": "flyingblue",
+    "virginatlantic": "virginatlantic",
+    "virginatlanticflyingclub": "virginatlantic",
+    "flyingclub": "virginatlantic",
+    "avios": "british",
+    "britishairways": "british",
+    "britishairwaysexecutiveclub": "british",
+    "emirates": "emirates",
+    "emiratesskywards": "emirates",
+    "skywards": "emirates",
+    "singapore": "singapore",
+    "krisflyer": "singapore",
+    "singaporekrisflyer": "singapore",
+}
+
+
+def canonical_program(name: str) -> str:
+    """Canonical loyalty program name, e.g. 'United MileagePlus' -> 'united'."""
+    compact = re.sub(r"[^a-z0-9]", "", (name or "").lower())
+    return PROGRAM_ALIASES.get(compact, compact)
+
+
+class NormalizedSearch(NamedTuple):
+    origin: str
+    destination: str
+    departure_date: str
+    cabin: str
+    passengers: int
+    program: str
+
+    @property
+    def key(self) -> str:
+        return ":".join([CACHE_KEY_PREFIX, *map(str, self)])
+
+    def api_params(self) -> Dict[str, Any]:
+        """Seats.aero request parameters for this search."""
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "departureDate": self.departure_date,
+            "cabin": self.cabin,
+            "passengers": self.passengers,
+            "program": self.program,
+        }
+
+
+def normalize_search(search: FlightSearch) -> NormalizedSearch:
+    """Normalize a FlightSearch so equivalent searches share one cache key."""
+    return NormalizedSearch(
+        origin=search.origin.strip().upper(),
+        destination=search.destination.strip().upper(),
+        departure_date=search.departure_date.isoformat(),
+        cabin=search.cabin_class.value,
+        passengers=search.passengers,
+        program=canonical_program(search.loyalty_program),
+    )
+
+
+def cabin_ttl(cabin: str) -> int:
+    """Fresh TTL in seconds for a cabin class."""
+    return {
+        "economy": settings.SEARCH_CACHE_TTL_ECONOMY,
+        "premium_economy": settings.SEARCH_CACHE_TTL_PREMIUM_ECONOMY,
+        "business": settings.SEARCH_CACHE_TTL_BUSINESS,
+        "first": settings.SEARCH_CACHE_TTL_FIRST,
+    }.get(cabin, settings.SEARCH_CACHE_TTL_ECONOMY)
+
+
+# (fetched_at epoch seconds, results)
+CacheEntry = Tuple[float, List[Dict[str, Any]]]
+Fetcher = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+class SearchCache:
+    """Stale-while-revalidate cache for award search results."""
+
+    def __init__(self, lru_size: Optional[int] = None):
+        self.lru_size = lru_size or settings.SEARCH_CACHE_LRU_SIZE
+        self._lru: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "hits": 0,
+            "lru_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "redis_errors": 0,
+        }
+
+    # -- tiers ---------------------------------------------------------------
+
+    def _lru_get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+        return entry
+
+    def _lru_set(self, key: str, entry: CacheEntry) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def _redis_get(self, key: str) -> Optional[CacheEntry]:
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(key)
+        except RedisError as e:
+            self.counters["redis_errors"] += 1
+            mark_redis_failure(e)
+            return None
+        if raw is None:
+            return None
+        data = orjson.loads(raw)
+        return data["fetched_at"], data["results"]
+
+    async def _redis_set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        payload = orjson.dumps({"fetched_at": entry[0], "results": entry[1]})
+        try:
+            await redis.set(key, payload, ex=ttl + settings.SEARCH_CACHE_STALE_SECONDS)
+        except RedisError as e:
+            self.counters["redis_errors"] += 1
+            mark_redis_failure(e)
+
+    async def _claim_refresh(self, key: str, ttl: int) -> bool:
+        """Ensure only one worker refreshes a stale key at a time."""
+        redis = get_redis()
+        if redis is None:
+            return True
+        try:
+            return bool(await redis.set(f"{key}:refresh", "1", nx=True, ex=max(ttl // 2, 5)))
+        except RedisError as e:
+            mark_redis_failure(e)
+            return True
+
+    async def _release_refresh(self, key: str) -> None:
+        """Drop a refresh claim early, so another worker can refresh the key."""
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(f"{key}:refresh")
+        except RedisError as e:
+            mark_redis_failure(e)
+
+    # -- public API ----------------------------------------------------------
+
+    async def get(self, search: NormalizedSearch) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Look up a search in both tiers without fetching.
+        Returns (results, is_fresh) or None when nothing usable is cached.
+        """
+        key = search.key
+        ttl = cabin_ttl(search.cabin)
+        now = time.time()
+
+        entry = self._lru_get(key)
+        if entry is not None and now - entry[0] < ttl:
+            self.counters["lru_hits"] += 1
+            return entry[1], True
+
+        # LRU miss or stale: another worker may already hold a fresher copy
+        remote = await self._redis_get(key)
+        if remote is not None and (entry is None or remote[0] > entry[0]):
+            self._lru_set(key, remote)
+            entry = remote
+            if now - entry[0] < ttl:
+                self.counters["redis_hits"] += 1
+                return entry[1], True
+
+        if entry is not None and now - entry[0] < ttl + settings.SEARCH_CACHE_STALE_SECONDS:
+            return entry[1], False
+        return None
+
+    async def set(self, search: NormalizedSearch, results: List[Dict[str, Any]]) -> None:
+        entry = (time.time(), results)
+        self._lru_set(search.key, entry)
+        await self._redis_set(search.key, entry, cabin_ttl(search.cabin))
+
+    async def _store(self, search: NormalizedSearch, results: List[Dict[str, Any]]) -> None:
+        """
+        set() the results of a fetch, unless the fetcher already stored this
+        very list (the cross-worker lock leader publishes before unlocking) or
+        took it from the cache (served by a peer): that would be a second
+        identical Redis write.
+        """
+        entry = self._lru.get(search.key)
+        if entry is None or entry[1] is not results:
+            await self.set(search, results)
+
+    async def get_or_fetch(self, search: NormalizedSearch, fetch: Fetcher,
+                           allow_stale: bool = True) -> List[Dict[str, Any]]:
+        """
+        Serve from cache when possible. Stale entries are returned immediately and
+        refreshed in the background; misses call ``fetch`` inline. With
+        ``allow_stale=False`` stale entries count as misses.
+        """
+        if not settings.SEARCH_CACHE_ENABLED:
+            return await fetch()
+
+        cached = await self.get(search)
+        if cached is not None and (cached[1] or allow_stale):
+            results, fresh = cached
+            if fresh:
+                self.counters["hits"] += 1
+            else:
+                self.counters["stale"] += 1
+                await self._schedule_refresh(search, fetch)
+            return results
+
+        self.counters["misses"] += 1
+        results = await fetch()
+        await self._store(search, results)
+        return results
+
+    async def _schedule_refresh(self, search: NormalizedSearch, fetch: Fetcher) -> None:
+        key = search.key
+        if key in self._refreshing:
+            return
+        if not await self._claim_refresh(key, cabin_ttl(search.cabin)):
+            return
+        task = asyncio.create_task(self._refresh(search, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, search: NormalizedSearch, fetch: Fetcher) -> None:
+        try:
+            results = await fetch()
+            await self._store(search, results)
+            self.counters["refreshes"] += 1
+        except Exception as e:
+            self.counters["refresh_errors"] += 1
+            logger.warning("Background refresh of %s failed: %s", search.key, e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["stale"]
+        return {
+            **self.counters,
+            "hit_ratio": round((self.counters["hits"] + self.counters["stale"]) / lookups, 4) if lookups else 0.0,
+            "lru_entries": len(self._lru),
+            "refreshing": len(self._refreshing),
+        }
+
+    async def close(self) -> None:
+        """
+        Cancel in-flight background refreshes at shutdown and drop their
+        claims, so other workers can refresh those keys straight away.
+        """
+        refreshing = dict(self._refreshing)
+        for task in refreshing.values():
+            task.cancel()
+        await asyncio.gather(*refreshing.values(), return_exceptions=True)
+        self._refreshing.clear()
+        for key in refreshing:
+            await self._release_refresh(key)
+
+
+search_cache = SearchCache()
@@ -0,0 +1,164 @@
+"""
+Write-behind SearchHistory recorder
+
+Searches hand their history row to an in-process bounded queue and respond
+immediately; a background task writes the rows in multi-row INSERT batches once
+SEARCH_HISTORY_BATCH_SIZE rows are waiting or SEARCH_HISTORY_FLUSH_SECONDS have
+passed. When the queue runs hot, rows are sampled, and once it is full they are
+dropped, so a slow database never backs up into request latency. Remaining rows
+are drained at shutdown. Each batch also updates the popular-route aggregates.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.models.models import SearchHistory
+from app.services.popular_routes import apply_search_rows
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the queue above which rows are sampled instead of all kept
+HIGH_WATER = 0.75
+
+
+class SearchHistoryRecorder:
+    """Bounded queue plus one flusher task per worker."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        # Set whenever a row is queued; wakes the flusher while it collects a batch
+        self._arrived: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        # Rows taken off the queue but not yet handed to a flush
+        self._pending: List[Dict[str, Any]] = []
+        self._session_factory = None
+        self.counters = {
+            "enqueued": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "flushed": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+        self.flush_ms = {"last": 0.0, "max": 0.0, "total": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, session_factory) -> None:
+        if self._task is not None:
+            return
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=settings.SEARCH_HISTORY_QUEUE_SIZE)
+        self._arrived = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue one SearchHistory row (column -> value) without waiting. Returns
+        False when the row was sampled out or dropped because the queue is full.
+        """
+        queue = self._queue
+        if queue.qsize() >= HIGH_WATER * queue.maxsize and random.random() >= settings.SEARCH_HISTORY_OVERLOAD_SAMPLE:
+            self.counters["sampled_out"] += 1
+            return False
+        try:
+            queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            return False
+        self._arrived.set()
+        self.counters["enqueued"] += 1
+        return True
+
+    async def _fill_batch(self) -> None:
+        """Block for the first row, then collect until the batch is full or the flush interval ends."""
+        self._pending.append(await self._queue.get())
+        deadline = asyncio.get_running_loop().time() + settings.SEARCH_HISTORY_FLUSH_SECONDS
+        while True:
+            # Rows are only ever taken with get_nowait: a get() cancelled by a
+            # timeout (asyncio.wait_for) can lose the row it just dequeued
+            self._arrived.clear()
+            self._pending.extend(self._take_queued(settings.SEARCH_HISTORY_BATCH_SIZE - len(self._pending)))
+            remaining = deadline - asyncio.get_running_loop().time()
+            if len(self._pending) >= settings.SEARCH_HISTORY_BATCH_SIZE or remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _take_queued(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        limit = settings.SEARCH_HISTORY_BATCH_SIZE if limit is None else limit
+        batch = []
+        while not self._queue.empty() and len(batch) < limit:
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._fill_batch()
+            batch, self._pending = self._pending, []
+            # Shielded so a shutdown cancel never interrupts a batch mid-write
+            self._flushing = asyncio.ensure_future(self.flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def flush(self, rows: List[Dict[str, Any]]) -> None:
+        """Write ``rows`` in one multi-row INSERT; failures are logged and counted, not raised."""
+        if not rows:
+            return
+        started = time.perf_counter()
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(SearchHistory), rows)
+                # Same transaction, so route aggregates never drift from the history
+                await apply_search_rows(db, rows)
+                await db.commit()
+        except Exception as e:
+            self.counters["failed"] += len(rows)
+            logger.warning("Dropped %d search history rows: %s", len(rows), e)
+            return
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flush_ms["last"] = elapsed
+            self.flush_ms["max"] = max(self.flush_ms["max"], elapsed)
+            self.flush_ms["total"] += elapsed
+            self.counters["batches"] += 1
+        self.counters["flushed"] += len(rows)
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        batch, self._pending = self._pending, []
+        await self.flush(batch)
+        while not self._queue.empty():
+            await self.flush(self._take_queued())
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": settings.SEARCH_HISTORY_QUEUE_SIZE,
+            "flush_ms_last": round(self.flush_ms["last"], 2),
+            "flush_ms_max": round(self.flush_ms["max"], 2),
+            "flush_ms_avg": round(self.flush_ms["total"] / batches, 2) if batches else 0.0,
+        }
+
+
+search_history_recorder = SearchHistoryRecorder()
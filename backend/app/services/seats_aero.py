@@ -0,0 +1,229 @@
+"""
+Shared Seats.aero upstream client
+
+One pooled (HTTP/2-capable) httpx.AsyncClient is created per worker at
+startup and closed at shutdown, so searches reuse warm TCP+TLS connections
+instead of paying a handshake per request. Every upstream call first spends a
+token from the global seats_aero_budget (SEATS_AERO_BUDGET_PER_MINUTE, shared
+by all workers through Redis).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.rate_limit import seats_aero_budget
+
+
+class SeatsAeroError(Exception):
+    """Raised when the Seats.aero upstream fails or exceeds its time budget."""
+
+
+class SeatsAeroBudgetExceeded(SeatsAeroError):
+    """Raised instead of calling upstream when the shared call budget is spent."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Seats.aero call budget exhausted; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _mock_search_results(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Development results used while no SEATS_AERO_API_KEY is configured."""
+    cabin = params.get("cabin")
+    return [
+        {
+            "airline": "United Airlines",
+            "flight_number": "UA123",
+            "origin": params.get("origin"),
+            "destination": params.get("destination"),
+            "departure_time": "2024-03-15T08:00:00",
+            "arrival_time": "2024-03-15T12:00:00",
+            "cabin_class": cabin,
+            "points_required": 35000,
+            "cash_price": 450.00,
+            "availability": 4,
+            "aircraft": "Boeing 737-900",
+            "duration_minutes": 240,
+            "stops": 0
+        },
+        {
+            "airline": "American Airlines",
+            "flight_number": "AA456",
+            "origin": params.get("origin"),
+            "destination": params.get("destination"),
+            "departure_time": "2024-03-15T10:30:00",
+            "arrival_time": "2024-03-15T14:45:00",
+            "cabin_class": cabin,
+            "points_required": 32500,
+            "cash_price": 425.00,
+            "availability": 2,
+            "aircraft": "Airbus A321",
+            "duration_minutes": 255,
+            "stops": 0
+        },
+        {
+            "airline": "Delta Air Lines",
+            "flight_number": "DL789",
+            "origin": params.get("origin"),
+            "destination": params.get("destination"),
+            "departure_time": "2024-03-15T14:15:00",
+            "arrival_time": "2024-03-15T18:30:00",
+            "cabin_class": cabin,
+            "points_required": 40000,
+            "cash_price": 480.00,
+            "availability": 6,
+            "aircraft": "Boeing 757-200",
+            "duration_minutes": 255,
+            "stops": 0
+        }
+    ]
+
+
+def _mock_availability(flight_id: str, on_date: date, passengers: int) -> Dict[str, Any]:
+    return {
+        "flight_id": flight_id,
+        "date": on_date,
+        "available_seats": 4,
+        "cabin_class": "business",
+        "points_required": 75000,
+        "taxes_fees": 125.50
+    }
+
+
+class SeatsAeroClient:
+    """
+    Pooled async client for the Seats.aero API.
+
+    ``start()``/``close()`` are driven by the application lifespan. A custom
+    ``transport`` (e.g. ``httpx.ASGITransport``) or ``base_url`` can be passed to
+    run against a local stand-in server.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = (base_url or settings.SEATS_AERO_BASE_URL).rstrip("/")
+        self.api_key = settings.SEATS_AERO_API_KEY if api_key is None else api_key
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        """True when real upstream calls are made (an API key is configured)."""
+        return bool(self.api_key)
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            http2=settings.SEATS_AERO_HTTP2 and self._transport is None,
+            limits=httpx.Limits(
+                max_connections=settings.SEATS_AERO_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SEATS_AERO_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SEATS_AERO_KEEPALIVE_EXPIRY,
+            ),
+            timeout=self._timeout(settings.SEATS_AERO_TIMEOUT),
+            transport=self._transport,
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("SeatsAeroClient is not started; call start() during app startup")
+        return self._client
+
+    @staticmethod
+    def _timeout(budget: float) -> httpx.Timeout:
+        return httpx.Timeout(
+            budget,
+            connect=min(settings.SEATS_AERO_CONNECT_TIMEOUT, budget),
+            pool=min(settings.SEATS_AERO_POOL_TIMEOUT, budget),
+        )
+
+    async def _request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        budget = timeout if timeout is not None else settings.SEATS_AERO_TIMEOUT
+        # Label by the first path segment ("search", "availability") rather than the full path
+        operation = path.split("/", 2)[1]
+        retry_after = await seats_aero_budget.take("global")
+        if retry_after:
+            metrics.seats_aero_request_duration.observe(0.0, operation, "over_budget")
+            raise SeatsAeroBudgetExceeded(retry_after)
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            # httpx timeouts apply per network operation; wait_for enforces the total budget
+            response = await asyncio.wait_for(
+                self.client.request(method, path, timeout=self._timeout(budget), **kwargs),
+                timeout=budget,
+            )
+            response.raise_for_status()
+            payload = response.json()
+            outcome = "ok"
+            return payload
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise SeatsAeroError(f"Seats.aero {method} {path} exceeded {budget:.1f}s budget")
+        except httpx.HTTPStatusError as e:
+            outcome = "http_error"
+            raise SeatsAeroError(f"Seats.aero {method} {path} returned {e.response.status_code}")
+        except (httpx.HTTPError, ValueError) as e:
+            raise SeatsAeroError(f"Seats.aero {method} {path} failed: {e}")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.seats_aero_request_duration.observe(time.perf_counter() - started, operation, outcome)
+
+    async def search(self, params: Dict[str, Any], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Run an award search; ``params`` is already in Seats.aero format."""
+        if not self.enabled:
+            return _mock_search_results(params)
+        payload = await self._request("POST", "/search", json=params, timeout=timeout)
+        if isinstance(payload, dict):
+            return payload.get("data", [])
+        return payload
+
+    async def availability(
+        self,
+        flight_id: str,
+        on_date: date,
+        passengers: int = 1,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Check real-time availability for a single flight."""
+        if not self.enabled:
+            return _mock_availability(flight_id, on_date, passengers)
+        return await self._request(
+            "GET",
+            f"/availability/{flight_id}",
+            params={"date": on_date.isoformat(), "passengers": passengers},
+            timeout=timeout,
+        )
+
+
+# Process-wide client, started and closed by the app lifespan in app.main
+seats_aero_client = SeatsAeroClient()
+
+
+def get_seats_aero_client() -> SeatsAeroClient:
+    """FastAPI dependency returning the shared client (override in tests)."""
+    return seats_aero_client
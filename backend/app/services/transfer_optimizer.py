@@ -0,0 +1,229 @@
+"""
+Cheapest way to fund award results from transferable bank points
+
+The LoyaltyProgram catalog (transfer_partners, transfer_ratio) is loaded into
+a program x funding-source matrix: for every program, the sources that can
+pay for it sorted best ratio first, with the miles one source point buys.
+Sources are the bank currencies (Chase, Amex, ...) plus each program's own
+miles at 1:1, so a balance held directly in the program is used before
+transferring. The matrix is rebuilt only when the catalog is reloaded.
+
+For a set of results and one user's balances, funding is computed in a
+handful of array operations: every result's row is gathered from the matrix,
+the user's usable balance per source (whole transfer increments) becomes the
+miles each source can supply, and cumulative sums along the row give how many
+miles each source covers when the best ratios are drained first. That is the
+fewest transferable points for the redemption. Results at the same price in
+the same program are planned once, so the cost per search stays flat as
+result sets grow into the tens of thousands.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.models import LoyaltyProgram
+from app.services.search_cache import canonical_program
+
+logger = logging.getLogger(__name__)
+
+# Bank points move in blocks of this size; a program's own miles in single points
+TRANSFER_INCREMENT = 1000
+
+CURRENCY_ALIASES = {
+    "chase": "chase",
+    "ultimaterewards": "chase",
+    "chaseultimaterewards": "chase",
+    "amex": "amex",
+    "membershiprewards": "amex",
+    "amexmembershiprewards": "amex",
+    "americanexpress": "amex",
+    "americanexpressmembershiprewards": "amex",
+    "citi": "citi",
+    "thankyou": "citi",
+    "thankyoupoints": "citi",
+    "citithankyou": "citi",
+    "citithankyoupoints": "citi",
+    "capitalone": "capitalone",
+    "capitalonemiles": "capitalone",
+    "venture": "capitalone",
+    "bilt": "bilt",
+    "biltrewards": "bilt",
+    "marriott": "marriott",
+    "marriottbonvoy": "marriott",
+    "bonvoy": "marriott",
+}
+
+
+def canonical_currency(name: str) -> Optional[str]:
+    """Canonical bank currency, e.g. 'Chase Ultimate Rewards' -> 'chase', or None if unknown."""
+    return CURRENCY_ALIASES.get(re.sub(r"[^a-z0-9]", "", (name or "").lower()))
+
+
+def partner_ratios(transfer_partners: Any, transfer_ratio: Optional[float]) -> Dict[str, float]:
+    """
+    Currencies that transfer into one program and the miles per currency
+    point. transfer_partners is a list of currency names (all at
+    transfer_ratio) or a mapping of currency name to its own ratio.
+    """
+    if isinstance(transfer_partners, dict):
+        pairs = transfer_partners.items()
+    else:
+        pairs = ((name, transfer_ratio) for name in transfer_partners or ())
+    ratios = {}
+    for name, ratio in pairs:
+        currency = canonical_currency(name)
+        if currency is None:
+            logger.debug("Unknown transfer partner %r", name)
+            continue
+        ratio = 1.0 if ratio is None else float(ratio)
+        if ratio > 0:
+            ratios[currency] = max(ratio, ratios.get(currency, 0.0))
+    return ratios
+
+
+class Matrix(NamedTuple):
+    programs: Dict[str, int]         # program code -> row; row len(programs) funds nothing
+    sources: List[str]               # currencies, then programs; the last column is empty padding
+    source_index: Dict[str, int]
+    order: np.ndarray                # (rows, width) source column per program, best ratio first
+    ratios: np.ndarray               # (rows, width) miles per source point, 0 for padding
+    increments: np.ndarray           # (sources,) transfer increment per source
+
+
+def build_matrix(catalog: Mapping[str, Dict[str, float]]) -> Matrix:
+    """Matrix from program code -> {currency: ratio}."""
+    programs = sorted(catalog)
+    currencies = sorted({c for ratios in catalog.values() for c in ratios})
+    sources = currencies + programs + [""]
+    source_index = {name: i for i, name in enumerate(sources[:-1])}
+    pad = len(sources) - 1
+
+    rows = []
+    for program in programs:
+        # The program's own miles first among equal ratios: no transfer needed
+        row = [(1.0, 1, source_index[program])]
+        row += [(ratio, 0, source_index[c]) for c, ratio in catalog[program].items()]
+        rows.append(sorted(row, reverse=True))
+    width = max((len(row) for row in rows), default=1)
+    order = np.full((len(programs) + 1, width), pad, dtype=np.intp)
+    ratios = np.zeros((len(programs) + 1, width))
+    for i, row in enumerate(rows):
+        order[i, :len(row)] = [column for _, _, column in row]
+        ratios[i, :len(row)] = [ratio for ratio, _, _ in row]
+    increments = np.array([TRANSFER_INCREMENT] * len(currencies) + [1] * (len(programs) + 1), dtype=float)
+    return Matrix({p: i for i, p in enumerate(programs)}, sources, source_index, order, ratios, increments)
+
+
+class TransferOptimizer:
+    """Funding plans for award results against the loaded transfer matrix."""
+
+    def __init__(self):
+        self.matrix = build_matrix({})
+        self.loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def load(self, db) -> None:
+        catalog = {}
+        rows = await db.execute(
+            select(LoyaltyProgram.code, LoyaltyProgram.transfer_partners, LoyaltyProgram.transfer_ratio)
+            .where(LoyaltyProgram.code.isnot(None))
+        )
+        for code, partners, ratio in rows:
+            catalog[canonical_program(code)] = partner_ratios(partners, ratio)
+        # One assignment so readers see a complete matrix
+        self.matrix = build_matrix(catalog)
+        self.loaded_at = time.monotonic()
+        logger.info("Transfer matrix loaded: %d programs, %d currencies",
+                    len(catalog), len(self.matrix.sources) - len(catalog) - 1)
+
+    def _balances(self, balances: Mapping[str, int]) -> np.ndarray:
+        matrix = self.matrix
+        vector = np.zeros(len(matrix.sources))
+        for name, amount in balances.items():
+            column = matrix.source_index.get(canonical_currency(name) or canonical_program(name))
+            if column is not None:
+                vector[column] += max(int(amount), 0)
+        return vector
+
+    def plan(self, points: Sequence[int], programs: Sequence[Optional[str]],
+             balances: Mapping[str, int]) -> List[Dict[str, Any]]:
+        """
+        Funding for each result (``points`` miles in ``programs[i]``): the
+        transferable points spent, each transfer, and the miles still missing
+        when the balances cannot cover it. Results with the same program and
+        price share one plan dict, so treat the plans as read-only.
+        """
+        matrix = self.matrix
+        count = len(points)
+        if count == 0:
+            return []
+        unknown = len(matrix.programs)
+        rows = np.fromiter((matrix.programs.get(p, unknown) for p in programs), dtype=np.int64, count=count)
+        # Award prices cluster on a few levels per program, so plan each (program, price) once
+        keys, inverse = np.unique((rows << 32) | np.asarray(points, dtype=np.int64), return_inverse=True)
+        rows = (keys >> 32).astype(np.intp)
+        need = (keys & 0xFFFFFFFF).astype(float)
+
+        # Miles each source can supply to each program, draining whole increments
+        increments = matrix.increments
+        usable = np.floor(self._balances(balances) / increments) * increments
+        capacity = (usable[matrix.order] * matrix.ratios)[rows]
+
+        covered_before = np.cumsum(capacity, axis=1) - capacity
+        miles = np.clip(need[:, None] - covered_before, 0.0, capacity)
+        columns = matrix.order[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_increment = np.ceil(np.round(miles / matrix.ratios[rows] / increments[columns], 6))
+        spent = np.where(miles > 0, per_increment * increments[columns], 0.0)
+        shortfall = np.maximum(need - miles.sum(axis=1), 0.0)
+
+        plans = [
+            {"points": points_spent, "covered": missing == 0, "shortfall": missing, "transfers": []}
+            for points_spent, missing in zip(spent.sum(axis=1).astype(np.int64).tolist(),
+                                             np.ceil(np.round(shortfall, 6)).astype(np.int64).tolist())
+        ]
+        plan_idx, step_idx = np.nonzero(miles > 0)
+        sources = matrix.sources
+        for i, column, step_points, step_miles in zip(
+            plan_idx.tolist(), columns[plan_idx, step_idx].tolist(),
+            spent[plan_idx, step_idx].astype(np.int64).tolist(),
+            np.ceil(miles[plan_idx, step_idx]).astype(np.int64).tolist(),
+        ):
+            plans[i]["transfers"].append({"source": sources[column], "points": step_points, "miles": step_miles})
+        return [plans[i] for i in inverse.tolist()]
+
+    def annotate(self, results: List[Dict[str, Any]], balances: Mapping[str, int]) -> List[Dict[str, Any]]:
+        """Set ``funding`` on each result dict (tagged with loyalty_program) in place."""
+        plans = self.plan([r["points_required"] for r in results], [r.get("loyalty_program") for r in results], balances)
+        for r, funding in zip(results, plans):
+            r["funding"] = funding
+        return results
+
+    def start_refresh(self, session_factory, interval: float) -> None:
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    async with session_factory() as db:
+                        await self.load(db)
+                except Exception as e:
+                    logger.warning("Transfer matrix refresh failed: %s", e)
+
+        if self._refresh_task is None and interval > 0:
+            self._refresh_task = asyncio.create_task(refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+transfer_optimizer = TransferOptimizer()
@@ -0,0 +1,194 @@
+"""
+Authenticated-user snapshot cache
+
+get_current_user resolves a token's user id to an immutable CurrentUser
+snapshot, cached per worker for USER_CACHE_TTL_SECONDS, so repeat
+authenticated requests make no database round trip. Committed ORM changes to
+a User (or a bulk UPDATE/DELETE on users) invalidate the affected entries in
+this worker at once and are published on a Redis channel, so every other
+worker drops them too (a deactivated user is locked out everywhere, not after
+the TTL). A worker whose subscription drops clears its cache when it
+resubscribes, since it may have missed messages. Only while Redis is
+unreachable do other workers fall back to the TTL.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis, mark_redis_failure
+from app.models.models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Invalidation messages: comma-separated user ids, or "*" for every user
+CHANNEL = "user_cache:invalidate"
+
+
+class CurrentUser(NamedTuple):
+    """The User fields endpoints read, detached from any session."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    avatar_url: Optional[str]
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(*(getattr(user, field) for field in cls._fields))
+
+
+class UserCache:
+    """TTL-bounded LRU of user id -> CurrentUser."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[float, CurrentUser]]" = OrderedDict()
+        # Bumped on every invalidation, so a lookup that raced one is not cached
+        self.generation = 0
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0, "published": 0, "received": 0}
+        self._listener: Optional[asyncio.Task] = None
+        self._publishing: Set[asyncio.Task] = set()
+
+    def get(self, user_id: int) -> Optional[CurrentUser]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.counters["hits"] += 1
+        return entry[1]
+
+    def set(self, user: CurrentUser, generation: Optional[int] = None) -> None:
+        """Cache a snapshot, unless an invalidation arrived since ``generation`` was read."""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[user.id] = (time.monotonic() + settings.USER_CACHE_TTL_SECONDS, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self.generation += 1
+        if self._entries.pop(user_id, None) is not None:
+            self.counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.counters["invalidations"] += len(self._entries)
+        self._entries.clear()
+
+    # -- cross-worker invalidation ---------------------------------------------
+
+    def publish(self, user_ids: Iterable[int], clear: bool = False) -> None:
+        """Tell the other workers to drop these users (or everyone); fire and forget."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        redis = get_redis()
+        if redis is None:
+            return
+        message = "*" if clear else ",".join(map(str, user_ids))
+
+        async def send():
+            try:
+                await redis.publish(CHANNEL, message)
+                self.counters["published"] += 1
+            except RedisError as e:
+                mark_redis_failure(e)
+
+        task = loop.create_task(send())
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    def _apply(self, message: bytes) -> None:
+        self.counters["received"] += 1
+        if message == b"*":
+            self.clear()
+            return
+        for user_id in message.split(b","):
+            self.invalidate(int(user_id))
+
+    def start_listener(self) -> None:
+        async def listen():
+            while True:
+                if not settings.REDIS_URL:
+                    return
+                # Own connection without a read timeout: it idles until a message arrives
+                redis = Redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT)
+                try:
+                    async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                        await pubsub.subscribe(CHANNEL)
+                        # Messages sent while unsubscribed are lost
+                        self.clear()
+                        async for message in pubsub.listen():
+                            self._apply(message["data"])
+                except (RedisError, OSError) as e:
+                    logger.warning("User cache invalidation channel lost: %s", e)
+                finally:
+                    await redis.aclose()
+                await asyncio.sleep(settings.REDIS_RETRY_AFTER)
+
+        if self._listener is None and settings.USER_CACHE_ENABLED:
+            self._listener = asyncio.create_task(listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await asyncio.gather(*self._publishing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "size": len(self._entries), "subscribed": self._listener is not None}
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    changed = {obj.id for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("user_cache_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    # Bulk statements do not say which rows they touch
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None and orm_execute_state.bind_mapper.class_ is User:
+        orm_execute_state.session.info["user_cache_clear"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session):
+    clear = session.info.pop("user_cache_clear", False)
+    user_ids = session.info.pop("user_cache_ids", ())
+    if clear:
+        user_cache.clear()
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    if clear or user_ids:
+        user_cache.publish(user_ids, clear=clear)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("user_cache_ids", None)
+    session.info.pop("user_cache_clear", None)
@@ -0,0 +1,158 @@
+"""
+Celery worker for background jobs (saved-search alerts, price history compaction,
+popular routes pruning)
+
+    celery -A app.worker worker --beat --loglevel=info
+
+Beat schedules evaluate_saved_search_alerts every ALERT_EVALUATION_SECONDS.
+Evaluation enqueues deliver_alert_notifications tasks in batches of
+ALERT_NOTIFY_BATCH, one email per user per batch. compact_availability_history
+runs every AVAILABILITY_COMPACT_SECONDS and prune_popular_routes every
+POPULAR_ROUTES_PRUNE_SECONDS.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from html import escape
+from typing import Any, Dict, List
+
+import resend
+from celery import Celery
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.database import create_engine_for
+from app.core.redis import close_redis
+from app.services.alerts import evaluate_alerts
+from app.services.availability_history import compact
+from app.services.popular_routes import prune_stats
+from app.services.search_cache import search_cache
+from app.services.seats_aero import SeatsAeroClient
+
+logger = logging.getLogger(__name__)
+
+broker_url = settings.CELERY_BROKER_URL or settings.REDIS_URL
+celery_app = Celery("aeropoints", broker=broker_url)
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    timezone="UTC",
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "evaluate-saved-search-alerts": {
+            "task": "alerts.evaluate",
+            "schedule": float(settings.ALERT_EVALUATION_SECONDS),
+            # A run that is still queued when the next one is due is dropped
+            "options": {"expires": settings.ALERT_EVALUATION_SECONDS},
+        },
+        "compact-availability-history": {
+            "task": "availability.compact",
+            "schedule": float(settings.AVAILABILITY_COMPACT_SECONDS),
+            "options": {"expires": settings.AVAILABILITY_COMPACT_SECONDS},
+        },
+        "prune-popular-routes": {
+            "task": "popular_routes.prune",
+            "schedule": float(settings.POPULAR_ROUTES_PRUNE_SECONDS),
+            "options": {"expires": settings.POPULAR_ROUTES_PRUNE_SECONDS},
+        },
+    },
+)
+
+
+async def _evaluate() -> Dict[str, Any]:
+    # Each task runs in a fresh event loop, so nothing pooled is reused across runs
+    engine = create_engine_for(settings.DATABASE_URL, poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    client = SeatsAeroClient()
+    await client.start()
+    try:
+        return await evaluate_alerts(session_factory, client, deliver_alert_notifications.delay)
+    finally:
+        await client.close()
+        await search_cache.close()
+        await close_redis()
+        await engine.dispose()
+
+
+@celery_app.task(name="alerts.evaluate")
+def evaluate_saved_search_alerts() -> Dict[str, Any]:
+    stats = asyncio.run(_evaluate())
+    logger.info("Alert evaluation: %s", stats)
+    return stats
+
+
+async def _compact() -> Dict[str, int]:
+    engine = create_engine_for(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine) as db:
+            return await compact(db)
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="availability.compact")
+def compact_availability_history() -> Dict[str, int]:
+    stats = asyncio.run(_compact())
+    logger.info("Availability history compaction: %s", stats)
+    return stats
+
+
+async def _prune_popular_routes() -> int:
+    engine = create_engine_for(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine) as db:
+            return await prune_stats(db)
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="popular_routes.prune")
+def prune_popular_routes() -> int:
+    deleted = asyncio.run(_prune_popular_routes())
+    logger.info("Popular routes pruning: %d expired buckets deleted", deleted)
+    return deleted
+
+
+def _alert_line(n: Dict[str, Any]) -> str:
+    # Route, date and program come from user-saved searches: escape them
+    origin, destination, departure_date, cabin_class, program = (
+        escape(str(n[field])) for field in ("origin", "destination", "departure_date", "cabin_class", "loyalty_program")
+    )
+    return (
+        f"<li>{origin} &rarr; {destination} on {departure_date} ({cabin_class}, "
+        f"{program}): {n['points_required']:,} points "
+        f"(your alert: {n['threshold_points']:,})</li>"
+    )
+
+
+@celery_app.task(name="alerts.deliver", bind=True, max_retries=5)
+def deliver_alert_notifications(self, notifications: List[Dict[str, Any]]) -> int:
+    """Send one email per user covering all of their alerts in this batch."""
+    by_email = defaultdict(list)
+    for n in notifications:
+        by_email[n["email"]].append(n)
+
+    if not settings.RESEND_API_KEY:
+        for email, alerts in by_email.items():
+            logger.info("Alert email for %s skipped (RESEND_API_KEY not set): %d alerts", email, len(alerts))
+        return len(by_email)
+
+    resend.api_key = settings.RESEND_API_KEY
+    failed = []
+    for email, alerts in by_email.items():
+        try:
+            resend.Emails.send({
+                "from": settings.EMAIL_FROM,
+                "to": [email],
+                "subject": f"{len(alerts)} award price alert{'s' if len(alerts) > 1 else ''} triggered",
+                "html": "<ul>" + "".join(_alert_line(n) for n in alerts) + "</ul>",
+            })
+        except Exception as e:
+            logger.warning("Alert email to %s failed: %s", email, e)
+            failed.extend(alerts)
+    if failed:
+        # Retry only the users whose email failed
+        raise self.retry(args=[failed], countdown=2 ** self.request.retries * 30)
+    return len(by_email)
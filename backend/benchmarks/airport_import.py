@@ -0,0 +1,99 @@
+"""
+Airport CSV import benchmark: full reload time and peak memory by file size
+
+Writes OurAirports-style airports.csv files of each --sizes row count (about
+a third of rows carry an IATA code, with duplicates, closed airports and
+heliports mixed in, like the real file's ~80k rows), then imports each one
+twice with app.services.airport_import: into an empty table and as a
+reload over the previous import with --prune. Peak Python memory is measured
+with tracemalloc on a third, untimed reload (tracing slows the import several
+times over) and should not grow with file size.
+
+Uses a separate SQLite file by default; pass --database-url for PostgreSQL
+(COPY path).
+
+    python -m benchmarks.airport_import --sizes 80000 800000
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+
+from app.core.database import Base, create_engine_for
+from app.models.models import Airport
+from app.services.airport_import import import_file
+
+TYPES = ["large_airport", "medium_airport", "small_airport", "small_airport", "small_airport",
+         "heliport", "closed", "seaplane_base"]
+HEADER = ["id", "ident", "type", "name", "latitude_deg", "longitude_deg", "elevation_ft", "continent",
+          "iso_country", "iso_region", "municipality", "scheduled_service", "gps_code", "iata_code",
+          "local_code", "home_link", "wikipedia_link", "keywords"]
+
+
+def write_csv(path: str, rows: int, rng: random.Random) -> None:
+    codes = ["".join(c) for c in itertools.product(string.ascii_uppercase, repeat=3)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            kind = rng.choice(TYPES)
+            city = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))).title()
+            ident = "".join(rng.choices(string.ascii_uppercase, k=4))
+            writer.writerow([
+                i, ident, kind, f"{city} {rng.choice(['International', 'Regional', 'Municipal'])} Airport",
+                round(rng.uniform(-60, 70), 6), round(rng.uniform(-180, 180), 6), rng.randint(0, 9000),
+                "EU", rng.choice(["US", "GB", "FR", "BR", "JP"]), "XX-01", f"{city} São",
+                rng.choice(["yes", "no"]), ident, rng.choice(codes) if rng.random() < 0.35 else "",
+                "", "", "", "",
+            ])
+
+
+async def reset(database_url: str) -> None:
+    engine = create_engine_for(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Airport.__table__])
+        await conn.execute(Airport.__table__.delete())
+    await engine.dispose()
+
+
+def timed_import(database_url: str, path: str, prune: bool):
+    started = time.perf_counter()
+    stats = asyncio.run(import_file(database_url, path, prune=prune))
+    return stats, time.perf_counter() - started
+
+
+def peak_memory(database_url: str, path: str) -> int:
+    tracemalloc.start()
+    asyncio.run(import_file(database_url, path, prune=True))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    print(f"{'rows':>9}  {'file MiB':>8}  {'run':<14}{'seconds':>8}  {'rows/s':>9}  stats")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"airports_{size}.csv")
+            write_csv(path, size, rng)
+            asyncio.run(reset(args.database_url))
+            for label, prune in (("empty table", False), ("reload+prune", True)):
+                stats, elapsed = timed_import(args.database_url, path, prune)
+                print(f"{size:>9,}  {os.path.getsize(path) / 2**20:8.1f}  {label:<14}{elapsed:8.2f}  "
+                      f"{size / elapsed:9,.0f}  {stats}")
+            print(f"{size:>9,}  {'':8}  {'peak memory':<14}{peak_memory(args.database_url, path) / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_airports.db")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[80_000, 800_000])
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
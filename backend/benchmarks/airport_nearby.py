@@ -0,0 +1,89 @@
+"""
+Nearest-airport benchmark: KD-tree vs brute-force haversine
+
+Brute force mirrors the Node /api/airports/nearby handler (distance to every
+airport, then a full sort). Points are clustered around synthetic "regions"
+like real airports. Results are checked against brute force.
+
+    python -m benchmarks.airport_nearby --sizes 28000 100000 --queries 500
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.airport_geo import AirportGeoIndex, haversine_km
+
+
+def synthetic_rows(n: int, rng: np.random.Generator):
+    centers_lat = rng.uniform(-60, 70, 200)
+    centers_lon = rng.uniform(-180, 180, 200)
+    which = rng.integers(0, 200, n)
+    lat = np.clip(centers_lat[which] + rng.normal(0, 4, n), -89.9, 89.9)
+    lon = (centers_lon[which] + rng.normal(0, 6, n) + 180) % 360 - 180
+    return [
+        SimpleNamespace(
+            iata_code=f"{i:05d}", name=f"Airport {i}", city="City", country="Country",
+            latitude=float(lat[i]), longitude=float(lon[i]),
+            is_major_hub=i % 50 == 0, has_lounge=i % 7 == 0,
+        )
+        for i in range(n)
+    ]
+
+
+def brute_force(lats, lons, codes, lat, lon, radius_km=None, k=None):
+    d = haversine_km(lat, lon, lats, lons)
+    order = np.argsort(d)
+    if radius_km is not None:
+        order = order[d[order] <= radius_km]
+    if k is not None:
+        order = order[:k]
+    return [codes[i] for i in order]
+
+
+def timed(fn, queries):
+    started = time.perf_counter()
+    out = [fn(q) for q in queries]
+    return (time.perf_counter() - started) / len(queries) * 1e6, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[28000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    for n in args.sizes:
+        rows = synthetic_rows(n, rng)
+        lats = np.radians([r.latitude for r in rows])
+        lons = np.radians([r.longitude for r in rows])
+        codes = [r.iata_code for r in rows]
+
+        index = AirportGeoIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        picks = rng.integers(0, n, args.queries)
+        queries = [(rows[i].latitude + rng.normal(0, 0.5), rows[i].longitude + rng.normal(0, 0.5)) for i in picks]
+
+        print(f"\n{n:,} airports (tree build {build_ms:.0f} ms)")
+        print(f"{'query':<28}{'brute force':>14}{'kd-tree':>12}{'speedup':>10}")
+        for label, kwargs in [
+            ("k=10", {"k": 10}),
+            ("radius 150 km", {"radius_km": 150}),
+            ("radius 500 km, k=20", {"radius_km": 500, "k": 20}),
+        ]:
+            brute_us, expected = timed(lambda q: brute_force(lats, lons, codes, *q, **kwargs), queries)
+            tree_us, got = timed(lambda q: [a["iata_code"] for a in index.nearby(*q, **kwargs)], queries)
+            mismatches = sum(set(a) != set(b) for a, b in zip(expected, got))
+            print(f"{label:<28}{brute_us:>11.0f} us{tree_us:>9.0f} us{brute_us / tree_us:>9.1f}x"
+                  + (f"  ({mismatches} mismatches)" if mismatches else ""))
+        hub_us, _ = timed(lambda q: index.nearby(*q, k=5, major_hub=True), queries)
+        print(f"{'k=5 major hubs':<28}{'':>14}{hub_us:>9.0f} us")
+
+
+if __name__ == "__main__":
+    main()
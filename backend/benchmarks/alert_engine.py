@@ -0,0 +1,153 @@
+"""
+Saved-search alert evaluation throughput
+
+Seeds a SQLite database with saved searches whose queries follow a skewed
+(Zipf-like) popularity, as real watch lists do, and evaluates them against an
+in-process Seats.aero stand-in with a fixed per-call latency:
+
+* per-search: the naive loop, one upstream call per saved search
+* grouped:    app.services.alerts.evaluate_alerts (one call per distinct search)
+
+Reports saved searches evaluated per second and upstream calls per 1,000
+alerts. The result cache is disabled so only grouping is measured.
+
+    python -m benchmarks.alert_engine --alerts 20000 --queries 1500 --latency-ms 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base, create_engine_for
+from app.models.models import CabinClass, SavedSearch, User
+from app.services.alerts import evaluate_alerts
+from app.services.seats_aero import SeatsAeroClient
+from benchmarks.fake_seats_aero import build_results
+
+ROUTES = [("JFK", "LHR"), ("LAX", "NRT"), ("SFO", "CDG"), ("ORD", "FRA"), ("BOS", "DUB"), ("SEA", "ICN"),
+          ("MIA", "MAD"), ("IAD", "ZRH"), ("DFW", "SYD"), ("EWR", "SIN"), ("ATL", "AMS"), ("DEN", "HND")]
+PROGRAMS = ["united", "american", "delta", "aeroplan", "alaska", "flyingblue"]
+
+
+def build_upstream(latency_ms: float):
+    counter = {"calls": 0}
+    app = FastAPI()
+
+    @app.post("/search")
+    async def search(params: dict):
+        counter["calls"] += 1
+        await asyncio.sleep(latency_ms / 1000)
+        return {"data": build_results(params)}
+
+    return app, counter
+
+
+def query_catalog(count: int, rng: random.Random):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    catalog = set()
+    while len(catalog) < count:
+        origin, destination = rng.choice(ROUTES)
+        catalog.add((
+            origin, destination, today + timedelta(days=rng.randint(7, 300)),
+            rng.choice(list(CabinClass)), rng.choice(PROGRAMS),
+        ))
+    return list(catalog)
+
+
+async def seed(session_factory, alerts: int, queries: int, rng: random.Random):
+    catalog = query_catalog(queries, rng)
+    # Zipf-like popularity: the k-th query is watched ~1/k as often as the first
+    weights = [1 / (k + 1) for k in range(len(catalog))]
+    users = max(alerts // 5, 1)
+    async with session_factory() as db:
+        await db.execute(insert(User), [{"id": i + 1, "email": f"user{i}@example.com", "is_active": True} for i in range(users)])
+        rows = []
+        for i, (origin, destination, day, cabin, program) in enumerate(rng.choices(catalog, weights, k=alerts)):
+            rows.append({
+                "user_id": i % users + 1,
+                "name": f"watch {i}",
+                # Mixed spellings still group: the normalized search is the key
+                "origin": origin.lower() if i % 3 == 0 else origin,
+                "destination": destination,
+                "departure_date": day,
+                "cabin_class": cabin,
+                "passengers": 1,
+                "loyalty_program": program,
+                "alert_enabled": True,
+                "alert_threshold_points": rng.randrange(20000, 80000, 500),
+            })
+        await db.execute(insert(SavedSearch), rows)
+        await db.commit()
+
+
+async def per_search(session_factory, client: SeatsAeroClient, concurrency: int) -> int:
+    """Baseline: every saved search makes its own upstream call."""
+    async with session_factory() as db:
+        saved = (await db.execute(select(SavedSearch).where(SavedSearch.alert_enabled.is_(True)))).scalars().all()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(s: SavedSearch) -> bool:
+        async with semaphore:
+            results = await client.search({
+                "origin": s.origin.upper(), "destination": s.destination.upper(),
+                "departureDate": s.departure_date.date().isoformat(), "cabin": s.cabin_class.value,
+                "passengers": s.passengers, "program": s.loyalty_program,
+            })
+        return min(r["points_required"] for r in results) <= s.alert_threshold_points
+
+    return sum(await asyncio.gather(*(check(s) for s in saved)))
+
+
+async def main(args):
+    settings.SEARCH_CACHE_ENABLED = False
+    settings.ALERT_CONCURRENCY = args.concurrency
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine_for(f"sqlite:///{os.path.join(tmp, 'alerts.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await seed(session_factory, args.alerts, args.queries, rng)
+
+        upstream, counter = build_upstream(args.latency_ms)
+        client = SeatsAeroClient(base_url="http://fake", api_key="bench", transport=httpx.ASGITransport(app=upstream))
+        await client.start()
+
+        print(f"{args.alerts:,} saved searches over {args.queries:,} distinct queries, "
+              f"{args.latency_ms:g} ms upstream latency, concurrency {args.concurrency}\n")
+        print(f"{'':<12}{'seconds':>10}{'searches/s':>14}{'upstream calls':>16}{'calls/1k alerts':>17}{'notified':>10}")
+
+        started = time.perf_counter()
+        notified = await per_search(session_factory, client, args.concurrency)
+        elapsed = time.perf_counter() - started
+        calls, counter["calls"] = counter["calls"], 0
+        print(f"{'per-search':<12}{elapsed:>10.2f}{args.alerts / elapsed:>14,.0f}{calls:>16,}"
+              f"{calls / args.alerts * 1000:>17,.0f}{notified:>10,}")
+
+        notifications = []
+        stats = await evaluate_alerts(session_factory, client, notifications.extend)
+        calls = counter["calls"]
+        print(f"{'grouped':<12}{stats['elapsed_seconds']:>10.2f}{stats['saved_searches_per_second']:>14,.0f}{calls:>16,}"
+              f"{calls / args.alerts * 1000:>17,.0f}{len(notifications):>10,}")
+
+        await client.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--alerts", type=int, default=20000, help="enabled saved searches")
+    parser.add_argument("--queries", type=int, default=1500, help="distinct searches they are drawn from")
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
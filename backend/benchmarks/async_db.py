@@ -0,0 +1,149 @@
+"""
+Sync vs async database layer throughput
+
+Serves an authenticated request (token -> user lookup) against a SQLite
+database whose every query is slowed by SLOW_DB_MS (a stand-in for a remote
+Postgres round trip), and reports requests/second:
+
+* before: the previous pattern, a sync Session queried inside ``async def``
+* after:  the real app (``GET /api/v1/users/profile``) on AsyncSession, with
+  the authenticated-user cache off and then on
+
+    python -m benchmarks.async_db --requests 200 --concurrency 50 --slow-ms 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.endpoints.auth import create_access_token, oauth2_scheme, verify_token
+from app.core.config import settings
+from app.core.database import create_engine_for, get_db
+from app.core.middleware import RateLimitMiddleware
+from app.main import app as real_app
+from app.models.models import Base, User
+
+
+def slow_db_function(slow_ms: int):
+    """SQLite function that sleeps inside the driver, like a slow server would."""
+    def slow_db(_):
+        time.sleep(slow_ms / 1000)
+        return 1
+    return slow_db
+
+
+def install_slow_db(sync_engine, slow_ms: int) -> None:
+    @event.listens_for(sync_engine, "connect")
+    def _register(dbapi_connection, _):
+        dbapi_connection.create_function("slow_db", 1, slow_db_function(slow_ms))
+
+    @event.listens_for(sync_engine, "before_cursor_execute", retval=True)
+    def _slow(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statement = f"SELECT * FROM ({statement}) WHERE slow_db(1)"
+        return statement, parameters
+
+
+def build_sync_app(db_url: str, slow_ms: int, pool_size: int) -> FastAPI:
+    """Replica of the pre-async endpoint: blocking Session inside async def."""
+    # Pool sized to the concurrency: a blocking checkout wait on the event loop
+    # would otherwise deadlock against the sessions it is waiting for
+    engine = create_engine(db_url, pool_size=pool_size, connect_args={"check_same_thread": False})
+    install_slow_db(engine, slow_ms)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/api/v1/users/profile")
+    async def profile(token: str = Depends(oauth2_scheme), db: Session = Depends(get_sync_db)):
+        token_data = verify_token(token, HTTPException(status_code=401))
+        user = db.query(User).filter(User.id == int(token_data.user_id)).first()
+        return {"id": user.id, "email": user.email}
+
+    return app
+
+
+def build_async_app(db_url: str, slow_ms: int):
+    engine = create_engine_for(db_url)
+    install_slow_db(engine.sync_engine, slow_ms)
+    SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def get_async_db():
+        async with SessionLocal() as db:
+            yield db
+
+    real_app.dependency_overrides[get_db] = get_async_db
+    # The API rate limit covers every route and all requests here come from one client
+    real_app.user_middleware = [m for m in real_app.user_middleware if m.cls is not RateLimitMiddleware]
+    return real_app, engine
+
+
+async def measure(app: FastAPI, token: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get("/api/v1/users/profile", headers=headers)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+
+def seed(db_url: str) -> None:
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(email="bench@aeropoints.com", full_name="Bench User"))
+        db.commit()
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--slow-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db_url = f"sqlite:///{path}"
+    seed(db_url)
+    token = create_access_token({"sub": "1"})
+
+    before = asyncio.run(measure(build_sync_app(db_url, args.slow_ms, args.concurrency), token, args.requests, args.concurrency))
+
+    async def run_after(user_cache: bool) -> float:
+        settings.USER_CACHE_ENABLED = user_cache
+        app, engine = build_async_app(db_url, args.slow_ms)
+        try:
+            return await measure(app, token, args.requests, args.concurrency)
+        finally:
+            await engine.dispose()
+
+    after = asyncio.run(run_after(False))
+    cached = asyncio.run(run_after(True))
+    print(f"slow DB stand-in: {args.slow_ms} ms/query, {args.requests} requests @ concurrency {args.concurrency}")
+    print(f"before (sync Session in async def): {before:8.1f} req/s")
+    print(f"after  (AsyncSession):              {after:8.1f} req/s  ({after / before:.1f}x)")
+    print(f"after  (AsyncSession + user cache): {cached:8.1f} req/s  ({cached / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Price history store at 100M observations: storage, compaction and query time
+
+Generates --observations award prices spread evenly over --series series
+(hub routes x cabins x programs) and --days days, folds each day into
+per-series summaries exactly as the recorder does, writes them as partial
+availability_snapshots rows, then runs the compaction that merges them and
+downsamples days past AVAILABILITY_DAILY_RETENTION_DAYS into weeks. It
+reports:
+
+* storage: rows and bytes before and after compaction, bytes per
+  observation, and the same for a row-per-observation table (measured on a
+  sample and extrapolated)
+* memory: bytes of one in-memory day summary (what a worker buffers per
+  series between flushes)
+* query time: GET /flights/price-history and /price-percentiles over the full
+  range for random series, through the service functions
+
+Uses a separate SQLite file by default; pass --database-url for PostgreSQL.
+
+    python -m benchmarks.availability_history --observations 100000000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Base, create_engine_for
+from app.models.models import AvailabilitySnapshot
+from app.services.availability_history import (
+    HISTOGRAM_BINS, Summary, compact, histogram_bins, price_history, price_percentiles,
+)
+from benchmarks.seed import HUBS, PROGRAMS
+
+CABINS = ("economy", "business")
+INSERT_BATCH = 5000
+RAW_SAMPLE = 200_000
+
+
+def all_series(count: int):
+    codes = [h[0] for h in HUBS]
+    pairs = [(a, b) for a in codes for b in codes if a != b]
+    combos = itertools.product(pairs, CABINS, PROGRAMS[:2])
+    return [(a, b, cabin, program) for (a, b), cabin, program in itertools.islice(combos, count)]
+
+
+def day_rows(series, day: date, per_series: int, base: np.ndarray, rng: np.random.Generator):
+    """One partial row per series for one day, built from per_series prices each."""
+    count = len(series)
+    # Prices drift through the year and vary around each series' base price
+    drift = 1 + 0.15 * np.sin(day.toordinal() / 58.0)
+    points = np.rint(base[:, None] * drift * rng.lognormal(0, 0.25, (count, per_series)) / 500) * 500
+    points = points.astype(np.int64)
+    histograms = np.bincount(
+        (np.arange(count)[:, None] * HISTOGRAM_BINS + histogram_bins(points)).ravel(),
+        minlength=count * HISTOGRAM_BINS,
+    ).reshape(count, HISTOGRAM_BINS).astype("<u4")
+    lows, highs, sums = points.min(axis=1).tolist(), points.max(axis=1).tolist(), points.sum(axis=1).tolist()
+    for i, (origin, destination, cabin, program) in enumerate(series):
+        yield {
+            "origin": origin, "destination": destination, "cabin_class": cabin, "loyalty_program": program,
+            "resolution": "day", "bucket_start": day, "compacted": False,
+            "searches": per_series // 20 or 1, "observations": per_series,
+            "min_points": lows[i], "max_points": highs[i], "points_sum": sums[i],
+            "histogram": histograms[i].tobytes(),
+        }
+
+
+async def table_bytes(engine, table: str) -> int:
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return (await conn.execute(text(f"SELECT pg_total_relation_size('{table}')"))).scalar_one()
+        # dbstat is compiled into most SQLite builds; fall back to the file size
+        try:
+            return (await conn.execute(text(f"SELECT SUM(pgsize) FROM dbstat WHERE name LIKE '%{table}%'"))).scalar_one() or 0
+        except Exception:
+            return os.path.getsize(engine.url.database)
+
+
+async def raw_bytes_per_row(engine, rng: random.Random) -> float:
+    """Bytes per row of a minimal row-per-observation table, measured on a sample."""
+    raw = Table(
+        "bench_raw_observations", MetaData(),
+        Column("id", Integer, primary_key=True), Column("origin", String), Column("destination", String),
+        Column("cabin_class", String), Column("loyalty_program", String), Column("observed_at", DateTime),
+        Column("points", Integer),
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(raw.create, checkfirst=True)
+        now = datetime.utcnow()
+        for start in range(0, RAW_SAMPLE, INSERT_BATCH):
+            await conn.execute(insert(raw), [
+                {"origin": "JFK", "destination": "LHR", "cabin_class": "business", "loyalty_program": "united",
+                 "observed_at": now - timedelta(seconds=rng.randint(0, 86400 * 365)), "points": rng.randrange(20000, 200000, 500)}
+                for _ in range(INSERT_BATCH)
+            ])
+    size = await table_bytes(engine, "bench_raw_observations")
+    async with engine.begin() as conn:
+        await conn.run_sync(raw.drop)
+    return size / RAW_SAMPLE
+
+
+def percentile_line(name: str, samples) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return f"  {name:<27}p50 {statistics.median(ordered):7.2f} ms   p95 {p95:7.2f} ms"
+
+
+async def main(args):
+    engine = create_engine_for(args.database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[AvailabilitySnapshot.__table__])
+        await conn.execute(AvailabilitySnapshot.__table__.delete())
+
+    series = all_series(args.series)
+    per_series = max(1, args.observations // (len(series) * args.days))
+    total = per_series * len(series) * args.days
+    rng = np.random.default_rng(args.seed)
+    base = rng.uniform(15000, 120000, len(series))
+    today = date(2031, 1, 1)
+    first_day = today - timedelta(days=args.days)
+
+    print(f"{len(series):,} series x {args.days} days x {per_series} prices = {total:,} observations")
+    started = time.perf_counter()
+    async with AsyncSession(engine) as db:
+        for offset in range(args.days):
+            rows = list(day_rows(series, first_day + timedelta(days=offset), per_series, base, rng))
+            for start in range(0, len(rows), INSERT_BATCH):
+                await db.execute(insert(AvailabilitySnapshot), rows[start:start + INSERT_BATCH])
+            await db.commit()
+            print(f"\r  ingested day {offset + 1}/{args.days}", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    ingest = time.perf_counter() - started
+
+    async def row_count() -> int:
+        async with engine.connect() as conn:
+            return (await conn.execute(select(func.count()).select_from(AvailabilitySnapshot))).scalar_one()
+
+    before_rows, before_bytes = await row_count(), await table_bytes(engine, "availability_snapshots")
+    started = time.perf_counter()
+    async with AsyncSession(engine) as db:
+        stats = await compact(db, today=today)
+    compaction = time.perf_counter() - started
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as conn:
+            await conn.execute(text("VACUUM"))
+    after_rows, after_bytes = await row_count(), await table_bytes(engine, "availability_snapshots")
+    raw_row = await raw_bytes_per_row(engine, random.Random(args.seed))
+
+    print(f"\ningest (summaries + insert)   {ingest:8.1f} s")
+    print(f"compaction                    {compaction:8.1f} s   {stats}")
+    print(f"partial rows                  {before_rows:>12,}   {before_bytes / 2**20:9.1f} MiB")
+    print(f"compacted rows                {after_rows:>12,}   {after_bytes / 2**20:9.1f} MiB   "
+          f"{after_bytes / total:.3f} bytes/observation")
+    print(f"row per observation (est.)    {total:>12,}   {raw_row * total / 2**20:9.1f} MiB   {raw_row:.1f} bytes/observation")
+    summary = Summary()
+    summary.add_points(np.array([50000]))
+    buffered = sys.getsizeof(summary) + sys.getsizeof(summary.histogram)
+    print(f"in-memory day summary         {buffered:>12} bytes per buffered series")
+
+    pick = random.Random(args.seed)
+    since = first_day
+    history_ms, percentile_ms, route_ms = [], [], []
+    async with AsyncSession(engine) as db:
+        for _ in range(args.queries):
+            origin, destination, cabin, program = pick.choice(series)
+            started = time.perf_counter()
+            history = await price_history(db, origin, destination, cabin, program, since, today)
+            history_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            await price_percentiles(db, origin, destination, cabin, program, since, today, (10, 50, 90))
+            percentile_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            await price_percentiles(db, origin, destination, cabin, None, since, today, (10, 50, 90))
+            route_ms.append((time.perf_counter() - started) * 1000)
+    print(f"\nqueries over {args.days} days ({len(history)} buckets per series):")
+    print(percentile_line("price-history", history_ms))
+    print(percentile_line("percentiles", percentile_ms))
+    print(percentile_line("percentiles, all programs", route_ms))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_history.db")
+    parser.add_argument("--observations", type=int, default=100_000_000)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Hub routing query latency over a synthetic cached-segment graph
+
+Fills a SegmentGraph the way run_search does, as if every (hub, hub, day,
+program) search had recently been served: --hubs major hubs, each with
+non-stop service to --routes-per-hub other hubs, --flights departures per
+route, day and program, over --days days. Then times random route queries in
+milliseconds, both cold (adjacency rebuilt from the indexed segments, as
+right after new results arrive) and warm (adjacency reused).
+
+    python -m benchmarks.award_routing --hubs 50 --routes-per-hub 25 --queries 200
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from app.services.award_routing import SegmentGraph
+from app.services.search_cache import NormalizedSearch
+
+PROGRAMS = ("united", "aeroplan", "flyingblue")
+CABIN = "business"
+FIRST_DAY = date(2030, 6, 1)
+
+
+def hub_codes(count: int):
+    return [f"H{i:02d}" for i in range(count)]
+
+
+def build_graph(hubs, routes_per_hub: int, flights: int, days: int, rng: random.Random) -> SegmentGraph:
+    graph = SegmentGraph(max_searches=len(hubs) * routes_per_hub * days * len(PROGRAMS))
+    for origin in hubs:
+        for destination in rng.sample([h for h in hubs if h != origin], routes_per_hub):
+            block = rng.randint(90, 900)
+            base_points = rng.randrange(20000, 90000, 500)
+            for day in range(days):
+                departure_date = FIRST_DAY + timedelta(days=day)
+                for program in PROGRAMS:
+                    results = []
+                    for n in range(flights):
+                        departs = datetime.combine(departure_date, datetime.min.time()) + timedelta(minutes=rng.randint(0, 1439))
+                        results.append({
+                            "airline": program.title(), "flight_number": f"{program[:2].upper()}{n}{day}",
+                            "origin": origin, "destination": destination,
+                            "departure_time": departs.isoformat(),
+                            "arrival_time": (departs + timedelta(minutes=block)).isoformat(),
+                            "cabin_class": CABIN,
+                            "points_required": base_points + rng.randrange(0, 40000, 500),
+                            "cash_price": round(rng.uniform(5, 400), 2),
+                            "availability": rng.randint(0, 6),
+                            "aircraft": "787", "duration_minutes": block, "stops": 0,
+                        })
+                    search = NormalizedSearch(origin, destination, departure_date.isoformat(), CABIN, 1, program)
+                    graph.add(search, results)
+    return graph
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(graph: SegmentGraph, hubs, queries: int, max_stops: int, cold: bool, rng: random.Random):
+    hub_set = frozenset(hubs)
+    samples, found = [], 0
+    for _ in range(queries):
+        origin, destination = rng.sample(hubs, 2)
+        if cold:
+            graph._adjacency.clear()
+        started = time.perf_counter()
+        itineraries = graph.routes(origin, destination, FIRST_DAY, CABIN, hub_set, passengers=2, max_stops=max_stops)
+        samples.append((time.perf_counter() - started) * 1000)
+        found += bool(itineraries)
+    return statistics.median(samples), percentile(samples, 0.95), max(samples), found / queries
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    hubs = hub_codes(args.hubs)
+    started = time.perf_counter()
+    graph = build_graph(hubs, args.routes_per_hub, args.flights, args.days, rng)
+    stats = graph.stats()
+    print(f"indexed {stats['searches']:,} searches, {stats['segments']:,} segments "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"{'max_stops':>9}{'adjacency':>11}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'answered':>10}")
+    for max_stops in (0, 1, 2):
+        for cold in (True, False):
+            p50, p95, worst, answered = run(graph, hubs, args.queries, max_stops, cold, rng)
+            print(f"{max_stops:>9}{'cold' if cold else 'warm':>11}{p50:>9.2f}{p95:>9.2f}{worst:>9.2f}{answered:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hubs", type=int, default=50)
+    parser.add_argument("--routes-per-hub", type=int, default=25)
+    parser.add_argument("--flights", type=int, default=3, help="departures per route, day and program")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""
+Clerk JWT verification microbenchmark: cold vs warm
+
+Signs RS256 tokens with a throwaway key and serves its JWKS from a local HTTP
+server, then reports microseconds per verification:
+
+* before: the previous per-request path, PyJWKClient.get_signing_key_from_jwt
+  plus a full RS256 decode (its JWKS already cached)
+* cold:   app.core.auth_clerk.verify_clerk_jwt on tokens it has not seen
+* warm:   the same tokens again, served from the claims cache
+
+It also sends tokens with an unknown ``kid`` to show forced JWKS refreshes
+being rate limited.
+
+    python -m benchmarks.clerk_auth --tokens 2000
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+
+from app.core import auth_clerk
+from app.core.auth_clerk import JWKSCache, verify_clerk_jwt
+
+KID = "bench-key"
+
+
+def serve_jwks(jwks: dict) -> HTTPServer:
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def per_op_us(started: float, count: int) -> float:
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def main(count: int):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    server = serve_jwks({"keys": [{**jwk, "kid": KID, "use": "sig", "alg": "RS256"}]})
+    url = f"http://127.0.0.1:{server.server_port}/.well-known/jwks.json"
+
+    exp = int(time.time()) + 3600
+    tokens = [
+        jwt.encode({"sub": f"user_{i}", "sid": f"sess_{i}", "exp": exp}, private_key, algorithm="RS256", headers={"kid": KID})
+        for i in range(count)
+    ]
+
+    # Previous path
+    client = jwt.PyJWKClient(url)
+    client.get_signing_key_from_jwt(tokens[0])
+    started = time.perf_counter()
+    for token in tokens:
+        jwt.decode(token, client.get_signing_key_from_jwt(token).key, algorithms=["RS256"])
+    before = per_op_us(started, count)
+
+    auth_clerk.jwks_cache = JWKSCache(url)
+    await auth_clerk.jwks_cache.refresh()
+
+    started = time.perf_counter()
+    for token in tokens:
+        await verify_clerk_jwt(token)
+    cold = per_op_us(started, count)
+
+    started = time.perf_counter()
+    for token in tokens:
+        await verify_clerk_jwt(token)
+    warm = per_op_us(started, count)
+
+    print(f"{count:,} tokens, RS256 2048-bit\n")
+    print(f"{'before (PyJWKClient + decode)':<34}{before:>9.1f} us/op")
+    print(f"{'cold (claims cache miss)':<34}{cold:>9.1f} us/op")
+    print(f"{'warm (claims cache hit)':<34}{warm:>9.1f} us/op   {before / warm:,.0f}x faster than before")
+
+    rogue = jwt.encode({"sub": "x", "exp": exp}, private_key, algorithm="RS256", headers={"kid": "rotated"})
+    rejected = 0
+    for _ in range(200):
+        try:
+            await verify_clerk_jwt(rogue)
+        except HTTPException:
+            rejected += 1
+    counters = auth_clerk.jwks_cache.counters
+    print(f"\nunknown kid x200: {rejected} rejected, {counters['forced_refreshes']} forced JWKS refresh, "
+          f"{counters['forced_throttled']} throttled")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().tokens))
@@ -0,0 +1,121 @@
+"""
+Local Seats.aero stand-in server
+
+Serves the subset of the Seats.aero API used by app.services.seats_aero so the
+backend can be exercised without upstream credentials:
+
+    uvicorn benchmarks.fake_seats_aero:app --port 8081
+    SEATS_AERO_BASE_URL=http://localhost:8081 SEATS_AERO_API_KEY=local uvicorn app.main:app
+
+It can also be mounted in-process with ``httpx.ASGITransport(app=app)``.
+
+Upstream behaviour is set with FAKE_SEATS_AERO_* environment variables (or
+``configure()`` in-process): LATENCY_MS and JITTER_MS per response, ERROR_RATE
+(fraction answered with 503), RESULTS per search and SEED for the random
+source, e.g.
+
+    FAKE_SEATS_AERO_LATENCY_MS=250 FAKE_SEATS_AERO_ERROR_RATE=0.02 \
+        uvicorn benchmarks.fake_seats_aero:app --port 8081
+"""
+import asyncio
+import os
+import random
+from dataclasses import asdict, dataclass
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Seats.aero")
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = float(os.getenv("FAKE_SEATS_AERO_LATENCY_MS", "0"))
+    jitter_ms: float = float(os.getenv("FAKE_SEATS_AERO_JITTER_MS", "0"))
+    error_rate: float = float(os.getenv("FAKE_SEATS_AERO_ERROR_RATE", "0"))
+    results: int = int(os.getenv("FAKE_SEATS_AERO_RESULTS", "3"))
+    seed: int = int(os.getenv("FAKE_SEATS_AERO_SEED", "0"))
+
+
+config = FakeConfig()
+_rng = random.Random(config.seed)
+
+
+def configure(**changes) -> FakeConfig:
+    """Update the running server's behaviour (in-process use)."""
+    global _rng
+    for name, value in changes.items():
+        if not hasattr(config, name):
+            raise TypeError(f"unknown fake Seats.aero setting: {name}")
+        setattr(config, name, type(getattr(config, name))(value))
+    _rng = random.Random(config.seed)
+    return config
+
+
+def describe() -> dict:
+    return asdict(config)
+
+
+async def _upstream_delay() -> bool:
+    """Sleep for the configured latency; True when this response should fail."""
+    delay = config.latency_ms + (_rng.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0.0)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    return config.error_rate > 0 and _rng.random() < config.error_rate
+
+
+def _unavailable() -> JSONResponse:
+    return JSONResponse({"error": "upstream unavailable"}, status_code=503)
+
+AIRLINES = [
+    ("United Airlines", "UA", "Boeing 787-9"),
+    ("American Airlines", "AA", "Boeing 777-300ER"),
+    ("Delta Air Lines", "DL", "Airbus A350-900"),
+    ("Lufthansa", "LH", "Airbus A340-600"),
+]
+
+
+def build_results(params: dict, count: int = 3) -> list:
+    day = params.get("departureDate", date.today().isoformat())
+    results = []
+    for i in range(count):
+        airline, code, aircraft = AIRLINES[i % len(AIRLINES)]
+        hour = 6 + (i * 2) % 16
+        results.append({
+            "airline": airline,
+            "flight_number": f"{code}{100 + i}",
+            "origin": params.get("origin"),
+            "destination": params.get("destination"),
+            "departure_time": f"{day}T{hour:02d}:00:00",
+            "arrival_time": f"{day}T{(hour + 7) % 24:02d}:30:00",
+            "cabin_class": params.get("cabin"),
+            "points_required": 30000 + (i * 7919) % 60000,
+            "cash_price": 400.0 + i * 12.5,
+            "availability": 1 + i % 9,
+            "aircraft": aircraft,
+            "duration_minutes": 420 + (i * 13) % 180,
+            "stops": i % 3,
+        })
+    return results
+
+
+@app.post("/search")
+async def search(params: dict):
+    if await _upstream_delay():
+        return _unavailable()
+    return {"data": build_results(params, config.results)}
+
+
+@app.get("/availability/{flight_id}")
+async def availability(flight_id: str, date: date, passengers: int = 1):
+    if await _upstream_delay():
+        return _unavailable()
+    return {
+        "flight_id": flight_id,
+        "date": date,
+        "available_seats": 4,
+        "cabin_class": "business",
+        "points_required": 75000,
+        "taxes_fees": 125.50,
+    }
@@ -0,0 +1,305 @@
+"""
+Load test: scripted scenarios against the API with a local Seats.aero stand-in
+
+Closed-loop virtual users drive the application in-process over ASGI (the real
+app and lifespan, with Seats.aero replaced by benchmarks.fake_seats_aero) or
+a running server given with --base-url. Each scenario runs for --duration
+seconds after a short warm-up, and the p50/p95/p99 latency, requests/second
+and error counts per scenario and endpoint are written to a JSON file, so
+runs on two commits can be compared with --compare. The app's /health
+counters (cache hit ratios and the like) are saved after each scenario.
+
+Scenarios:
+
+* autocomplete:  users typing an airport city or code a key at a time, one
+                 GET /flights/airports per keystroke
+* search_storm:  signed-in users posting /flights/search over the most
+                 popular Zipf-weighted hub routes and a few dates, so hot
+                 searches repeat as they do in production (cache misses pay
+                 the fake upstream latency)
+* browsing:      signed-in users loading their profile, /auth/me, bookings
+                 and popular routes
+
+Tokens are minted for users created by benchmarks.seed.
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.load --duration 20 --output load.json
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.load --duration 20 --compare load.json
+
+Against a server, start the fake upstream and point the app at it (with the
+same SECRET_KEY and DATABASE_URL as this process, and RATE_LIMIT_ENABLED=false):
+
+    FAKE_SEATS_AERO_LATENCY_MS=200 uvicorn benchmarks.fake_seats_aero:app --port 8081
+    python -m benchmarks.load --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from app.api.endpoints.auth import create_access_token
+from app.core.config import settings
+from app.core.middleware import RateLimitMiddleware
+from app.main import app
+from app.services.seats_aero import SeatsAeroClient, get_seats_aero_client
+from benchmarks import fake_seats_aero
+from benchmarks.seed import HUBS, seed, user_ids, weighted_routes
+
+SCENARIOS = ("autocomplete", "search_storm", "browsing")
+CABINS = ("economy", "business")
+PROGRAMS = ("united", "aeroplan", "flyingblue")
+
+
+class Recorder:
+    """Latency samples (ms) and failures per endpoint label."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.enabled = False
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            response, failed = None, True
+        if self.enabled:
+            self.samples[label].append((time.perf_counter() - started) * 1000)
+            if failed:
+                self.errors[label] += 1
+        return response
+
+
+# Virtual users: each call runs one iteration of the scenario for one user
+
+def autocomplete_user(words: List[str], think_ms: float):
+    async def iteration(client, recorder, rng, user):
+        word = rng.choice(words)
+        for end in range(2, len(word) + 1):
+            await recorder.call(client, "GET /flights/airports", "GET", "/api/v1/flights/airports", params={"query": word[:end]})
+            if think_ms:
+                await asyncio.sleep(think_ms / 1000)
+    return iteration
+
+
+def search_user(pairs, weights, dates: List[date], tokens: List[str]):
+    async def iteration(client, recorder, rng, user):
+        headers = {"Authorization": f"Bearer {tokens[user % len(tokens)]}"}
+        origin, destination = rng.choices(pairs, weights)[0]
+        body = {
+            "origin": origin,
+            "destination": destination,
+            "departure_date": rng.choice(dates).isoformat(),
+            "cabin_class": rng.choice(CABINS),
+            "loyalty_program": rng.choice(PROGRAMS),
+        }
+        await recorder.call(client, "POST /flights/search", "POST", "/api/v1/flights/search", json=body, headers=headers)
+    return iteration
+
+
+def browsing_user(tokens: List[str]):
+    pages = [
+        ("GET /users/profile", "/api/v1/users/profile"),
+        ("GET /auth/me", "/api/v1/auth/me"),
+        ("GET /bookings", "/api/v1/bookings/"),
+        ("GET /flights/popular-routes", "/api/v1/flights/popular-routes"),
+    ]
+
+    async def iteration(client, recorder, rng, user):
+        headers = {"Authorization": f"Bearer {tokens[user % len(tokens)]}"}
+        for label, path in pages:
+            await recorder.call(client, label, "GET", path, headers=headers)
+    return iteration
+
+
+async def run_scenario(client: httpx.AsyncClient, iteration: Callable, concurrency: int, warmup: float,
+                       duration: float, seed_value: int) -> Dict[str, Any]:
+    recorder = Recorder()
+    deadline = 0.0
+
+    async def virtual_user(user: int):
+        rng = random.Random(seed_value * 100003 + user)
+        while time.perf_counter() < deadline:
+            await iteration(client, recorder, rng, user)
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(virtual_user(u) for u in range(concurrency)))
+    recorder.enabled = True
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(virtual_user(u) for u in range(concurrency)))
+    return summarize(recorder, time.perf_counter() - started)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "mean_ms": value}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_ms": round(q[49], 3), "p95_ms": round(q[94], 3), "p99_ms": round(q[98], 3),
+            "mean_ms": round(statistics.fmean(samples), 3)}
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    def entry(samples: List[float], errors: int) -> Dict[str, Any]:
+        return {"requests": len(samples), "errors": errors, "rps": round(len(samples) / elapsed, 1), **percentiles(samples)}
+
+    everything = [s for samples in recorder.samples.values() for s in samples]
+    return {
+        **entry(everything, sum(recorder.errors.values())),
+        "seconds": round(elapsed, 2),
+        "endpoints": {label: entry(samples, recorder.errors[label]) for label, samples in sorted(recorder.samples.items())},
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*command: str) -> str:
+        return subprocess.run(["git", *command], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    def change(new: float, old: Optional[float]) -> str:
+        return f"{(new - old) / old * 100:+6.1f}%" if old else ""
+
+    print(f"\n{'scenario / endpoint':<38}{'req':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, result in report["scenarios"].items():
+        old_scenario = (baseline or {}).get("scenarios", {}).get(name, {})
+        for label, row, old in [(name, result, old_scenario)] + [
+            (f"  {label}", row, old_scenario.get("endpoints", {}).get(label, {}))
+            for label, row in result["endpoints"].items()
+        ]:
+            print(f"{label:<38}{row['requests']:>8,}{row['errors']:>6,}{row['rps']:>9,.0f}"
+                  f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+            if old:
+                print(f"{'    vs baseline':<52}{change(row['rps'], old.get('rps')):>9}"
+                      f"{change(row['p50_ms'], old.get('p50_ms')):>9}{change(row['p95_ms'], old.get('p95_ms')):>9}"
+                      f"{change(row['p99_ms'], old.get('p99_ms')):>9}")
+
+
+async def main(args) -> Dict[str, Any]:
+    in_process = not args.base_url
+    if in_process and args.seed:
+        await seed(settings.DATABASE_URL, airports=args.seed_airports, users=args.seed_users,
+                   history=args.seed_history, bookings_per_user=3, seed_value=args.random_seed)
+
+    rng = random.Random(args.random_seed)
+    pairs, weights = weighted_routes(rng)
+    pairs, weights = pairs[:args.search_routes], weights[:args.search_routes]
+    today = date.today()
+    dates = [today + timedelta(days=30 + 7 * i) for i in range(args.search_dates)]
+    words = [w for hub in HUBS for w in (hub[0].lower(), hub[2].lower())]
+    tokens = [create_access_token({"sub": str(i)}) for i in await user_ids(settings.DATABASE_URL, args.concurrency)]
+
+    iterations = {
+        "autocomplete": autocomplete_user(words, args.think_ms),
+        "search_storm": search_user(pairs, weights, dates, tokens),
+        "browsing": browsing_user(tokens),
+    }
+    timeout = httpx.Timeout(30.0)
+    upstream = None
+    if in_process:
+        fake_seats_aero.configure(latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_jitter_ms,
+                                  error_rate=args.upstream_error_rate, results=args.upstream_results,
+                                  seed=args.random_seed)
+        upstream = SeatsAeroClient(base_url="http://fake-seats-aero", api_key="bench",
+                                   transport=httpx.ASGITransport(app=fake_seats_aero.app))
+        app.dependency_overrides[get_seats_aero_client] = lambda: upstream
+        if not args.keep_rate_limit:
+            # Every in-process virtual user shares one client address
+            app.user_middleware = [m for m in app.user_middleware if m.cls is not RateLimitMiddleware]
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits)
+
+    scenarios: Dict[str, Any] = {}
+    lifespan = app.router.lifespan_context(app) if in_process else None
+    try:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+            await upstream.start()
+        for name in args.scenarios:
+            if name != "autocomplete" and not tokens:
+                print(f"{name} skipped: no seeded users (run benchmarks.seed or pass --seed)")
+                continue
+            print(f"{name}: {args.concurrency} users, {args.duration:.0f}s ...", flush=True)
+            scenarios[name] = await run_scenario(client, iterations[name], args.concurrency, args.warmup,
+                                                 args.duration, args.random_seed)
+            scenarios[name]["health"] = (await client.get("/health")).json()
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await upstream.close()
+            await lifespan.__aexit__(None, None, None)
+            app.dependency_overrides.pop(get_seats_aero_client, None)
+
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "database": make_url(settings.DATABASE_URL).get_backend_name(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "upstream": fake_seats_aero.describe() if in_process else None,
+        },
+        "scenarios": scenarios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between autocomplete keystrokes")
+    parser.add_argument("--search-routes", type=int, default=50, help="distinct routes in the search storm")
+    parser.add_argument("--search-dates", type=int, default=4, help="distinct departure dates in the search storm")
+    parser.add_argument("--base-url", help="run against a server instead of in-process")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="leave the per-IP limiter on in-process")
+    parser.add_argument("--upstream-latency-ms", type=float, default=150.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-results", type=int, default=25, help="results per upstream search")
+    parser.add_argument("--seed", action="store_true", help="seed DATABASE_URL before running (benchmarks.seed)")
+    parser.add_argument("--seed-airports", type=int, default=5000)
+    parser.add_argument("--seed-users", type=int, default=1000)
+    parser.add_argument("--seed-history", type=int, default=50000)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", default="load-results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.output} ({report['meta']['commit'] or 'no git revision'})")
@@ -0,0 +1,149 @@
+"""
+Middleware stack overhead, layer by layer
+
+Drives the application's routes directly over ASGI (no HTTP client or socket
+in the way) with different middleware stacks and reports latency percentiles
+and sequential throughput for ``GET /health`` and a cached
+``POST /api/v1/flights/search``:
+
+* bare:            routes only
+* +security:       SecurityHeadersMiddleware
+* +cors:           CORS in front of security headers
+* +ratelimit:      rate limiting inside those (limit set high enough to never
+                   trigger; /health is exempt, so only the search shows its cost)
+* +metrics:        the full production stack, MetricsMiddleware outermost
+* BaseHTTP (old):  the previous BaseHTTPMiddleware security-header layer plus CORS
+
+    python -m benchmarks.middleware --requests 3000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.endpoints.auth import get_current_user
+from app.core.config import settings
+from app.core.middleware import MetricsMiddleware, RateLimitMiddleware, SecurityHeadersMiddleware
+from app.main import app as real_app
+from app.services.seats_aero import SeatsAeroClient, get_seats_aero_client
+from benchmarks.fake_seats_aero import app as fake_seats_aero
+
+SEARCH_BODY = json.dumps({
+    "origin": "JFK", "destination": "LHR", "departure_date": "2030-06-01",
+    "cabin_class": "business", "loyalty_program": "united",
+}).encode()
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    """The former app.main.SecurityHeadersMiddleware, kept here for comparison."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if not (request.url.path.startswith("/docs") or request.url.path.startswith("/redoc")):
+            response.headers.setdefault("Content-Security-Policy", "default-src 'self'")
+        response.headers.setdefault("X-Frame-Options", "DENY")
+        response.headers.setdefault("X-Content-Type-Options", "nosniff")
+        response.headers.setdefault("Referrer-Policy", "no-referrer")
+        response.headers.setdefault("Permissions-Policy", "geolocation=(), microphone=(), camera=()")
+        return response
+
+
+def cors(app):
+    return CORSMiddleware(app, allow_origins=settings.ALLOWED_ORIGINS, allow_credentials=True,
+                          allow_methods=["GET", "POST", "PUT", "OPTIONS"], allow_headers=["Authorization", "Content-Type"])
+
+
+def stacks(routes_app: FastAPI):
+    return {
+        "bare": routes_app,
+        "+security": SecurityHeadersMiddleware(routes_app),
+        "+cors": cors(SecurityHeadersMiddleware(routes_app)),
+        "+ratelimit": cors(SecurityHeadersMiddleware(RateLimitMiddleware(routes_app, per_minute=10 ** 9))),
+        "+metrics": MetricsMiddleware(cors(SecurityHeadersMiddleware(RateLimitMiddleware(routes_app, per_minute=10 ** 9)))),
+        "BaseHTTP (old)": cors(LegacySecurityHeaders(routes_app)),
+    }
+
+
+async def call(app, method: str, path: str, body: bytes = b"") -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"origin", b"http://localhost:3000"),
+                    (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, method: str, path: str, body: bytes, requests: int):
+    """Latency samples (us) and elapsed seconds for ``requests`` sequential calls."""
+    for _ in range(50):
+        status = await call(app, method, path, body)
+        assert status == 200, f"{method} {path} returned {status}"
+    samples = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        await call(app, method, path, body)
+        samples.append((time.perf_counter() - t) * 1e6)
+    return samples, time.perf_counter() - started
+
+
+async def main(requests: int, rounds: int):
+    client = SeatsAeroClient(base_url="http://fake", api_key="bench", transport=httpx.ASGITransport(app=fake_seats_aero))
+    await client.start()
+    # Routes resolve dependency overrides through the app that included them
+    real_app.dependency_overrides[get_seats_aero_client] = lambda: client
+    real_app.dependency_overrides[get_current_user] = lambda: None
+    routes_app = FastAPI(routes=real_app.routes)
+
+    for label, method, path, body in [("GET /health", "GET", "/health", b""),
+                                      ("POST /api/v1/flights/search (cached)", "POST", "/api/v1/flights/search", SEARCH_BODY)]:
+        print(f"\n{label}, {requests:,} sequential requests")
+        print(f"{'stack':<16}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}{'req/s':>10}{'vs bare':>10}")
+        apps = stacks(routes_app)
+        samples = {name: [] for name in apps}
+        elapsed = dict.fromkeys(apps, 0.0)
+        # Stacks take turns over several rounds so drift hits all of them alike
+        for _ in range(rounds):
+            for name, app in apps.items():
+                round_samples, round_elapsed = await measure(app, method, path, body, requests // rounds)
+                samples[name] += round_samples
+                elapsed[name] += round_elapsed
+        bare_p50 = None
+        for name in apps:
+            q = statistics.quantiles(samples[name], n=100)
+            bare_p50 = bare_p50 or q[49]
+            print(f"{name:<16}{q[49]:>9.0f}{q[94]:>9.0f}{q[98]:>9.0f}{len(samples[name]) / elapsed[name]:>10,.0f}"
+                  f"{q[49] - bare_p50:>+9.0f}us")
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
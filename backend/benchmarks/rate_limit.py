@@ -0,0 +1,107 @@
+"""
+Distributed rate limiter benchmark: accuracy across processes and cost per check
+
+Starts --workers processes (each like a uvicorn worker, with its own Redis
+connection pool), each running --concurrency tasks that hammer the same
+limiter for --seconds. Half the checks hit one shared hot key, which measures
+how accurately the limit is enforced across processes. The rest are spread
+over --keys keys, like many users. Reports:
+
+* checks/s and p50/p99 latency per check
+* hot-key admissions vs the ideal (burst + rate x elapsed)
+* Redis commands per check from INFO commandstats, which should be 1.00
+  (one EVALSHA)
+
+Needs a reachable Redis at REDIS_URL; buckets are written under
+``ratelimit:bench:*`` and expire on their own.
+
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.rate_limit --workers 4 --concurrency 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter
+
+HOT_KEY = "hot"
+
+
+def worker(args, seed: int, results) -> None:
+    async def run():
+        limiter = RateLimiter("bench", args.per_minute)
+        rng = random.Random(seed)
+        latencies, admitted = [], 0
+        deadline = time.monotonic() + args.seconds
+
+        async def task():
+            nonlocal admitted
+            while time.monotonic() < deadline:
+                hot = rng.random() < 0.5
+                started = time.perf_counter()
+                wait = await limiter.take(HOT_KEY if hot else f"user:{rng.randrange(args.keys)}")
+                latencies.append(time.perf_counter() - started)
+                admitted += hot and not wait
+
+        await asyncio.gather(*(task() for _ in range(args.concurrency)))
+        results.put((latencies, admitted, limiter.counters["local"]))
+
+    asyncio.run(run())
+
+
+async def commands(redis: Redis) -> Optional[int]:
+    """EVAL/EVALSHA calls served so far, or None where INFO commandstats is unsupported."""
+    try:
+        stats = await redis.info("commandstats")
+    except ResponseError:
+        return None
+    return sum(v["calls"] for k, v in stats.items() if k in ("cmdstat_evalsha", "cmdstat_eval"))
+
+
+async def main(args):
+    redis = Redis.from_url(settings.REDIS_URL)
+    async for key in redis.scan_iter("ratelimit:bench:*"):
+        await redis.delete(key)
+    before = await commands(redis)
+
+    results = multiprocessing.Queue()
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=worker, args=(args, seed, results)) for seed in range(args.workers)]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    after = await commands(redis)
+    await redis.aclose()
+    latencies = sorted(x for lat, _, _ in outcomes for x in lat)
+    admitted = sum(a for _, a, _ in outcomes)
+    local = sum(n for _, _, n in outcomes)
+    ideal = args.per_minute + args.per_minute / 60 * args.seconds
+
+    print(f"{args.workers} processes x {args.concurrency} tasks, {args.seconds:g}s, limit {args.per_minute}/min")
+    print(f"checks                 {len(latencies):>10,}   {len(latencies) / elapsed:,.0f}/s")
+    print(f"latency                p50 {statistics.median(latencies) * 1000:.3f} ms   "
+          f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.3f} ms")
+    print(f"hot key admitted       {admitted:>10,}   ideal {ideal:,.0f} ({admitted / ideal - 1:+.1%})")
+    per_check = f"{(after - before) / max(1, len(latencies) - local):10.2f}" if before is not None else f"{'n/a':>10}"
+    print(f"redis calls per check  {per_check}   local fallbacks {local}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--per-minute", type=int, default=600)
+    parser.add_argument("--keys", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,213 @@
+"""
+Seed a benchmark dataset: airports, users, bookings and search history
+
+Fills the database at DATABASE_URL (PostgreSQL or SQLite) with a reproducible
+dataset for benchmarks.load: the real hub airports the scenarios search
+between plus synthetic ones, users with bookings, and search history spread
+over the last 30 days (with the popular-route aggregates built from it).
+Tables are created if missing; existing benchmark rows are left alone, so
+seeding twice is harmless.
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed --airports 5000 --users 1000 --history 50000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import Base, create_engine_for
+from app.models.models import Airport, Booking, CabinClass, SearchHistory, User
+from app.services.popular_routes import apply_search_rows
+
+# (IATA, name, city, country, lat, lon); the routes scenarios search between
+HUBS = [
+    ("JFK", "John F. Kennedy International Airport", "New York", "United States", 40.6413, -73.7781),
+    ("EWR", "Newark Liberty International Airport", "Newark", "United States", 40.6895, -74.1745),
+    ("LAX", "Los Angeles International Airport", "Los Angeles", "United States", 33.9416, -118.4085),
+    ("SFO", "San Francisco International Airport", "San Francisco", "United States", 37.6213, -122.3790),
+    ("ORD", "O'Hare International Airport", "Chicago", "United States", 41.9742, -87.9073),
+    ("SEA", "Seattle-Tacoma International Airport", "Seattle", "United States", 47.4502, -122.3088),
+    ("BOS", "Logan International Airport", "Boston", "United States", 42.3656, -71.0096),
+    ("MIA", "Miami International Airport", "Miami", "United States", 25.7959, -80.2870),
+    ("LHR", "London Heathrow Airport", "London", "United Kingdom", 51.4700, -0.4543),
+    ("LGW", "London Gatwick Airport", "London", "United Kingdom", 51.1537, -0.1821),
+    ("CDG", "Charles de Gaulle Airport", "Paris", "France", 49.0097, 2.5479),
+    ("FRA", "Frankfurt Airport", "Frankfurt", "Germany", 50.0379, 8.5622),
+    ("MUC", "Munich Airport", "Munich", "Germany", 48.3537, 11.7750),
+    ("AMS", "Amsterdam Airport Schiphol", "Amsterdam", "Netherlands", 52.3105, 4.7683),
+    ("DUB", "Dublin Airport", "Dublin", "Ireland", 53.4264, -6.2499),
+    ("ZRH", "Zurich Airport", "Zurich", "Switzerland", 47.4582, 8.5555),
+    ("DXB", "Dubai International Airport", "Dubai", "United Arab Emirates", 25.2532, 55.3657),
+    ("DOH", "Hamad International Airport", "Doha", "Qatar", 25.2731, 51.6081),
+    ("SIN", "Singapore Changi Airport", "Singapore", "Singapore", 1.3644, 103.9915),
+    ("HND", "Haneda Airport", "Tokyo", "Japan", 35.5494, 139.7798),
+    ("NRT", "Narita International Airport", "Tokyo", "Japan", 35.7720, 140.3929),
+    ("ICN", "Incheon International Airport", "Seoul", "South Korea", 37.4602, 126.4407),
+    ("HKG", "Hong Kong International Airport", "Hong Kong", "Hong Kong", 22.3080, 113.9185),
+    ("SYD", "Sydney Kingsford Smith Airport", "Sydney", "Australia", -33.9399, 151.1753),
+]
+PROGRAMS = ["united", "american", "delta", "aeroplan", "alaska", "flyingblue", "virgin", "british"]
+CABINS = list(CabinClass)
+WORDS = ["International", "Regional", "Municipal", "Field", "County", "Airpark", "Memorial", "Air Base"]
+USER_DOMAIN = "bench.aeropoints.com"
+BATCH = 5000
+
+
+def hub_airports() -> List[dict]:
+    return [
+        {"iata_code": code, "name": name, "city": city, "country": country,
+         "latitude": lat, "longitude": lon, "is_major_hub": True, "has_lounge": True}
+        for code, name, city, country, lat, lon in HUBS
+    ]
+
+
+def synthetic_airports(count: int, taken: Set[str], rng: random.Random) -> Iterator[dict]:
+    """Airports with unused three-character codes and plausible names."""
+    codes = ("".join(c) for c in itertools.product(string.ascii_uppercase + string.digits, repeat=3))
+    free = (code for code in codes if code not in taken)
+    for _, code in zip(range(count), free):
+        city = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))).title()
+        yield {
+            "iata_code": code,
+            "name": f"{city} {rng.choice(WORDS)} Airport",
+            "city": city,
+            "country": "Testland",
+            "latitude": rng.uniform(-60, 70),
+            "longitude": rng.uniform(-180, 180),
+        }
+
+
+def weighted_routes(rng: random.Random) -> Tuple[List[Tuple[str, str]], List[float]]:
+    """Every ordered hub pair with Zipf-like weights, so a few routes dominate as in real traffic."""
+    codes = [h[0] for h in HUBS]
+    pairs = [(a, b) for a in codes for b in codes if a != b]
+    rng.shuffle(pairs)
+    return pairs, [1 / (rank + 1) for rank in range(len(pairs))]
+
+
+def history_rows(count: int, user_ids: List[int], rng: random.Random) -> Iterator[dict]:
+    pairs, weights = weighted_routes(rng)
+    now = datetime.utcnow()
+    for _ in range(count):
+        origin, destination = rng.choices(pairs, weights)[0]
+        searched_at = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        found = rng.random() < 0.8
+        yield {
+            "user_id": rng.choice(user_ids) if user_ids and rng.random() < 0.6 else None,
+            "origin": origin,
+            "destination": destination,
+            "departure_date": searched_at + timedelta(days=rng.randint(7, 300)),
+            "cabin_class": rng.choice(CABINS),
+            "passengers": rng.choice((1, 1, 1, 2, 2, 4)),
+            "loyalty_program": rng.choice(PROGRAMS),
+            "results_count": rng.randint(1, 40) if found else 0,
+            "lowest_points": rng.randrange(20000, 150000, 500) if found else None,
+            "searched_at": searched_at,
+        }
+
+
+def booking_rows(user_ids: List[int], per_user: int, rng: random.Random) -> Iterator[dict]:
+    for user_id in user_ids:
+        for i in range(per_user):
+            origin, destination = rng.sample([h[0] for h in HUBS], 2)
+            departs = datetime.utcnow() + timedelta(days=rng.randint(-200, 200), hours=rng.randint(0, 23))
+            yield {
+                "user_id": user_id,
+                "booking_reference": f"BN{user_id:07d}{i:02d}",
+                "origin": origin,
+                "destination": destination,
+                "airline": rng.choice(["United Airlines", "Lufthansa", "Air Canada", "Delta Air Lines"]),
+                "flight_number": f"{rng.choice(['UA', 'LH', 'AC', 'DL'])}{rng.randint(1, 999)}",
+                "departure_date": departs,
+                "arrival_date": departs + timedelta(hours=rng.randint(2, 16)),
+                "cabin_class": rng.choice(CABINS),
+                "points_used": rng.randrange(20000, 150000, 500),
+                "taxes_fees": round(rng.uniform(5, 600), 2),
+                "loyalty_program": rng.choice(PROGRAMS),
+                "status": rng.choice(["confirmed", "confirmed", "pending", "cancelled"]),
+                "passengers": [{"name": f"Passenger {user_id}"}],
+            }
+
+
+async def insert_batched(db: AsyncSession, model, rows: Iterator[dict], batch_size: int = BATCH) -> int:
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return total
+        await db.execute(insert(model), batch)
+        if model is SearchHistory:
+            await apply_search_rows(db, batch)
+        total += len(batch)
+
+
+async def seed(database_url: str, airports: int, users: int, history: int, bookings_per_user: int, seed_value: int) -> Dict[str, int]:
+    """Top the database up to the requested row counts; returns rows inserted per table."""
+    rng = random.Random(seed_value)
+    engine = create_engine_for(database_url)
+    inserted = {}
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with AsyncSession(engine) as db:
+            taken = set((await db.execute(select(Airport.iata_code))).scalars())
+            missing_hubs = [row for row in hub_airports() if row["iata_code"] not in taken]
+            if missing_hubs:
+                await db.execute(insert(Airport), missing_hubs)
+            taken.update(row["iata_code"] for row in missing_hubs)
+            wanted = max(0, airports - len(taken))
+            inserted["airports"] = len(missing_hubs) + await insert_batched(db, Airport, synthetic_airports(wanted, taken, rng))
+
+            bench_users = User.email.like(f"%@{USER_DOMAIN}")
+            existing = (await db.execute(select(func.count()).select_from(User).where(bench_users))).scalar_one()
+            new_users = (
+                {"email": f"user{i}@{USER_DOMAIN}", "full_name": f"Bench User {i}", "is_active": True, "is_verified": True}
+                for i in range(existing, users)
+            )
+            inserted["users"] = await insert_batched(db, User, new_users)
+            ids = list((await db.execute(select(User.id).where(bench_users).order_by(User.id))).scalars())
+            inserted["bookings"] = await insert_batched(db, Booking, booking_rows(ids[existing:], bookings_per_user, rng))
+
+            have = (await db.execute(select(func.count()).select_from(SearchHistory))).scalar_one()
+            # Smaller batches keep the route_search_stats upsert under SQLite's bound-parameter limit
+            inserted["search_history"] = await insert_batched(
+                db, SearchHistory, history_rows(max(0, history - have), ids, rng), batch_size=1000
+            )
+            await db.commit()
+    finally:
+        await engine.dispose()
+    return inserted
+
+
+async def user_ids(database_url: str, limit: int) -> List[int]:
+    """Ids of seeded benchmark users, for minting tokens."""
+    engine = create_engine_for(database_url)
+    try:
+        async with engine.connect() as conn:
+            return list((await conn.execute(
+                select(User.id).where(User.email.like(f"%@{USER_DOMAIN}")).order_by(User.id).limit(limit)
+            )).scalars())
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--airports", type=int, default=5000, help="total airports, hubs included")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=50000, help="total search history rows")
+    parser.add_argument("--bookings-per-user", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = asyncio.run(seed(settings.DATABASE_URL, args.airports, args.users, args.history, args.bookings_per_user, args.seed))
+    print(", ".join(f"{name}: +{count:,}" for name, count in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,118 @@
+"""
+Search response serialization: response_model re-validation vs orjson fast path
+
+For 100, 1,000 and 10,000 results, times building the /flights/search
+response body from cached results, in milliseconds per response:
+
+* before:   the previous path, a dict re-validated against
+            FlightSearchResponse by FastAPI's serialize_response, then
+            encoded by the standard JSONResponse
+* after:    the current path, results validated once into FlightRecord
+            dicts and encoded with orjson, no response_model pass
+* validate: the one-off cost of that validation, paid when results arrive
+            from Seats.aero rather than on every response
+
+It then reports end-to-end latency of a cached POST /api/v1/flights/search
+through the real app (ASGI, fake Seats.aero returning that many results).
+tests/test_search_serialization.py checks that both paths produce the same
+document.
+
+    python -m benchmarks.serialization --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.endpoints.auth import get_current_user
+from app.core.metrics import InstrumentedORJSONResponse
+from app.main import app
+from app.schemas.flights import FlightSearch, FlightSearchResponse
+from app.services.flight_search import compact_results, tag_results
+from app.services.seats_aero import SeatsAeroClient, get_seats_aero_client
+from benchmarks import fake_seats_aero
+
+SIZES = (100, 1000, 10000)
+SEARCH = {"origin": "JFK", "destination": "LHR", "departure_date": "2030-06-01",
+          "cabin_class": "business", "loyalty_program": "united"}
+
+
+def median_ms(fn, repeat: int) -> float:
+    """Median of ``repeat`` timed runs, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def median_ms_async(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def response_content(results, search_params: dict) -> dict:
+    tagged = tag_results(results, "united")
+    return {"results": tagged, "total_results": len(tagged), "next_cursor": None,
+            "search_params": search_params, "dates": None, "programs": None}
+
+
+async def before_body(raw, field) -> bytes:
+    search = FlightSearch(**SEARCH)
+    content = await serialize_response(field=field, response_content=response_content(raw, search.model_dump()), is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def after_body(records) -> bytes:
+    search = FlightSearch(**SEARCH)
+    return InstrumentedORJSONResponse(response_content(records, search.model_dump(mode="json"))).body
+
+
+async def end_to_end(count: int, repeat: int) -> float:
+    fake_seats_aero.configure(results=count)
+    # A different day per size, so the first request fills a fresh cache entry
+    body = {**SEARCH, "departure_date": f"2030-06-{SIZES.index(count) + 1:02d}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post("/api/v1/flights/search", json=body)
+        assert response.status_code == 200 and response.json()["total_results"] == count, response.text[:200]
+        return await median_ms_async(lambda: client.post("/api/v1/flights/search", json=body), repeat)
+
+
+async def main(repeat: int):
+    field = create_response_field(name="Response_search_flights", type_=FlightSearchResponse)
+    print(f"{'results':>8}{'before ms':>11}{'after ms':>10}{'speedup':>9}{'validate ms':>13}{'bytes':>11}")
+    for count in SIZES:
+        raw = fake_seats_aero.build_results({"origin": "JFK", "destination": "LHR", "cabin": "business",
+                                             "departureDate": "2030-06-01"}, count)
+        records = compact_results(raw)
+        new = after_body(records)
+
+        before = await median_ms_async(lambda: before_body(raw, field), repeat)
+        after = median_ms(lambda: after_body(records), repeat)
+        validate = median_ms(lambda: compact_results(raw), repeat)
+        print(f"{count:>8,}{before:>11.2f}{after:>10.2f}{before / after:>8.1f}x{validate:>13.2f}{len(new):>11,}")
+
+    client = SeatsAeroClient(base_url="http://fake", api_key="bench", transport=httpx.ASGITransport(app=fake_seats_aero.app))
+    await client.start()
+    app.dependency_overrides[get_seats_aero_client] = lambda: client
+    app.dependency_overrides[get_current_user] = lambda: None
+    print("\ncached POST /api/v1/flights/search, end to end (median ms)")
+    for count in SIZES:
+        print(f"{count:>8,}{await end_to_end(count, repeat):>11.2f}")
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args().repeat))
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# Settings are read at import time: use a throwaway SQLite database and no Redis
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/aeropoints_test.db")
+os.environ.setdefault("REDIS_URL", "")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.api.endpoints.auth import get_current_user  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.seats_aero import SeatsAeroClient, get_seats_aero_client  # noqa: E402
+from benchmarks import fake_seats_aero  # noqa: E402
+
+
+@pytest.fixture
+async def client():
+    """The app over ASGI, anonymous, against the fake Seats.aero upstream (25 results per search)."""
+    fake_seats_aero.configure(results=25)
+    seats_aero = SeatsAeroClient(base_url="http://fake", api_key="test",
+                                 transport=httpx.ASGITransport(app=fake_seats_aero.app))
+    await seats_aero.start()
+    app.dependency_overrides[get_seats_aero_client] = lambda: seats_aero
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            yield c
+    finally:
+        app.dependency_overrides.clear()
+        await seats_aero.close()
@@ -0,0 +1,54 @@
+import random
+from types import SimpleNamespace
+
+from app.services.airport_index import AirportIndex
+
+CITIES = ["London", "Los Angeles", "Lagos", "Lyon", "Lima", "La Paz", "Sao Paulo", "New York", "Newark", "Nagoya"]
+WORDS = ["International", "Regional", "Field", "Airport", "Lake", "North", "La", "Ny"]
+
+
+def airports(rng: random.Random, count: int):
+    letters = "LNSAY"
+    return [
+        SimpleNamespace(
+            id=i,
+            iata_code="".join(rng.choice(letters) for _ in range(3)),
+            icao_code="K" + "".join(rng.choice(letters) for _ in range(3)),
+            name=" ".join(rng.sample(WORDS, 2)),
+            city=rng.choice(CITIES),
+            country="XX",
+            is_major_hub=rng.random() < 0.1,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def full_scan(index: AirportIndex, query: str, limit: int):
+    """The ranking applied to every matching airport, with no pre-ranked shortcut."""
+    q = query.lower()
+    terms = q.split()
+    matching = [e for e in index._entries.values()
+                if all(any(tok.startswith(t) for tok in e.tokens) for t in terms)]
+    matching.sort(key=lambda e: (e.iata != q, not e.is_major_hub, q not in e.tokens and e.icao != q,
+                                 e.city, e.iata, e.id))
+    return [e.payload for e in matching[:limit]]
+
+
+def test_short_prefixes_rank_like_a_full_scan():
+    rng = random.Random(5)
+    rows = airports(rng, 400)
+    index = AirportIndex()
+    index.build(rows[:300])
+    # Incremental changes keep the pre-ranked lists in step
+    for row in rows[300:]:
+        index.upsert(row)
+    for row in rng.sample(rows, 60):
+        index.remove(row.id)
+    for row in rng.sample(rows, 40):
+        row.is_major_hub = not row.is_major_hub
+        index.upsert(row)
+
+    queries = ["l", "n", "la", "ny", "k", "s", "la l", "n la", "ny n", "lax", "lagos", "la paz", "new york"]
+    for query in queries:
+        for limit in (1, 5, 10, 50):
+            assert index.search(query, limit) == full_scan(index, query, limit), (query, limit)
@@ -0,0 +1,38 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.models import AvailabilitySnapshot
+from app.services.availability_history import Summary, price_history, price_percentiles
+
+
+def _row(resolution: str, start: date, points: int) -> AvailabilitySnapshot:
+    summary = Summary()
+    summary.add_points(np.array([points]))
+    return AvailabilitySnapshot(origin="JFK", destination="LHR", cabin_class="business",
+                                loyalty_program="aeroplan", resolution=resolution,
+                                bucket_start=start, compacted=True, **summary.values())
+
+
+async def test_weeks_straddling_the_range_are_left_out():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(AvailabilitySnapshot.__table__.create)
+    since, until = date(2026, 3, 4), date(2026, 3, 31)  # a Wednesday to a Tuesday
+    async with async_sessionmaker(engine)() as db:
+        db.add_all([
+            _row("week", date(2026, 3, 2), 900_000),   # starts two days before the range
+            _row("week", date(2026, 3, 9), 50_000),
+            _row("day", date(2026, 3, 20), 60_000),
+            _row("week", date(2026, 3, 30), 900_000),  # runs past the end of the range
+        ])
+        await db.commit()
+        history = await price_history(db, "jfk", "lhr", "business", None, since, until)
+        distribution = await price_percentiles(db, "jfk", "lhr", "business", None, since, until, [100])
+    await engine.dispose()
+
+    assert [(h["resolution"], h["period_start"]) for h in history] == [
+        ("week", date(2026, 3, 9)), ("day", date(2026, 3, 20)),
+    ]
+    assert distribution["max_points"] == 60_000
@@ -0,0 +1,58 @@
+import pytest
+
+from app.services.flight_search import compact_results
+from app.services.result_views import SORT_KEYS, InvalidCursor, ResultFilter, ResultViews
+from app.services.search_cache import NormalizedSearch
+from benchmarks import fake_seats_aero
+
+SEARCHES = [NormalizedSearch("JFK", "LHR", "2030-06-01", "business", 1, program) for program in ("united", "aeroplan")]
+
+
+def outcomes(count: int):
+    raw = fake_seats_aero.build_results({"origin": "JFK", "destination": "LHR", "cabin": "business",
+                                         "departureDate": "2030-06-01"}, count)
+    records = compact_results(raw)
+    # Identical records in both programs' lists and within each: sort fields tie everywhere
+    return [records + records, list(records)]
+
+
+def all_pages(views: ResultViews, view, sort: str, page_size: int):
+    pages, cursor = [], None
+    while True:
+        page, cursor = views.page(view, sort, cursor, page_size)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort", sorted(SORT_KEYS))
+@pytest.mark.parametrize("page_size", [1, 3, 50])
+def test_pages_cover_every_result_once_despite_ties(sort, page_size):
+    views = ResultViews(4)
+    view = views.get(SEARCHES, outcomes(40), ResultFilter(), sort)
+    paged = [r for page in all_pages(views, view, sort, page_size) for r in page]
+    assert len(paged) == len(view.results) == 120
+    assert [id(r) for r in paged] == [id(r) for r in view.results]
+    assert len(set(view.keys)) == len(view.keys)
+
+
+def test_cursor_from_another_sort_is_rejected():
+    views = ResultViews(4)
+    view = views.get(SEARCHES, outcomes(10), ResultFilter(), "points")
+    _, cursor = views.page(view, "points", None, 5)
+    with pytest.raises(InvalidCursor):
+        views.page(view, "duration", cursor, 5)
+
+
+@pytest.mark.parametrize("sort", sorted(SORT_KEYS))
+def test_cursor_survives_a_refresh_that_reorders_upstream_results(sort):
+    views = ResultViews(4)
+    first = outcomes(30)
+    view = views.get(SEARCHES, first, ResultFilter(), sort)
+    page, cursor = views.page(view, sort, None, 25)
+    # Same results in a different upstream order, as after a cache refresh
+    refreshed = [list(reversed(o)) for o in first]
+    rebuilt = views.get(SEARCHES, refreshed, ResultFilter(), sort)
+    assert rebuilt is not view
+    rest, _ = views.page(rebuilt, sort, cursor, None)
+    assert [SORT_KEYS[sort](r) for r in page + rest] == [SORT_KEYS[sort](r) for r in view.results]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services import flight_search
+from app.services.search_cache import NormalizedSearch, SearchCache, cabin_ttl
+
+SEARCH = NormalizedSearch("JFK", "LHR", "2030-06-01", "business", 1, "united")
+
+
+def fetcher(results):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return results
+    return fetch, calls
+
+
+async def stale_cache() -> SearchCache:
+    cache = SearchCache(lru_size=8)
+    await cache.set(SEARCH, [{"old": True}])
+    # Expired, but still inside the stale window
+    fetched_at = time.time() - cabin_ttl(SEARCH.cabin) - settings.SEARCH_CACHE_STALE_SECONDS / 2
+    cache._lru[SEARCH.key] = (fetched_at, cache._lru[SEARCH.key][1])
+    return cache
+
+
+async def test_stale_entry_is_served_and_refreshed_in_background():
+    cache = await stale_cache()
+    fetch, calls = fetcher([{"new": True}])
+    assert await cache.get_or_fetch(SEARCH, fetch) == [{"old": True}]
+    await asyncio.gather(*cache._refreshing.values())
+    assert calls and (await cache.get(SEARCH))[0] == [{"new": True}]
+
+
+async def test_stale_entry_is_fetched_inline_when_stale_is_not_allowed():
+    cache = await stale_cache()
+    fetch, calls = fetcher([{"new": True}])
+    assert await cache.get_or_fetch(SEARCH, fetch, allow_stale=False) == [{"new": True}]
+    assert len(calls) == 1 and not cache._refreshing
+    assert await cache.get(SEARCH) == ([{"new": True}], True)
+
+
+async def test_disabled_cache_fetches_without_the_cross_worker_lock(monkeypatch):
+    class NoRedis:
+        def __getattr__(self, name):
+            raise AssertionError(f"Redis {name} called with the search cache disabled")
+
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "SEARCH_COALESCE_REDIS_LOCK", True)
+    monkeypatch.setattr(flight_search, "get_redis", lambda: NoRedis())
+    results = [{"flight": 1}]
+
+    async def fetch(search, client):
+        return results
+    monkeypatch.setattr(flight_search, "_fetch", fetch)
+    assert await flight_search._fetch_with_lock(SEARCH, client=None) is results
@@ -0,0 +1,32 @@
+import asyncio
+import random
+
+from app.core.config import settings
+from app.services.search_history import SearchHistoryRecorder
+
+
+async def test_every_recorded_row_is_flushed_once(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_HISTORY_BATCH_SIZE", 7)
+    monkeypatch.setattr(settings, "SEARCH_HISTORY_FLUSH_SECONDS", 0.005)
+    monkeypatch.setattr(settings, "SEARCH_HISTORY_QUEUE_SIZE", 100000)
+    recorder = SearchHistoryRecorder()
+    flushed = []
+
+    async def flush(rows):
+        flushed.extend(rows)
+        await asyncio.sleep(0)
+    recorder.flush = flush
+    recorder.start(session_factory=None)
+
+    rng = random.Random(7)
+    sent = 0
+    # Bursts and pauses around the flush interval, so batches end both full and on timeout
+    for _ in range(300):
+        for _ in range(rng.randrange(12)):
+            assert recorder.record({"n": sent})
+            sent += 1
+        await asyncio.sleep(rng.choice([0, 0.001, 0.004, 0.006]))
+    await recorder.stop()
+
+    assert sorted(r["n"] for r in flushed) == list(range(sent))
+    assert recorder.counters["enqueued"] == sent
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.models import LoyaltyProgram
+
+SEARCH = {"origin": "JFK", "destination": "LHR", "departure_date": "2030-06-01", "cabin_class": "business"}
+CATALOG = settings.SEARCH_MAX_PROGRAMS + 4
+
+
+@pytest.fixture
+async def catalog():
+    async with engine.begin() as conn:
+        await conn.run_sync(LoyaltyProgram.__table__.create, checkfirst=True)
+        await conn.execute(delete(LoyaltyProgram))
+    async with AsyncSessionLocal() as db:
+        db.add_all(LoyaltyProgram(code=f"program{i:02d}", name=f"Program {i}") for i in range(CATALOG))
+        await db.commit()
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(delete(LoyaltyProgram))
+
+
+async def test_all_programs_searches_a_catalog_larger_than_the_list_cap(client, catalog):
+    response = await client.post("/api/v1/flights/search", json={**SEARCH, "all_programs": True})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["programs"]) == CATALOG
+
+
+async def test_explicit_program_list_is_capped(client):
+    programs = [f"program{i:02d}" for i in range(settings.SEARCH_MAX_PROGRAMS + 1)]
+    response = await client.post("/api/v1/flights/search", json={**SEARCH, "loyalty_programs": programs})
+    assert response.status_code == 400
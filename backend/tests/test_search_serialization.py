@@ -0,0 +1,48 @@
+"""
+/flights/search is encoded with orjson and has no response_model, so nothing
+checks its body against FlightSearchResponse at runtime. These tests run it
+through the model as FastAPI's response_model would and expect the same document.
+"""
+import pytest
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas.flights import FlightSearchResponse
+
+SEARCH = {"origin": "JFK", "destination": "LHR", "departure_date": "2030-06-01",
+          "cabin_class": "business", "loyalty_program": "united"}
+
+field = create_response_field(name="Response_search_flights", type_=FlightSearchResponse)
+
+
+async def assert_matches_model(body: dict) -> None:
+    expected = await serialize_response(field=field, response_content=body, is_coroutine=True)
+    assert body == expected
+
+
+@pytest.mark.parametrize("extra", [
+    {},
+    {"balances": {"chase": 150000, "amex": 20000}},
+    {"flexible_days": 1},
+    {"loyalty_program": None, "loyalty_programs": ["united", "aeroplan"]},
+    {"sort": "points", "page_size": 10, "max_stops": 1},
+], ids=["plain", "balances", "flexible_days", "programs", "paged"])
+async def test_search_body_matches_response_model(client, extra):
+    response = await client.post("/api/v1/flights/search", json={**SEARCH, **extra})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["results"]
+    await assert_matches_model(body)
+
+
+async def test_every_page_matches_response_model(client):
+    body = {**SEARCH, "sort": "duration", "page_size": 7}
+    cursor = None
+    while True:
+        response = await client.post("/api/v1/flights/search", json={**body, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        await assert_matches_model(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break